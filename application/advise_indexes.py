@@ -0,0 +1,67 @@
+# advise_indexes.py
+
+# Script hors ligne : conseiller d'index pour les requêtes des modèles
+# Utilisation (depuis le dossier application) :
+#   python advise_indexes.py            afficher les parcours complets de table et les index manquants
+#   python advise_indexes.py --apply    créer les index manquants et comparer les durées avant/après
+
+# Importer les modules nécessaires
+import argparse                         # pour lire les options de la ligne de commande
+import config                           # configuration de l'application (chemin de la base)
+from models.db_utils import get_db_connection   # connexion en lecture/écriture
+from models import index_utils as iu            # analyse des plans et création des index
+
+# Afficher le plan d'une requête en signalant les parcours complets
+def print_plan(name, entry):
+    if "error" in entry:
+        print(f"- {name} : ignorée ({entry['error']})")
+        return
+    status = "PARCOURS COMPLET" if entry["full_scans"] else "ok"
+    timing = f"  {entry['seconds'] * 1000:.2f} ms" if entry["seconds"] is not None else ""
+    print(f"- {name} : {status}{timing}")
+    for step in entry["full_scans"]:
+        print(f"      {step}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyser les requêtes (EXPLAIN QUERY PLAN) et créer les index manquants")
+    parser.add_argument("--database", default=config.DATABASE, help="chemin de la base SQLite (par défaut : config.DATABASE)")
+    parser.add_argument("--apply", action="store_true", help="créer les index manquants puis mesurer à nouveau")
+    parser.add_argument("--repeat", type=int, default=5, help="nombre d'exécutions par requête pour la mesure (0 : aucune)")
+    args = parser.parse_args()
+
+    config.DATABASE = args.database
+    statements = iu.collect_statements()
+    conn = get_db_connection()
+    try:
+        print("Plans d'exécution actuels :")
+        before = iu.analyze_statements(conn, statements, args.repeat)
+        for name, entry in before.items():
+            print_plan(name, entry)
+
+        missing = iu.missing_indexes(conn)
+        print(f"\nIndex manquants : {len(missing)}")
+        for name, table, columns in missing:
+            print(f"  CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+
+        if not args.apply or not missing:
+            return
+
+        iu.create_indexes(conn, missing)
+        after = iu.analyze_statements(conn, statements, args.repeat)
+        print("\nAprès création des index :")
+        for name, entry in after.items():
+            print_plan(name, entry)
+
+        if args.repeat:
+            print(f"\n{'requête':<55} {'avant (ms)':>11} {'après (ms)':>11} {'gain':>7}")
+            for name, entry in after.items():
+                if "error" in entry or "error" in before[name]:
+                    continue
+                old, new = before[name]["seconds"], entry["seconds"]
+                print(f"{name:<55} {old * 1000:11.2f} {new * 1000:11.2f} {old / new if new else 0:6.1f}x")
+    finally:
+        conn.close()
+
+# Lancer le script
+if __name__ == '__main__':
+    main()
@@ -3,21 +3,81 @@
 # Programme principal pour lancer l'application Flask
 
 # Importer les modules nécessaires
+import config                                           # configuration de l'application (préchauffage)
+import threading                                        # pour créer l'application par défaut une seule fois
 from flask import Flask                                 # pour créer l'application Flask
 from controllers.main_controller import main            # importer le Blueprint principal 
 from controllers.dashboard_controller import dashboard  # importer le Blueprint du tableau de bord
+from controllers.assets_controller import assets        # importer le Blueprint des fichiers statiques (plotly.js)
+from controllers.api_controller import api              # importer le Blueprint de l'API JSON
+from controllers.health_controller import health        # importer le Blueprint de supervision (/ready)
+from controllers.metrics_controller import metrics      # importer le Blueprint d'instrumentation (/metrics)
+from controllers.tile_controller import tiles           # importer le Blueprint de la carte mondiale (/map, /tiles)
+from controllers.compression_controller import compression  # importer le Blueprint de compression (gzip, brotli)
+from models import warmup_utils                         # pour préchauffer les caches au démarrage
+from models import columnar_utils                       # moteur en mémoire optionnel (NumPy)
+from models import snapshot_utils                       # instantané partagé entre les workers (mmap)
 
-# Créer l'application Flask
-app = Flask(__name__)
+# Fabrique de l'application Flask
+# warm_up : préchauffer les caches (None : valeur de config.WARMUP_ON_START)
+# wait_warm_up : attendre la fin du préchauffage avant de rendre la main (sinon en arrière-plan)
+# Exemple avec un serveur WSGI : gunicorn "app:create_app(warm_up=True)"
+def create_app(warm_up=None, wait_warm_up=False):
+    # Créer l'application Flask
+    app = Flask(__name__)
 
-# Enregistrer les Blueprints
-# Le Blueprint 'main' gère la route principale de l'application
-app.register_blueprint(main)
-# Le Blueprint 'dashboard' gère la route du tableau de bord
-app.register_blueprint(dashboard)
+    # Enregistrer les Blueprints
+    # Le Blueprint 'main' gère la route principale de l'application
+    app.register_blueprint(main)
+    # Le Blueprint 'dashboard' gère la route du tableau de bord
+    app.register_blueprint(dashboard)
+    # Le Blueprint 'assets' sert plotly.js localement avec une mise en cache longue durée
+    app.register_blueprint(assets)
+    # Le Blueprint 'api' renvoie les données des onglets en JSON pour les graphiques tracés dans le navigateur
+    app.register_blueprint(api)
+    # Le Blueprint 'health' indique si l'application est prête (/ready)
+    app.register_blueprint(health)
+    # Le Blueprint 'metrics' mesure chaque requête (Server-Timing, profileur) et expose /metrics
+    app.register_blueprint(metrics)
+    # Le Blueprint 'tiles' sert la carte mondiale et ses tuiles vectorielles
+    app.register_blueprint(tiles)
+    # Le Blueprint 'compression' compresse les réponses et sert les fichiers statiques précompressés
+    # (enregistré après 'metrics' : ses hooks de fin de requête passent avant, /metrics compte les octets envoyés)
+    app.register_blueprint(compression)
+
+    # Construire l'instantané partagé avant le fork des workers (gunicorn --preload), sinon
+    # charger le moteur en mémoire dès le démarrage (s'il est activé)
+    if config.SNAPSHOT_ENABLED:
+        snapshot_utils.prepare_snapshot()
+    elif config.COLUMNAR_ENGINE:
+        columnar_utils.get_store()
+
+    # Préchauffer les caches : /ready ne répond 200 qu'une fois toutes les pages calculées
+    # (état propre à cette application, dans app.extensions)
+    if config.WARMUP_ON_START if warm_up is None else warm_up:
+        warmup_utils.start_warmup(app, wait=wait_warm_up)
+    else:
+        warmup_utils.get_state(app).mark_ready()
+
+    return app
+
+# Application par défaut (ex. : gunicorn app:app), créée au premier accès à app.app et non à l'import :
+# gunicorn "app:create_app(warm_up=True)" ne construit ainsi qu'une seule application
+_default_app = None
+_default_app_lock = threading.Lock()
+
+def __getattr__(name):
+    global _default_app
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _default_app_lock:
+        if _default_app is None:
+            _default_app = create_app()
+    return _default_app
 
 # Lancer l'application Flask
 if __name__ == '__main__':
+    app = create_app()
     # Lancer l'application en mode debug sur localhost via le port 5000
     app.run(host='127.0.0.1', port=5000, debug=True)
 
@@ -0,0 +1,75 @@
+# bench_import.py
+
+# Script hors ligne : mesurer le temps de démarrage à froid de l'application (import de app.py)
+# Chaque mesure est faite dans un nouveau processus Python avec "-X importtime"
+# Utilisation (depuis le dossier application) :
+#   python bench_import.py                  durée médiane, modules les plus coûteux et modules lourds chargés
+#   python bench_import.py --budget 0.5     code de sortie 1 si le budget (en secondes) est dépassé
+
+# Importer les modules nécessaires
+import argparse                         # pour lire les options de la ligne de commande
+import os                               # pour lancer l'interpréteur depuis le dossier de l'application
+import subprocess                       # pour mesurer dans un processus neuf (imports à froid)
+import sys                              # chemin de l'interpréteur courant
+import config                           # budget de démarrage par défaut
+
+# Bibliothèques qui ne doivent pas être chargées au démarrage (elles le sont à la première utilisation)
+HEAVY_MODULES = ["pandas", "plotly", "folium", "branca", "openpyxl", "numpy"]
+
+# Code exécuté dans le processus mesuré : importer et créer l'application, puis lister les modules lourds chargés
+PROBE = (
+    "import sys, time; start = time.perf_counter(); import app; app.create_app(warm_up=False); "
+    "print(time.perf_counter() - start); "
+    f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+)
+
+# Mesurer un démarrage : (durée en secondes, modules lourds chargés, {module: cumul en µs})
+def measure_once():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+    duration, loaded = result.stdout.splitlines()[-2:]
+    cumulative = {}
+    # lignes de -X importtime : "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumul, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumul)
+    return float(duration), [m for m in loaded.split(",") if m], cumulative
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesurer le temps d'import à froid de l'application")
+    parser.add_argument("--repeat", type=int, default=5, help="nombre de démarrages mesurés")
+    parser.add_argument("--top", type=int, default=15, help="nombre de modules les plus coûteux affichés")
+    parser.add_argument("--budget", type=float, default=config.STARTUP_IMPORT_BUDGET,
+                        help="durée maximale (en secondes) de l'import de app.py")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(max(args.repeat, 1))]
+    durations = sorted(run[0] for run in runs)
+    median = durations[len(durations) // 2]
+    _, loaded, cumulative = runs[-1]
+
+    print(f"Import de app.py : médiane {median * 1000:.0f} ms "
+          f"(min {durations[0] * 1000:.0f} ms, max {durations[-1] * 1000:.0f} ms, {len(runs)} démarrages)")
+    print(f"\n{'module':<45} {'cumul (ms)':>11}")
+    for name, us in sorted(cumulative.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<45} {us / 1000:11.1f}")
+
+    failed = False
+    if loaded:
+        print(f"\nModules lourds chargés au démarrage : {', '.join(loaded)}")
+        failed = True
+    if median > args.budget:
+        print(f"\nBudget dépassé : {median * 1000:.0f} ms > {args.budget * 1000:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(f"\nBudget respecté ({args.budget * 1000:.0f} ms), aucun module lourd chargé")
+
+# Lancer le script
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# benchmark.py
+
+# Script hors ligne : mesurer les performances de l'application et enregistrer les résultats en JSON
+# Utilisation (depuis le dossier application) :
+#   python benchmark.py                         base synthétique (échelle 1), micro-mesures et test de charge
+#   python benchmark.py --scale 10              10 fois plus de pays que la base réelle
+#   python benchmark.py --years 1950-2100       plus d'années par pays
+#   python benchmark.py --database WorldPopulation.db   mesurer la vraie base
+#   python benchmark.py --compare ancien.json   signaler les régressions (code de sortie 1)
+#   python benchmark.py --skip-load --skip-micro   pic d'allocation par requête seulement (lignes contre colonnes)
+
+# Importer les modules nécessaires
+import argparse                         # pour lire les options de la ligne de commande
+import json                             # pour enregistrer et relire les résultats
+import os                               # pour les chemins de fichiers
+import platform                         # version de Python dans les résultats
+import sys                              # code de sortie
+import tempfile                         # dossier de travail (base synthétique, caches)
+import time                             # horodatage des résultats
+import config                           # configuration de l'application
+from models import bench_utils as bu    # génération de la base, mesures et comparaison
+
+# Lire une plage d'années "1950-2023"
+def year_range(text):
+    first, last = (int(part) for part in text.split("-"))
+    return range(first, last + 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesurer les fonctions des modèles et les routes de l'application")
+    parser.add_argument("--database", help="base à mesurer (par défaut : base synthétique générée)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplicateur du nombre de pays de la base synthétique")
+    parser.add_argument("--years", type=year_range, default=range(1950, 2024), help="années de la base synthétique (ex. : 1950-2100)")
+    parser.add_argument("--seed", type=int, default=0, help="graine de la base synthétique")
+    parser.add_argument("--rollups", action="store_true", help="construire les rollups dans la base synthétique")
+    parser.add_argument("--indexes", action="store_true", help="créer les index recommandés dans la base synthétique")
+    parser.add_argument("--no-cache", action="store_true", help="désactiver les caches de requêtes et de fragments")
+    parser.add_argument("--repeat", type=int, default=5, help="exécutions par fonction (micro-mesures)")
+    parser.add_argument("--requests", type=int, default=500, help="nombre de requêtes du test de charge")
+    parser.add_argument("--concurrency", type=int, default=8, help="nombre de requêtes simultanées")
+    parser.add_argument("--skip-micro", action="store_true", help="ne pas faire les micro-mesures")
+    parser.add_argument("--skip-load", action="store_true", help="ne pas faire le test de charge")
+    parser.add_argument("--skip-memory", action="store_true", help="ne pas mesurer les allocations mémoire par requête")
+    parser.add_argument("--output", help="fichier JSON des résultats (par défaut : cache/benchmarks/<date>.json)")
+    parser.add_argument("--compare", help="résultats précédents (JSON) à comparer")
+    parser.add_argument("--threshold", type=float, default=1.2, help="rapport p50 après/avant signalé comme régression")
+    args = parser.parse_args()
+
+    # Dossier de travail : les caches sur disque de la vraie base ne sont ni lus ni effacés
+    workdir = tempfile.mkdtemp(prefix="benchmark-")
+    config.FRAGMENT_CACHE_DIR = os.path.join(workdir, "fragments")
+    config.EXPORT_CACHE_DIR = os.path.join(workdir, "exports")
+    if args.no_cache:
+        config.QUERY_CACHE_ENABLED = config.FRAGMENT_CACHE_ENABLED = False
+
+    meta = {"date": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "query_cache": config.QUERY_CACHE_ENABLED, "fragment_cache": config.FRAGMENT_CACHE_ENABLED}
+    if args.database:
+        config.DATABASE = args.database
+        meta["database"] = args.database
+    else:
+        config.DATABASE = os.path.join(workdir, "WorldPopulation.db")
+        start = time.perf_counter()
+        rows = bu.generate_synthetic_db(config.DATABASE, args.scale, args.years, args.seed)
+        meta.update(database="synthetic", scale=args.scale, years=[args.years[0], args.years[-1]], rows=rows)
+        print(f"Base synthétique : {rows} lignes en {time.perf_counter() - start:.1f} s ({config.DATABASE})")
+        if args.rollups or args.indexes:
+            from models.db_utils import get_db_connection
+            conn = get_db_connection()
+            try:
+                if args.indexes:
+                    from models import index_utils as iu
+                    iu.create_indexes(conn, iu.missing_indexes(conn))
+                if args.rollups:
+                    from models import rollup_utils as ru
+                    ru.build_rollups(conn)
+            finally:
+                conn.close()
+        meta.update(rollups=args.rollups, indexes=args.indexes)
+
+    results = {"meta": meta}
+    if not args.skip_micro:
+        print(f"\n{'fonction':<50} {'p50 (ms)':>10} {'max (ms)':>10} {'taille':>10}")
+        def show(name, entry):
+            if "error" in entry:
+                print(f"{name:<50} erreur : {entry['error']}")
+                return
+            size = entry.get("rows", entry.get("bytes", ""))
+            print(f"{name:<50} {entry['p50']:10.2f} {entry['max']:10.2f} {size:>10}")
+        results["micro"] = bu.micro_benchmarks(args.repeat, on_result=show)
+
+    if not args.skip_load:
+        from app import create_app
+        app = create_app(warm_up=False)
+        # les caches remplis par les micro-mesures sont vidés : le premier passage mesure les caches froids
+        from models.cache_utils import query_cache
+        from models.fragment_utils import fragment_cache
+        query_cache.clear()
+        fragment_cache.clear()
+        load = bu.load_test(app, bu.load_test_urls(), args.requests, args.concurrency)
+        results["load"] = load
+        print(f"\n{'url':<90} {'froid':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for url, entry in load["urls"].items():
+            print(f"{url:<90} {load['cold'][url]['ms']:9.1f} {entry['p50']:9.2f} {entry['p95']:9.2f} {entry['p99']:9.2f}")
+        overall = load["overall"]
+        print(f"\n{load['requests']} requêtes, {load['concurrency']} simultanées : {load['throughput_rps']} req/s, "
+              f"p50 {overall['p50']} ms, p95 {overall['p95']} ms, p99 {overall['p99']} ms, "
+              f"erreurs {load['errors']}, pic mémoire {load['peak_rss_mb']} Mo")
+
+    if not args.skip_memory:
+        from app import create_app
+        app = create_app(warm_up=False)
+        print(f"\n{'onglet':<12} {'lignes':>8} {'retenu Row':>11} {'retenu col.':>12} {'pic Row':>9} {'pic col.':>9} "
+              f"{'pic API Row':>12} {'pic API col.':>13}   (Kio)")
+        def show_memory(query_type, entry):
+            before, after = entry["row_objects"], entry["columns"]
+            print(f"{query_type:<12} {entry['rows']:>8} {before['retained_kb']:>11} {after['retained_kb']:>12} "
+                  f"{before['peak_kb']:>9} {after['peak_kb']:>9} {before['api_peak_kb']:>12} {after['api_peak_kb']:>13}")
+        results["memory"] = bu.memory_benchmarks(app, on_result=show_memory)
+
+    output = args.output or os.path.join(config.BASE_DIR, "cache", "benchmarks", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nRésultats enregistrés dans {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        regressions = bu.compare_results(previous, results, args.threshold)
+        for section, name, old, new, ratio in regressions:
+            print(f"Régression ({section}) {name} : {old:.2f} ms -> {new:.2f} ms ({ratio}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"Aucune régression au-delà de {args.threshold}x par rapport à {args.compare}")
+
+# Lancer le script
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+# build_rollups.py
+
+# Script hors ligne : matérialiser les agrégats (rollups) dans WorldPopulation.db
+# Utilisation (depuis le dossier application) :
+#   python build_rollups.py            construire ou reconstruire les tables pré-calculées
+#   python build_rollups.py --drop     supprimer les tables pré-calculées
+
+# Importer les modules nécessaires
+import argparse                         # pour lire les options de la ligne de commande
+import config                           # configuration de l'application (chemin de la base)
+from models.db_utils import get_db_connection   # connexion en lecture/écriture
+from models import rollup_utils as ru           # définition et construction des rollups
+
+def main():
+    parser = argparse.ArgumentParser(description="Construire les tables d'agrégats pré-calculées de WorldPopulation.db")
+    parser.add_argument("--database", default=config.DATABASE, help="chemin de la base SQLite (par défaut : config.DATABASE)")
+    parser.add_argument("--drop", action="store_true", help="supprimer les tables pré-calculées au lieu de les construire")
+    args = parser.parse_args()
+
+    config.DATABASE = args.database
+    conn = get_db_connection()
+    try:
+        if args.drop:
+            ru.drop_rollups(conn)
+            print(f"Rollups supprimés de {args.database}")
+            return
+        report = ru.build_rollups(conn)
+    finally:
+        conn.close()
+
+    print(f"Rollups construits dans {args.database} (schéma v{ru.ROLLUP_SCHEMA_VERSION})")
+    for table, (rows, seconds) in report.items():
+        print(f"  {table:<35} {rows:>8} lignes  {seconds * 1000:8.1f} ms")
+
+# Lancer le script
+if __name__ == '__main__':
+    main()
@@ -13,4 +13,122 @@ DATABASE = os.path.join(BASE_DIR, 'database', DB_NAME)
 # Définir la résolution des frontières geojson utilisées pour les cartes
 GEOJSON_03M = os.path.join(BASE_DIR, 'static/geojson', 'CNTR_RG_03M_2024_4326.geojson')
 GEOJSON_10M = os.path.join(BASE_DIR, 'static/geojson', 'CNTR_RG_10M_2024_4326.geojson')
-GEOJSON_20M = os.path.join(BASE_DIR, 'static/geojson', 'CNTR_RG_20M_2024_4326.geojson')
\ No newline at end of file
+GEOJSON_20M = os.path.join(BASE_DIR, 'static/geojson', 'CNTR_RG_20M_2024_4326.geojson')
+
+# Paramètres du pool de connexions SQLite (lecture seule)
+DB_POOL_SIZE = 8                # nombre maximal de connexions ouvertes simultanément
+DB_POOL_TIMEOUT = 10            # délai d'attente (en secondes) pour obtenir une connexion libre
+DB_IMMUTABLE = False            # True : ouvrir la base en mode immutable=1 (fichier jamais modifié)
+DB_MMAP_SIZE = 256 * 1024**2    # taille du mmap SQLite en octets (PRAGMA mmap_size)
+DB_CACHE_SIZE = -64 * 1024      # cache de pages SQLite (négatif = en Kio, PRAGMA cache_size)
+DB_STATEMENT_CACHE = 256        # requêtes préparées conservées par connexion (cached_statements)
+
+# Cache des résultats de requêtes (invalidé automatiquement quand la base change)
+QUERY_CACHE_ENABLED = True
+QUERY_CACHE_MAX_BYTES = 64 * 1024**2   # budget mémoire du cache (en octets)
+
+# Lire les tables d'agrégats pré-calculées (python build_rollups.py) quand elles existent
+ROLLUPS_ENABLED = True
+
+# Durée de mise en cache (en secondes) des fichiers statiques versionnés par empreinte (plotly.js)
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Tracer les graphiques dans le navigateur à partir de l'API JSON (False : HTML Plotly généré par le serveur)
+CLIENT_SIDE_CHARTS = True
+
+# Tableaux paginés, triés et filtrés côté serveur (DataTables en mode "serverSide") : par SQLite sur les rollups,
+# sinon sur le résultat en cache de chaque onglet
+TABLE_SERVER_SIDE = True
+
+# Exports : nombre de lignes lues par lot (fetchmany) et compression gzip à la volée des CSV
+EXPORT_BATCH_SIZE = 2000
+EXPORT_GZIP = True
+
+# Dossier des exports Excel mis en cache (un fichier par onglet et par version de la base)
+EXPORT_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'exports')
+
+# Carte de densité européenne : résolution des frontières et zoom initial
+EUROPE_MAP_RESOLUTION = '10M'
+EUROPE_MAP_ZOOM = 3
+# Tolérance de simplification des frontières (en degrés) par niveau de zoom maximal
+# (au-delà du plus grand zoom listé, la géométrie complète est utilisée)
+GEOJSON_SIMPLIFY_TOLERANCES = {2: 0.1, 3: 0.05, 4: 0.02, 5: 0.01, 6: 0.005}
+
+# Cache des fragments générés (HTML des graphiques/cartes, JSON de l'API), en mémoire et sur disque
+FRAGMENT_CACHE_ENABLED = True
+FRAGMENT_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'fragments')
+FRAGMENT_CACHE_MAX_ENTRIES = 64
+
+# Préchauffage des caches au démarrage (create_app) : toutes les pages sont calculées une fois
+# avant que /ready ne réponde 200
+WARMUP_ON_START = False
+WARMUP_WORKERS = 4
+
+# Budget du démarrage à froid (import de app.py, en secondes), vérifié par bench_import.py
+STARTUP_IMPORT_BUDGET = 1.0
+
+# Instrumentation : durées par étape (SQL, pool, rendu des figures, templates) en en-tête Server-Timing
+# et métriques au format Prometheus sur /metrics
+METRICS_ENABLED = True
+SERVER_TIMING_ENABLED = True
+
+# Profileur par échantillonnage (?profile=1, désactivé par défaut) et routes internes (/metrics, /cache_stats) :
+# réservés aux requêtes portant l'en-tête X-Profile-Token (ou Authorization: Bearer) égal à PROFILE_TOKEN,
+# ou, sans jeton configuré, aux requêtes locales directes (sans proxy)
+PROFILE_ENABLED = False
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_ALLOWED_ADDRS = ('127.0.0.1', '::1')
+PROFILE_INTERVAL = 0.005        # secondes entre deux échantillons
+PROFILE_DIR = os.path.join(BASE_DIR, 'cache', 'profiles')
+
+# Requêtes indépendantes d'une même page exécutées en parallèle (pool de threads, une connexion chacune)
+CONCURRENT_QUERIES = True
+CONCURRENT_WORKERS = None       # None : DB_POOL_SIZE
+QUERY_TIMEOUT = 10              # secondes ; au-delà, les requêtes en cours sont interrompues
+
+# Moteur en mémoire (NumPy) : fact_population chargée une fois par version de la base, agrégats
+# calculés sans requête SQL (nécessite numpy ; sinon les requêtes SQL sont utilisées)
+COLUMNAR_ENGINE = False
+
+# Requêtes à la carte (route /api/query)
+QUERY_MAX_ROWS = 20000          # lignes renvoyées au plus (au-delà : "truncated": true)
+QUERY_MAX_LOCATIONS = 512       # lieux demandés au plus
+
+# Résultats des requêtes stockés par colonnes (arrays typés) plutôt qu'en listes de sqlite3.Row
+COMPACT_ROWS = True
+
+# Tuiles vectorielles (Mapbox Vector Tiles) des cartes choroplèthes : route /tiles/<z>/<x>/<y>
+TILE_MAX_ZOOM = 8               # zoom maximal servi (au-delà, le client agrandit les tuiles de ce zoom)
+TILE_EXTENT = 4096              # résolution interne d'une tuile
+TILE_BUFFER = 64                # marge autour de la tuile (évite les traits de découpe aux bords)
+TILE_SIMPLIFY = 8               # tolérance de simplification (en unités de tuile, 16 = 1 pixel écran)
+# Fichier de frontières par zoom maximal (au-delà du plus grand zoom listé : 03M)
+TILE_RESOLUTIONS = {3: '20M', 6: '10M'}
+TILE_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'tiles')
+TILE_CACHE_MAX_ENTRIES = 1024   # géométries de tuiles gardées en mémoire
+
+# Ingestion incrémentale des publications WPP (script ingest.py)
+INGEST_CHUNK_SIZE = 5000        # lignes par lot (une transaction par lot)
+# Types de lieux conservés (les groupes de revenus, régions ODD, etc. sont ignorés)
+INGEST_LOCATION_TYPES = ("World", "Region", "Subregion", "Country/Area")
+
+# Instantané en lecture seule partagé par les workers (gunicorn --preload) : colonnes de fact_population et
+# frontières GeoJSON en fichiers NumPy ouverts en mmap (nécessite numpy) ; construit par le processus maître
+SNAPSHOT_ENABLED = False
+SNAPSHOT_DIR = os.path.join(BASE_DIR, 'cache', 'snapshot')
+SNAPSHOT_GEOJSON = ('03M', '10M', '20M')   # résolutions des frontières incluses
+
+# Animation du top N (route /api/top10/frames) : images envoyées par fenêtres de quelques années
+TOP_FRAMES_N = 10               # pays par image (par défaut)
+TOP_FRAMES_MAX_N = 50           # pays par image au plus (?n=)
+TOP_FRAMES_WINDOW = 5           # années préchargées par requête
+TOP_FRAMES_MAX_WINDOW = 20      # années par requête au plus (?count=)
+
+# Compression des réponses (gzip, et brotli si pip install brotli) selon l'en-tête Accept-Encoding
+COMPRESSION_ENABLED = True
+COMPRESS_MIN_SIZE = 1024                # octets ; en dessous, la réponse est envoyée telle quelle
+COMPRESS_GZIP_LEVEL = 6                 # niveaux rapides pour la compression à la volée
+COMPRESS_BROTLI_QUALITY = 5
+COMPRESS_CACHE_MAX_BYTES = 16 * 1024**2 # corps compressés gardés en mémoire (par ETag)
+# Servir les versions .br / .gz des fichiers de static/ écrites par python precompress.py
+PRECOMPRESSED_STATIC = True
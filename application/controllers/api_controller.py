@@ -0,0 +1,187 @@
+# controllers/api_controller.py
+
+# importer les modules nécessaires
+import config                                                  # options des caches
+from flask import Blueprint, Response, request                 # pour gérer les routes, requêtes et réponses
+from controllers.main_controller import get_data_for_query, QUERY_HEADERS, conditional_response  # mêmes données que les tableaux et exports
+from models import data_utils as du                            # requête SQL de chaque onglet
+from models import json_utils as ju                            # pour la sérialisation JSON en colonnes
+from models import table_utils as tu                           # pagination, tri et recherche (SQLite ou en mémoire)
+from models import rollup_utils as ru                          # tables pré-calculées disponibles ou non
+from models import fragment_utils                              # cache du JSON généré
+from models import concurrent_utils as cu                      # requêtes indépendantes lues en parallèle
+from models import query_utils as qu                           # requêtes à la carte (années, lieux, indicateurs)
+from models import frames_utils as fu                          # images de l'animation du top N
+
+# Créer un Blueprint pour l'API JSON utilisée par les graphiques tracés dans le navigateur
+api = Blueprint('api', __name__)
+
+# Construire une réponse JSON à partir d'un objet Python
+def json_response(obj, status=200):
+    return Response(ju.dumps(obj), status=status, mimetype='application/json')
+
+# Route pour récupérer les données d'un onglet au format JSON (en colonnes)
+# Exemple : /api/world -> {"query": "world", "columns": [...], "rows": 74, "data": {"Année": [...], ...}}
+@api.route('/api/<query_type>')
+def query_data(query_type):
+    if query_type not in QUERY_HEADERS:
+        return json_response({"error": f"Type de données non supporté : {query_type}"}, 404)
+
+    # JSON mis en cache pour la version courante de la base, renvoyé avec un ETag (304 si inchangé)
+    def build():
+        data, headers = get_data_for_query(query_type)
+        payload = ju.to_columns(data, headers)
+        payload["query"] = query_type
+        return ju.dumps(payload)
+    if config.FRAGMENT_CACHE_ENABLED:
+        body, etag = fragment_utils.fragment_cache.get_or_build(f"api_{query_type}", build)
+    else:
+        body, etag = fragment_utils.build_fragment(build), None
+    return conditional_response(body, mimetype='application/json', etag=etag)
+
+# Route des requêtes à la carte : seules les lignes et colonnes demandées sont lues et renvoyées
+# Exemple : /api/query?from=2000&to=2023&within=908&level=country&indicators=total,density
+#        -> {"columns": ["Code", "Lieu", "Année", "Population", "Densité"], "rows": ..., "data": {...},
+#            "truncated": false, "request": {...}}
+@api.route('/api/query')
+def custom_query():
+    try:
+        spec = qu.parse_query(request.args)
+    except qu.NoDataError as e:
+        return json_response({"error": str(e)}, 503)
+    except qu.QueryError as e:
+        return json_response({"error": str(e)}, 400)
+
+    limit = config.QUERY_MAX_ROWS
+    rows = qu.run_query(**spec, limit=limit + 1)
+    payload = ju.to_columns(rows[:limit], qu.result_headers(spec["indicators"]))
+    payload["truncated"] = len(rows) > limit
+    payload["request"] = spec
+    return conditional_response(ju.dumps(payload), mimetype='application/json')
+
+###################################################################
+# Traitement côté serveur des tableaux DataTables (paramètres start, length, order, search)
+
+# Mise en forme des cellules, identique à celle de templates/index.html
+def fmt_text(value):
+    return "" if value is None else str(value)
+
+def fmt_int(value):
+    return "" if value is None else "{:,.0f}".format(value).replace(',', '')
+
+def fmt_dec2(value):
+    return "" if value is None else "{:,.2f}".format(value).replace(',', '').replace('.', ',')
+
+def fmt_percent(value):
+    return "" if value is None else f"{value} %"
+
+# Mêmes mises en forme en SQL : la recherche des tableaux paginés par SQLite porte sur le texte affiché
+# (les arrondis à 0,5 près peuvent différer d'une unité entre printf et format)
+CELL_SQL = {
+    fmt_text: "CAST({} AS TEXT)",
+    fmt_int: "printf('%.0f', {})",
+    fmt_dec2: "replace(printf('%.2f', {}), '.', ',')",
+    fmt_percent: "(CAST({} AS TEXT) || ' %')",
+}
+
+CELL_FORMATS = {
+    'world': [fmt_text, fmt_int, fmt_int, fmt_int],
+    'continent': [fmt_text, fmt_text, fmt_int],
+    'sex_ratio': [fmt_text, fmt_int, fmt_int, fmt_text],
+    'region': [fmt_text, fmt_text, fmt_int],
+    'top10': [fmt_text, fmt_text, fmt_text, fmt_text, fmt_text, fmt_int],
+    'europe': [fmt_text, fmt_text, fmt_int, fmt_dec2],
+    'share': [fmt_text, fmt_text, fmt_text, fmt_int, fmt_int, fmt_percent],
+}
+
+# Colonnes proposant une liste déroulante de filtre (mêmes règles que le script de index.html)
+FILTER_KEYWORDS = ("Année", "Annee", "Continent", "Pays", "Région")
+
+def int_arg(name, default):
+    try:
+        return int(request.args.get(name, default))
+    except ValueError:
+        return default
+
+# Images de l'animation du top N, par fenêtres d'années : /api/top10/frames?n=10&from=1980&count=5
+# -> {"n": 10, "window": 5, "max": ..., "frames": {"1980": {"Pays": [...], "Population": [...]}, ...}}
+# Sans "from" (premier appel) : première année seulement, avec la liste de toutes les années ("years")
+@api.route('/api/top10/frames')
+def top_frames():
+    n = min(max(int_arg('n', config.TOP_FRAMES_N), 1), config.TOP_FRAMES_MAX_N)
+    frames = fu.get_top_frames(n)
+    first_call = 'from' not in request.args
+    if first_call:
+        years = frames.years[:1]
+    else:
+        count = min(max(int_arg('count', config.TOP_FRAMES_WINDOW), 1), config.TOP_FRAMES_MAX_WINDOW)
+        years = frames.window(int_arg('from', 0), count)
+    payload = {"n": n, "window": config.TOP_FRAMES_WINDOW, "max": frames.max,
+               "frames": {str(year): frames.frame(year) for year in years}}
+    if first_call:
+        payload["years"] = frames.years
+    return conditional_response(ju.dumps(payload), mimetype='application/json')
+
+# Route appelée par DataTables : /api/<query_type>/table?draw=1&start=0&length=10&order[0][column]=0...
+@api.route('/api/<query_type>/table')
+def table_data(query_type):
+    sql = du.get_query_sql(query_type)
+    if sql is None:
+        return json_response({"error": f"Type de données non supporté : {query_type}"}, 404)
+
+    headers = QUERY_HEADERS[query_type]
+    column_filters = {}
+    for index in range(len(headers)):
+        value = request.args.get(f'columns[{index}][search][value]', '')
+        if value:
+            column_filters[index] = value
+
+    formats = CELL_FORMATS[query_type]
+    page = dict(
+        start=int_arg('start', 0),
+        length=int_arg('length', 10),
+        order_index=int_arg('order[0][column]', 0),
+        descending=request.args.get('order[0][dir]', 'asc') == 'desc',
+        search=request.args.get('search[value]', '').strip(),
+        column_filters=column_filters,
+    )
+    # Sans rollups, la requête d'agrégation est trop coûteuse pour être relancée à chaque page :
+    # le résultat en cache de la fonction get_* est paginé en mémoire
+    in_memory = not ru.rollups_available()
+    try:
+        if in_memory:
+            result, _ = get_data_for_query(query_type)
+            result = tu.as_columns(query_type, result, headers)
+            rows, total, filtered = tu.page_result(query_type, result, display=formats, **page)
+        else:
+            rows, total, filtered = tu.fetch_page(sql, display_sql=[CELL_SQL[fmt] for fmt in formats], **page)
+    except cu.QueryTimeout as e:
+        return json_response({"error": str(e)}, 504)
+
+    payload = {
+        "draw": int_arg('draw', 0),
+        "recordsTotal": total,
+        "recordsFiltered": filtered,
+        "data": [[fmt(value) for fmt, value in zip(formats, row)] for row in rows],
+    }
+    # Au premier affichage : valeurs des listes déroulantes de filtre
+    # (lues dans le résultat en mémoire, ou une requête DISTINCT par colonne filtrable, exécutées en parallèle)
+    if payload["draw"] <= 1 and in_memory:
+        payload["options"] = {
+            str(index): [fmt_text(value) for value in tu.result_distinct_values(result, index)]
+            for index, header in enumerate(headers)
+            if any(keyword in header for keyword in FILTER_KEYWORDS)
+        }
+    elif payload["draw"] <= 1:
+        columns = tu.get_column_names(sql)
+        tasks = {
+            str(index): (lambda column=columns[index]: tu.distinct_values(sql, column))
+            for index, header in enumerate(headers)
+            if any(keyword in header for keyword in FILTER_KEYWORDS)
+        }
+        try:
+            values = cu.run_parallel(tasks)
+        except cu.QueryTimeout as e:
+            return json_response({"error": str(e)}, 504)
+        payload["options"] = {index: [fmt_text(row[0]) for row in rows] for index, rows in values.items()}
+    return json_response(payload)
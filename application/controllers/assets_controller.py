@@ -0,0 +1,25 @@
+# controllers/assets_controller.py
+
+# importer les modules nécessaires
+import config                                               # pour la durée de mise en cache
+from flask import Blueprint, send_file, url_for, abort      # pour gérer les routes et l'envoi de fichiers
+from models import asset_utils as au                        # pour localiser les fichiers et leur empreinte
+
+# Créer un Blueprint pour les fichiers statiques des bibliothèques (plotly.js)
+assets = Blueprint('assets', __name__)
+
+# Route pour servir plotly.js une seule fois, avec une mise en cache longue durée
+# Le nom du fichier contient l'empreinte du contenu : une nouvelle version de plotly change l'URL
+@assets.route('/assets/js/<filename>')
+def plotly_js(filename):
+    if filename != au.plotly_js_filename():
+        abort(404)
+    response = send_file(au.plotly_js_path(), mimetype='text/javascript', max_age=config.ASSET_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# Rendre l'URL du bundle disponible dans tous les templates : {{ plotly_js_url }}
+@assets.app_context_processor
+def inject_asset_urls():
+    return {'plotly_js_url': url_for('assets.plotly_js', filename=au.plotly_js_filename())}
@@ -0,0 +1,57 @@
+# controllers/compression_controller.py
+
+# importer les modules nécessaires
+import config                                                   # seuils et options de compression
+import os                                                       # pour vérifier les fichiers statiques
+import mimetypes                                                # type de contenu des fichiers statiques
+from flask import Blueprint, request, current_app, send_file   # hooks de toutes les requêtes et envoi de fichiers
+from werkzeug.security import safe_join                         # chemin sûr dans le dossier static
+from models import compress_utils as cu                         # négociation, compression et fichiers précompressés
+
+# Créer un Blueprint pour la compression de toutes les réponses de l'application
+compression = Blueprint('compression', __name__)
+
+# Fichiers statiques : version .br ou .gz écrite par precompress.py, envoyée telle quelle si le navigateur l'accepte
+@compression.before_app_request
+def serve_precompressed_static():
+    if not config.PRECOMPRESSED_STATIC or request.endpoint != 'static' or not request.view_args:
+        return None
+    path = safe_join(current_app.static_folder, request.view_args.get('filename', ''))
+    if path is None or not os.path.isfile(path):
+        return None
+    encoding, compressed_path = cu.precompressed_variant(path, request.accept_encodings)
+    if encoding is None:
+        return None
+    extension = os.path.splitext(path)[1].lower()
+    mimetype = cu.STATIC_MIMETYPES.get(extension) or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    # ETag calculé sur le fichier compressé : distinct de celui de l'original
+    response = send_file(compressed_path, mimetype=mimetype, conditional=True,
+                         max_age=current_app.get_send_file_max_age(path))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+# Réponses générées (pages, JSON, tuiles) : compressées si le type s'y prête et si la taille dépasse le seuil
+# Les réponses en flux (exports CSV, fichiers envoyés par send_file) et déjà encodées ne sont pas modifiées
+@compression.after_app_request
+def compress_response(response):
+    if not config.COMPRESSION_ENABLED or not cu.is_compressible(response.mimetype):
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 206, 304) or request.method == 'HEAD'):
+        return response
+    encoding = cu.choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < config.COMPRESS_MIN_SIZE:
+        return response
+    etag, weak = response.get_etag()
+    response.set_data(cu.compress_body(data, encoding, None if weak else etag))
+    response.headers['Content-Encoding'] = encoding
+    # ETag faible pour la version compressée (comme nginx) : les requêtes conditionnelles
+    # (comparaison faible de If-None-Match) continuent d'aboutir à des réponses 304
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
@@ -3,18 +3,32 @@
 # importer les modules nécessaires
 from flask import Blueprint, render_template, request # pour gérer les routes et les requêtes
 from models import dashboard_utils as dbu                   # pour accéder aux fonctions de manipulation des données
+from models import concurrent_utils as cu                   # délai maximal des requêtes
 
 # Créer un Blueprint pour regrouper les routes du tableau de bord
 dashboard = Blueprint('dashboard', __name__)
 
 # Route pour afficher le tableau de bord
-# Ce tableau de bord affiche des statistiques clés sur la population mondiale en comparant l'évolution des données entre 1950 et 2023
+# Ce tableau de bord affiche des statistiques clés sur la population mondiale en comparant l'évolution des données entre deux années
+# (1950 et 2023 par défaut, modifiables avec les paramètres ?from=&to=)
 @dashboard.route('/dashboard')
 def show_dashboard():
-    # Récupérer les statistiques clés
-    stats = dbu.generate_population_dashboard()
+    # Récupérer et valider les années demandées
+    year_from = request.args.get('from', dbu.DEFAULT_YEAR_FROM, type=int)
+    year_to = request.args.get('to', dbu.DEFAULT_YEAR_TO, type=int)
+
+    # Vérifier les années (liste en cache) avant de lancer la requête des indicateurs :
+    # des paramètres invalides ne coûtent aucun calcul
+    years = [row[0] for row in dbu.get_available_years()]
+    if year_from not in years or year_to not in years or year_from >= year_to:
+        return "Années non disponibles", 400
+    try:
+        stats = dbu.generate_population_dashboard(year_from, year_to)
+    except cu.QueryTimeout:
+        return "Délai de calcul dépassé", 504
     
-    title = "Indicateurs clés 1950-2023"
+    title = f"Indicateurs clés {year_from}-{year_to}"
 
     # Rendre le template du tableau de bord avec les statistiques
-    return render_template('dashboard.html', stats=stats, title=title)
\ No newline at end of file
+    return render_template('dashboard.html', stats=stats, title=title,
+                           years=years, year_from=year_from, year_to=year_to)
\ No newline at end of file
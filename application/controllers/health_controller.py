@@ -0,0 +1,15 @@
+# controllers/health_controller.py
+
+# importer les modules nécessaires
+from flask import Blueprint, jsonify, current_app   # pour gérer les routes et les réponses JSON
+from models import warmup_utils             # pour l'état du préchauffage
+
+# Créer un Blueprint pour les routes de supervision
+health = Blueprint('health', __name__)
+
+# Route de disponibilité (readiness) pour le répartiteur de charge :
+# 503 tant que le préchauffage n'est pas terminé, 200 ensuite (avec la durée de chaque élément)
+@health.route('/ready')
+def ready():
+    state = warmup_utils.get_state(current_app)
+    return jsonify(state.to_dict()), (200 if state.ready else 503)
@@ -3,32 +3,84 @@
 # importer les modules nécessaires
 import io
 import csv
-import pandas as pd # NOUVEAU : pour la gestion Excel
-from flask import Blueprint, render_template, request, Response # pour gérer les routes, requêtes et réponses
+import zlib         # pour compresser les exports CSV à la volée (gzip)
+import config       # options d'affichage (graphiques, tableaux)
+from flask import Blueprint, render_template, request, Response, jsonify, stream_with_context, send_file, abort # pour gérer les routes, requêtes et réponses
 from models import data_utils as du                   # pour accéder aux fonctions de manipulation des données
+from models.cache_utils import query_cache, peek_cached  # pour exposer les compteurs du cache et réutiliser ses résultats
+from models.db_utils import iter_query                 # pour lire les résultats par lots (exports)
+from models import export_utils                       # pour l'export Excel (classeur write_only mis en cache)
+from models import fragment_utils                     # pour les ETag et le cache des fragments générés
+from models import metrics_utils                      # contrôle d'accès des routes internes
 
 # Créer un Blueprint pour regrouper les routes
 main = Blueprint('main', __name__)
 
+# Fonction de récupération des données et en-têtes de colonnes de chaque onglet
+QUERY_FUNCTIONS = {
+    'world': du.get_world_population_by_year,
+    'continent': du.get_population_by_continent,
+    'sex_ratio': du.get_sex_ratio_data,
+    'region': du.get_population_by_region,
+    'top10': du.get_top_10_countries,
+    'europe': du.get_europe_population_by_year,
+    # AJOUT : Part de population par pays dans sa région
+    'share': du.get_country_region_share,
+}
+
+QUERY_HEADERS = {
+    'world': ["Année", "Hommes", "Femmes", "Total"],
+    'continent': ["Continent", "Année", "Population"],
+    'sex_ratio': ["Année", "Population Masculine", "Population Féminine", "Ratio"],
+    'region': ["Région", "Année", "Population"],
+    'top10': ["Année", "Pays", "Sous-région", "Région", "Continent", "Population"],
+    'europe': ["Année", "Pays", "Population", "Densité"],
+    'share': ["Région", "Pays", "Année", "Pop. Pays", "Pop. Région", "Part (%)"],
+}
+
 # --- NOUVELLE FONCTION UTILITAIRE (pour éviter de répéter le code dans CSV et Excel) ---
 def get_data_for_query(query_type):
-    if query_type == 'world':
-        return du.get_world_population_by_year(), ["Année", "Hommes", "Femmes", "Total"]
-    elif query_type == 'continent':
-        return du.get_population_by_continent(), ["Continent", "Année", "Population"]
-    elif query_type == 'sex_ratio':
-        return du.get_sex_ratio_data(), ["Année", "Population Masculine", "Population Féminine", "Ratio"]
-    elif query_type == 'region':
-        return du.get_population_by_region(), ["Région", "Année", "Population"]
-    elif query_type == 'top10':
-        return du.get_top_10_countries(), ["Année", "Pays", "Sous-région", "Région", "Continent", "Population"]
-    elif query_type == 'europe':
-        return du.get_europe_population_by_year(), ["Année", "Pays", "Population", "Densité"]
-    # AJOUT : Part de population par pays dans sa région
-    elif query_type == 'share':
-        return du.get_country_region_share(), ["Région", "Pays", "Année", "Pop. Pays", "Pop. Région", "Part (%)"]
-    
-    return [], []
+    if query_type not in QUERY_FUNCTIONS:
+        return [], []
+    return QUERY_FUNCTIONS[query_type](), QUERY_HEADERS[query_type]
+
+# Titre spécifique de chaque onglet (liste aussi les onglets préchauffés au démarrage)
+TITLES = {
+    'world': "Population mondiale par année",
+    'continent': "Répartition par Continent",
+    'sex_ratio': "Ratio Homme/Femme (1950-2023)",
+    'region': "Population par région et par année",
+    'top10': "Top 10 des pays les plus peuplés par année",
+    'europe': "Population des pays d'Europe par année",
+    'share': "Part de la population par pays dans sa région", # AJOUT TITRE
+    'about': "Informations sur le projet"
+}
+
+# Vues d'un onglet (paramètre "view")
+VIEW_TYPES = ('table', 'graph', 'text', 'dens_map')
+
+# Onglets disposant d'un graphique (tracé dans le navigateur via /api/<query_type>, cf. static/js/charts.js)
+CHART_QUERIES = ('world', 'continent', 'sex_ratio', 'region', 'top10', 'share')
+
+# Réponse 304 (Not Modified) : le client réutilise sa copie
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
+
+# Réponse avec ETag fort (empreinte du contenu) et gestion des requêtes conditionnelles (If-None-Match)
+# "no-cache" : le navigateur et le proxy gardent la page mais la revalident à chaque visite
+def conditional_response(body, page_key=None, mimetype='text/html', etag=None):
+    response = Response(body, mimetype=mimetype)
+    etag = etag or fragment_utils.content_etag(body)
+    if page_key is not None:
+        fragment_utils.remember_page_etag(page_key, etag)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @main.route('/')
 def index():
@@ -36,21 +88,28 @@ def index():
     query_type = request.args.get('query', 'world') # Par défaut : population mondiale
     view_type = request.args.get('view', 'table')  # Par défaut : tableau
 
+    # La page ne dépend que de l'onglet, de la vue et de la version de la base :
+    # si le navigateur (ou le proxy) possède déjà cette version, répondre 304 sans rien recalculer
+    # (comparaison faible : la version compressée porte le même ETag, marqué W/)
+    # (seulement pour les onglets et vues connus : les autres valeurs ne sont pas mémorisées)
+    page_key = ('index', query_type, view_type) if query_type in TITLES and view_type in VIEW_TYPES else None
+    etag = fragment_utils.get_page_etag(page_key) if page_key else None
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+
     # Utiliser la fonction utilitaire pour les données de base
-    data, headers = get_data_for_query(query_type)
+    # Graphiques tracés dans le navigateur et tableaux en traitement côté serveur :
+    # les données arrivent via l'API, la page ne contient que les en-têtes
+    table_server_side = view_type == 'table' and config.TABLE_SERVER_SIDE and query_type in QUERY_HEADERS
+    if view_type == 'graph' and config.CLIENT_SIDE_CHARTS:
+        data, headers = [], []
+    elif table_server_side:
+        data, headers = [], QUERY_HEADERS[query_type]
+    else:
+        data, headers = get_data_for_query(query_type)
     
     # Titre spécifique
-    titles = {
-        'world': "Population mondiale par année",
-        'continent': "Répartition par Continent",
-        'sex_ratio': "Ratio Homme/Femme (1950-2023)",
-        'region': "Population par région et par année",
-        'top10': "Top 10 des pays les plus peuplés par année",
-        'europe': "Population des pays d'Europe par année",
-        'share': "Part de la population par pays dans sa région", # AJOUT TITRE
-        'about': "Informations sur le projet"
-    }
-    title = titles.get(query_type, "Aucune donnée")
+    title = TITLES.get(query_type, "Aucune donnée")
 
     if query_type == 'about':
         data = du.get_about_data()
@@ -58,8 +117,9 @@ def index():
     
     # --- GÉNÉRATION DES GRAPHIQUES ---
     plot_html = None
+    client_chart = view_type == 'graph' and config.CLIENT_SIDE_CHARTS and query_type in CHART_QUERIES
 
-    if view_type == 'graph':
+    if view_type == 'graph' and not client_chart:
         if query_type == 'world': plot_html = du.generate_population_plot()
         elif query_type == 'continent': plot_html = du.generate_continent_pie_plot()
         elif query_type == 'sex_ratio': plot_html = du.generate_sex_ratio_plot()
@@ -71,56 +131,89 @@ def index():
     elif query_type == 'europe' and view_type == 'dens_map':
         plot_html = du.generate_europe_dens_map()
 
-    return render_template(
+    html = render_template(
         'index.html',
         data=data,
         title=title,
         headers=headers,
         query_type=query_type,
         view_type=view_type,
-        plot_html=plot_html
+        plot_html=plot_html,
+        client_chart=client_chart,
+        table_server_side=table_server_side
     )
+    return conditional_response(html, page_key)
+
+# Lots de lignes à exporter : résultat déjà en cache si possible, sinon lecture du curseur par fetchmany
+def iter_export_batches(query_type):
+    cached = peek_cached(QUERY_FUNCTIONS[query_type])
+    if cached is not None:
+        for i in range(0, len(cached), config.EXPORT_BATCH_SIZE):
+            yield cached[i:i + config.EXPORT_BATCH_SIZE]
+        return
+    yield from iter_query(du.get_query_sql(query_type))
+
+# Générer le CSV morceau par morceau : l'en-tête part avant même la fin de la requête SQL
+def generate_csv(query_type, headers):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(headers)
+    yield buffer.getvalue().encode('utf-8')
+    for rows in iter_export_batches(query_type):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+# Compresser à la volée un flux d'octets au format gzip
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 : en-tête et somme de contrôle gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
 
 @main.route('/download_csv')
 def download_csv():
     query_type = request.args.get('query', 'world')
-    data, headers = get_data_for_query(query_type)
-
-    if not data:
+    if query_type not in QUERY_HEADERS:
         return "Type de données non supporté", 400
 
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=';') 
-    writer.writerow(headers)
-    writer.writerows(data)
-    
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        mimetype="text/csv",
-        headers={"Content-disposition": f"attachment; filename=export_{query_type}.csv"}
-    )
+    headers = {"Content-disposition": f"attachment; filename=export_{query_type}.csv", "Vary": "Accept-Encoding"}
+    body = generate_csv(query_type, QUERY_HEADERS[query_type])
+
+    # Compression gzip si le navigateur l'accepte (Accept-Encoding: gzip)
+    if config.EXPORT_GZIP and request.accept_encodings['gzip']:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+
+    # Réponse envoyée en flux (pas de Content-Length) : mémoire constante quelle que soit la taille de l'export
+    return Response(stream_with_context(body), mimetype="text/csv", headers=headers)
 
 # --- NOUVELLE ROUTE : TÉLÉCHARGEMENT EXCEL ---
 @main.route('/download_excel')
 def download_excel():
     query_type = request.args.get('query', 'world')
-    data, headers = get_data_for_query(query_type)
-
-    if not data:
+    if query_type not in QUERY_HEADERS:
         return "Type de données non supporté", 400
 
-    # Création du DataFrame
-    df = pd.DataFrame(data, columns=headers)
-
-    # Création du fichier Excel en mémoire
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Données')
-    
-    output.seek(0)
-    return Response(
-        output.getvalue(),
+    # Classeur écrit directement depuis le curseur (mode write_only), puis gardé sur disque
+    # pour la version courante de la base : les téléchargements suivants lisent le fichier
+    path = export_utils.get_excel_export(
+        query_type, QUERY_HEADERS[query_type], lambda: iter_export_batches(query_type)
+    )
+    return send_file(
+        path,
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-disposition": f"attachment; filename=export_{query_type}.xlsx"}
-    )
\ No newline at end of file
+        as_attachment=True,
+        download_name=f"export_{query_type}.xlsx"
+    )
+
+# --- COMPTEURS DU CACHE DE REQUÊTES (succès, échecs, évictions, mémoire utilisée) ---
+# Route interne : poste local ou jeton PROFILE_TOKEN, comme /metrics
+@main.route('/cache_stats')
+def cache_stats():
+    if not metrics_utils.internal_access_allowed(request):
+        abort(403)
+    return jsonify(dict(query_cache.stats(), fragments=fragment_utils.fragment_cache.stats()))
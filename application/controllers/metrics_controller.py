@@ -0,0 +1,95 @@
+# controllers/metrics_controller.py
+
+# importer les modules nécessaires
+import config                                                   # options de l'instrumentation
+import time                                                     # pour mesurer la durée des requêtes et des templates
+from flask import Blueprint, Response, request, g, abort        # pour gérer les routes, requêtes et réponses
+from flask import before_render_template, template_rendered     # signaux de rendu des templates
+from models import metrics_utils as mu                          # étapes, métriques et profileur
+from models.cache_utils import query_cache                      # compteurs du cache des requêtes
+from models import fragment_utils                               # compteurs du cache des fragments
+from models import db_utils                                     # état du pool de connexions
+
+# Créer un Blueprint pour l'instrumentation (hooks de toutes les requêtes et route /metrics)
+metrics = Blueprint('metrics', __name__)
+
+# Profileur autorisé : ?profile=1 et jeton valide, ou requête locale directe si aucun jeton n'est configuré
+def profiling_allowed():
+    if not config.PROFILE_ENABLED or request.args.get('profile') != '1':
+        return False
+    return mu.internal_access_allowed(request)
+
+# Début de chaque requête : suivi des étapes et, si demandé, démarrage du profileur
+@metrics.before_app_request
+def start_request_timing():
+    if not config.METRICS_ENABLED:
+        return
+    g.request_timings, g.request_timings_token = mu.start_request()
+    if profiling_allowed():
+        g.profiler = mu.SamplingProfiler().start()
+
+# Fin de chaque requête : en-tête Server-Timing, métriques de la route et profil éventuel
+@metrics.after_app_request
+def add_server_timing(response):
+    timings = g.get('request_timings')
+    if timings is None:
+        return response
+    endpoint = request.endpoint or 'inconnu'
+    if config.SERVER_TIMING_ENABLED:
+        response.headers['Server-Timing'] = timings.header()
+    mu.REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    mu.REQUEST_DURATION.observe(time.perf_counter() - timings.started, endpoint=endpoint)
+    # réponses en flux (exports CSV) : taille inconnue à ce stade
+    if not response.is_streamed:
+        mu.RESPONSE_BYTES.inc(response.calculate_content_length() or 0, endpoint=endpoint)
+
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        # nom du fichier seulement (dans cache/profiles) : le chemin du serveur n'est pas exposé
+        response.headers['X-Profile-File'] = profiler.stop().dump(endpoint)
+    return response
+
+@metrics.teardown_app_request
+def end_request_timing(exc):
+    token = g.pop('request_timings_token', None)
+    if token is not None:
+        mu.end_request(token)
+
+# Durée du rendu des templates (signaux Flask émis avant et après chaque render_template)
+def _template_started(sender, template, context, **extra):
+    g.template_started = time.perf_counter()
+
+def _template_rendered(sender, template, context, **extra):
+    started = g.pop('template_started', None)
+    if started is not None:
+        mu.record("template", time.perf_counter() - started)
+
+before_render_template.connect(_template_started)
+template_rendered.connect(_template_rendered)
+
+# État des caches et du pool, lu à chaque appel de /metrics
+@mu.register_collector
+def cache_metrics():
+    stats = query_cache.stats()
+    fragments = fragment_utils.fragment_cache.stats()
+    pool = db_utils.get_pool().stats()
+    return [
+        ("app_query_cache_hits_total", "counter", "Lectures trouvées dans le cache des requêtes", {}, stats["hits"]),
+        ("app_query_cache_misses_total", "counter", "Lectures absentes du cache des requêtes", {}, stats["misses"]),
+        ("app_query_cache_evictions_total", "counter", "Entrées évincées du cache des requêtes", {}, stats["evictions"]),
+        ("app_query_cache_bytes", "gauge", "Taille estimée du cache des requêtes", {}, stats["bytes"]),
+        ("app_fragment_cache_hits_total", "counter", "Fragments lus dans le cache", {"level": "memory"}, fragments["hits"]),
+        ("app_fragment_cache_hits_total", "counter", "Fragments lus dans le cache", {"level": "disk"}, fragments["disk_hits"]),
+        ("app_fragment_cache_misses_total", "counter", "Fragments construits", {}, fragments["misses"]),
+        ("app_db_pool_connections", "gauge", "Connexions SQLite du pool", {"state": "created"}, pool["created"]),
+        ("app_db_pool_connections", "gauge", "Connexions SQLite du pool", {"state": "idle"}, pool["idle"]),
+    ]
+
+# Route des métriques au format texte Prometheus (même contrôle d'accès que le profileur)
+@metrics.route('/metrics')
+def show_metrics():
+    if not config.METRICS_ENABLED:
+        abort(404)
+    if not mu.internal_access_allowed(request):
+        abort(403)
+    return Response(mu.render_metrics(), mimetype='text/plain; version=0.0.4')
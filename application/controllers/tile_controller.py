@@ -0,0 +1,69 @@
+# controllers/tile_controller.py
+
+# importer les modules nécessaires
+import config                                                   # zoom maximal des tuiles
+from flask import Blueprint, Response, request, render_template, abort  # pour gérer les routes, requêtes et réponses
+from controllers.main_controller import conditional_response    # ETag et réponses 304
+from models import query_utils as qu                            # indicateurs et valeurs par pays
+from models import tile_utils                                   # découpe et encodage des tuiles
+from models import json_utils as ju                             # sérialisation JSON
+
+# Créer un Blueprint pour la carte mondiale et ses tuiles vectorielles
+tiles = Blueprint('tiles', __name__)
+
+MVT_MIMETYPE = 'application/vnd.mapbox-vector-tile'
+
+def json_error(message, status):
+    return Response(ju.dumps({"error": message}), status=status, mimetype='application/json')
+
+# Tuile vectorielle : /tiles/<z>/<x>/<y>?indicator=density&year=2023[&within=150]
+# Géométrie découpée à la tuile (en cache), valeurs de l'indicateur pour l'année ajoutées à l'encodage
+@tiles.route('/tiles/<int:z>/<int:x>/<int:y>')
+def tile(z, x, y):
+    if z > config.TILE_MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        abort(404)
+    try:
+        spec = qu.parse_map_query(request.args)
+    except qu.NoDataError as e:
+        return json_error(str(e), 503)
+    except qu.QueryError as e:
+        return json_error(str(e), 400)
+    values = qu.country_value_lookup(**spec)
+    body = tile_utils.get_tile(z, x, y, values, only_valued=spec["within"] is not None)
+    return conditional_response(body, mimetype=MVT_MIMETYPE)
+
+# Échelle de couleurs d'une carte : /tiles/scale?indicator=density&year=2023 -> bornes des classes
+@tiles.route('/tiles/scale')
+def scale():
+    try:
+        spec = qu.parse_map_query(request.args)
+    except qu.NoDataError as e:
+        return json_error(str(e), 503)
+    except qu.QueryError as e:
+        return json_error(str(e), 400)
+    values = list(qu.country_value_lookup(**spec).values())
+    payload = dict(spec, label=qu.INDICATORS[spec["indicator"]][2],
+                   min=min(values, default=None), max=max(values, default=None),
+                   breaks=tile_utils.quantile_breaks(values))
+    return conditional_response(ju.dumps(payload), mimetype='application/json')
+
+# Page de la carte mondiale (tracée dans le navigateur à partir des tuiles)
+@tiles.route('/map')
+def world_map():
+    try:
+        spec = qu.parse_map_query(request.args)
+        first, last = qu.year_bounds()
+    except qu.NoDataError as e:
+        return str(e), 503
+    except qu.QueryError as e:
+        return str(e), 400
+    html = render_template(
+        'map.html',
+        title="Carte mondiale",
+        query_type='map',
+        indicators={name: label for name, (_, _, label) in qu.INDICATORS.items()},
+        years=range(last, first - 1, -1),
+        max_zoom=config.TILE_MAX_ZOOM,
+        **spec
+    )
+    return conditional_response(html)
@@ -0,0 +1,59 @@
+# ingest.py
+
+# Script hors ligne : intégrer une nouvelle publication des World Population Prospects dans WorldPopulation.db
+# Utilisation (depuis le dossier application) :
+#   python ingest.py WPP2024_GEN_F01_DEMOGRAPHIC_INDICATORS.xlsx --sheet Estimates --sheet "Medium variant"
+#   python ingest.py WPP2024_Demographic_Indicators_Medium.csv.gz --variant Medium
+#   python ingest.py fichier.csv --dry-run     compter les lignes nouvelles ou modifiées sans toucher à la base
+# Seules les lignes (lieu, année) qui changent sont écrites et seuls les rollups des années touchées sont recalculés ;
+# la base est remplacée d'un seul coup à la fin (l'application continue de lire l'ancienne jusque-là)
+
+# Importer les modules nécessaires
+import argparse                         # pour lire les options de la ligne de commande
+import sys                              # pour afficher la progression
+import config                           # configuration de l'application (chemin de la base)
+from models import ingest_utils as ig   # lecture de la publication et écriture incrémentale
+
+def main():
+    parser = argparse.ArgumentParser(description="Intégrer une publication WPP (CSV ou XLSX) dans WorldPopulation.db")
+    parser.add_argument("path", help="fichier de la publication (.csv, .csv.gz, .zip ou .xlsx)")
+    parser.add_argument("--database", default=config.DATABASE, help="chemin de la base SQLite (par défaut : config.DATABASE)")
+    parser.add_argument("--sheet", action="append", help="feuille du classeur à lire (répétable ; par défaut : la première)")
+    parser.add_argument("--variant", help="ne garder que cette variante de projection (ex. : Medium)")
+    parser.add_argument("--chunk-size", type=int, default=config.INGEST_CHUNK_SIZE, help="lignes par lot (une transaction par lot)")
+    parser.add_argument("--dry-run", action="store_true", help="ne pas remplacer la base")
+    parser.add_argument("--no-rollups", action="store_true", help="ne pas recalculer les rollups")
+    args = parser.parse_args()
+
+    def progress(report):
+        print(f"\r  {report['read']} lignes lues", end="", file=sys.stderr, flush=True)
+
+    try:
+        report = ig.ingest(args.path, args.database, args.sheet, args.variant, args.chunk_size,
+                           dry_run=args.dry_run, refresh_rollups=not args.no_rollups, on_chunk=progress)
+    except ig.IngestError as e:
+        sys.exit(f"Erreur : {e}")
+    print(file=sys.stderr)
+
+    years = report["years"]
+    print(f"Publication {args.path} ({report['seconds']:.1f} s)")
+    print(f"  lignes lues        {report['read']:>8}  (ignorées : {report['skipped']})")
+    print(f"  lignes ajoutées    {report['inserted']:>8}")
+    print(f"  lignes modifiées   {report['updated']:>8}")
+    print(f"  lignes identiques  {report['unchanged']:>8}")
+    print(f"  lieux ajoutés ou renommés {report['locations']}")
+    print(f"  années touchées    {len(years)}" + (f" ({years[0]}–{years[-1]})" if years else ""))
+    if report["rollups"] == "all":
+        print("  rollups reconstruits entièrement")
+    elif report["rollups"]:
+        print(f"  rollups recalculés pour {len(report['rollups'])} années")
+    if report["swapped"]:
+        print(f"Base remplacée : {args.database}")
+    elif args.dry_run:
+        print("Essai (--dry-run) : base inchangée")
+    else:
+        print("Aucun changement : base inchangée")
+
+# Lancer le script
+if __name__ == '__main__':
+    main()
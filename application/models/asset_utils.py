@@ -0,0 +1,30 @@
+# models/asset_utils.py
+
+# Fichiers statiques fournis par les bibliothèques Python (ex. : plotly.js)
+# Ils sont servis localement (fonctionnement hors ligne) sous un nom contenant une empreinte
+# du contenu : le navigateur peut les garder en cache indéfiniment
+
+# modules nécessaires
+import os                       # pour construire les chemins de fichiers
+import hashlib                  # pour calculer l'empreinte du contenu
+import functools                # pour mémoriser l'empreinte (calculée une seule fois)
+import importlib.util           # pour localiser plotly sans l'importer
+
+# Chemin du bundle plotly.js livré avec le paquet Python plotly
+@functools.lru_cache(maxsize=None)
+def plotly_js_path():
+    spec = importlib.util.find_spec("plotly")
+    return os.path.join(os.path.dirname(spec.origin), "package_data", "plotly.min.js")
+
+# Empreinte (12 premiers caractères du SHA-256) du bundle plotly.js
+@functools.lru_cache(maxsize=None)
+def plotly_js_fingerprint():
+    digest = hashlib.sha256()
+    with open(plotly_js_path(), "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+# Nom public du bundle, ex. : plotly-3f2a9c0d1b7e.min.js
+def plotly_js_filename():
+    return f"plotly-{plotly_js_fingerprint()}.min.js"
@@ -0,0 +1,362 @@
+# models/bench_utils.py
+
+# Outils de mesure des performances, utilisés par le script benchmark.py :
+# - génération d'une base WorldPopulation.db synthétique (même schéma, taille réglable)
+# - micro-mesures de chaque fonction get_* et generate_* des modèles
+# - test de charge concurrent de toutes les routes via le client de test Flask
+# - pic d'allocation mémoire par requête, lignes sqlite3.Row contre résultats en colonnes
+# Les modèles sont importés dans les fonctions : benchmark.py règle config (base, dossiers de cache) avant
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import sqlite3                  # pour écrire la base synthétique
+import random                   # valeurs synthétiques reproductibles (graine)
+import math                     # pour le calcul des percentiles
+import time                     # pour mesurer les durées
+import inspect                  # pour repérer les fonctions appelables sans argument
+import threading                # un client de test par thread
+import tracemalloc              # pour mesurer les allocations Python
+from concurrent.futures import ThreadPoolExecutor   # pour simuler des requêtes simultanées
+
+# Pic de mémoire du processus (non disponible sous Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+###################################################################
+# Base synthétique
+
+# Colonnes de fact_population lues par l'application
+INDICATOR_COLUMNS = [
+    "TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)",
+    "MALE POPULATION. AS OF 1 JULY (THOUSANDS)",
+    "FEMALE POPULATION. AS OF 1 JULY (THOUSANDS)",
+    "POPULATION DENSITY. AS OF 1 JULY (PERSONS PER SQUARE KM)",
+    "LIFE EXPECTANCY AT BIRTH. BOTH SEXES (YEARS)",
+    "CRUDE DEATH RATE (DEATHS PER 1.000 POPULATION)",
+    "CRUDE BIRTH RATE (BIRTHS PER 1.000 POPULATION)",
+]
+
+# Hiérarchie des World Population Prospects : continent -> région -> sous-régions (codes M49)
+HIERARCHY = [
+    (1, "Africa", 903, "Africa", [(910, "Eastern Africa"), (911, "Middle Africa"), (912, "Northern Africa"),
+                                  (913, "Southern Africa"), (914, "Western Africa")]),
+    (2, "Asia", 935, "Asia", [(5500, "Central Asia"), (906, "Eastern Asia"), (920, "South-Eastern Asia"),
+                              (5501, "Southern Asia"), (922, "Western Asia")]),
+    (3, "Europe", 908, "Europe", [(923, "Eastern Europe"), (924, "Northern Europe"),
+                                  (925, "Southern Europe"), (926, "Western Europe")]),
+    (4, "South America", 904, "Latin America and the Caribbean",
+     [(915, "Caribbean"), (916, "Central America"), (931, "South America")]),
+    (5, "North America", 905, "Northern America", [(918, "Northern America")]),
+    (6, "Oceania", 909, "Oceania", [(927, "Australia/New Zealand"), (928, "Melanesia"),
+                                    (954, "Micronesia"), (957, "Polynesia")]),
+]
+
+# Nombre de pays de la base réelle (échelle 1)
+BASE_COUNTRIES = 237
+
+# Noms réels des pays européens (jointure avec les frontières GeoJSON de la carte de densité)
+EUROPE_NAMES = [
+    "Albania", "Austria", "Belarus", "Belgium", "Bosnia and Herzegovina", "Bulgaria", "Croatia",
+    "Czechia", "Denmark", "Estonia", "Finland", "France", "Germany", "Greece", "Hungary", "Iceland",
+    "Ireland", "Italy", "Latvia", "Lithuania", "Luxembourg", "Montenegro", "Netherlands", "North Macedonia",
+    "Norway", "Poland", "Portugal", "Moldova", "Romania", "Serbia", "Slovakia", "Slovenia", "Spain",
+    "Sweden", "Switzerland", "Ukraine", "United Kingdom",
+]
+
+WORLD_CODE = 900
+FIRST_COUNTRY_CODE = 10000
+
+def _create_schema(conn):
+    indicators = ", ".join(f'"{column}" REAL' for column in INDICATOR_COLUMNS)
+    conn.execute(f"CREATE TABLE fact_population (location_code INTEGER, year INTEGER, {indicators})")
+    for table in ("continent", "region", "subregion", "country"):
+        conn.execute(f"CREATE TABLE {table} (location_code INTEGER PRIMARY KEY, name TEXT, parent_code INTEGER)")
+
+# Série d'un lieu : [(total, hommes, femmes, densité, espérance de vie, mortalité, natalité)] par année
+def _country_series(rng, years):
+    population = rng.lognormvariate(8.5, 1.6)           # en milliers
+    growth = rng.uniform(0.0, 0.03)
+    male_share = rng.uniform(0.47, 0.52)
+    area = rng.uniform(0.5, 5000)                       # en milliers de km²
+    life, death, birth = rng.uniform(35, 70), rng.uniform(8, 30), rng.uniform(15, 50)
+    series = []
+    for _ in years:
+        male = population * male_share
+        series.append((population, male, population - male, population / area, life, death, birth))
+        population *= 1 + growth + rng.uniform(-0.005, 0.005)
+        life, death, birth = min(life + 0.3, 86), max(death - 0.2, 4), max(birth - 0.3, 7)
+    return series
+
+# Agréger des séries (sommes des populations, moyennes pondérées des taux)
+def _aggregate(series_list):
+    aggregated = []
+    for values in zip(*series_list):
+        total = sum(v[0] for v in values)
+        male = sum(v[1] for v in values)
+        density = sum(v[3] for v in values) / len(values)
+        rates = [sum(v[i] * v[0] for v in values) / total for i in (4, 5, 6)]
+        aggregated.append((total, male, total - male, density, *rates))
+    return aggregated
+
+# Créer une base synthétique au schéma de WorldPopulation.db
+# scale : multiplicateur du nombre de pays ; years : années générées (ex. : range(1950, 2101))
+# Renvoie le nombre de lignes de fact_population
+def generate_synthetic_db(path, scale=1.0, years=range(1950, 2024), seed=0):
+    rng = random.Random(seed)
+    years = list(years)
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            for table in ("fact_population", "continent", "region", "subregion", "country"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            _create_schema(conn)
+
+            subregions = []
+            for continent_code, continent, region_code, region, subs in HIERARCHY:
+                conn.execute("INSERT INTO continent VALUES (?, ?, NULL)", (continent_code, continent))
+                conn.execute("INSERT INTO region VALUES (?, ?, ?)", (region_code, region, continent_code))
+                for sub_code, sub_name in subs:
+                    conn.execute("INSERT INTO subregion VALUES (?, ?, ?)", (sub_code, sub_name, region_code))
+                    subregions.append((sub_code, region_code, region))
+
+            # pays répartis sur les sous-régions, séries agrégées au fil de l'eau (sous-région, région, monde)
+            countries = max(int(BASE_COUNTRIES * scale), len(subregions))
+            europe_names = iter(EUROPE_NAMES)
+            by_location = {}
+            rows = 0
+            for i in range(countries):
+                sub_code, region_code, region = subregions[i % len(subregions)]
+                code = FIRST_COUNTRY_CODE + i
+                name = next(europe_names, None) if region == "Europe" else None
+                conn.execute("INSERT INTO country VALUES (?, ?, ?)", (code, name or f"Country {code}", sub_code))
+                series = _country_series(rng, years)
+                conn.executemany(
+                    "INSERT INTO fact_population VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(code, year, *values) for year, values in zip(years, series)],
+                )
+                rows += len(years)
+                for parent in (sub_code, region_code, WORLD_CODE):
+                    by_location.setdefault(parent, []).append(series)
+
+            for code, series_list in by_location.items():
+                conn.executemany(
+                    "INSERT INTO fact_population VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(code, year, *values) for year, values in zip(years, _aggregate(series_list))],
+                )
+                rows += len(years)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return rows
+
+###################################################################
+# Statistiques
+
+# Percentile par rang le plus proche (échantillons triés)
+def percentile(sorted_samples, p):
+    if not sorted_samples:
+        return None
+    index = max(0, min(len(sorted_samples) - 1, math.ceil(p / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+# Résumé de durées en secondes -> millisecondes
+def summarize(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"count": 0}
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "count": len(samples),
+        "min": ms(samples[0]),
+        "p50": ms(percentile(samples, 50)),
+        "p95": ms(percentile(samples, 95)),
+        "p99": ms(percentile(samples, 99)),
+        "max": ms(samples[-1]),
+        "mean": ms(sum(samples) / len(samples)),
+    }
+
+# Pic de mémoire résidente du processus (en Mo)
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    return round(peak / (1024 * 1024 if peak > 1 << 32 else 1024), 1)
+
+# Taille d'un résultat : nombre de lignes (liste) ou d'octets (HTML, JSON)
+def result_size(result):
+    if isinstance(result, (str, bytes)):
+        return {"bytes": len(result)}
+    if isinstance(result, (list, tuple)) or hasattr(result, "column_lists"):
+        return {"rows": len(result)}
+    return {}
+
+###################################################################
+# Micro-mesures des modèles
+
+# Arguments des fonctions paramétrées
+def benchmark_arguments():
+    from models import dashboard_utils as dbu
+    return {"get_dashboard_kpis": (dbu.DEFAULT_YEAR_FROM, dbu.DEFAULT_YEAR_TO)}
+
+# Fonctions get_* et generate_* des modèles : [(nom, fonction, arguments)]
+def model_functions():
+    from models import data_utils, dashboard_utils
+    arguments = benchmark_arguments()
+    functions = []
+    for module in (data_utils, dashboard_utils):
+        short = module.__name__.split(".")[-1]
+        for name in sorted(dir(module)):
+            func = getattr(module, name)
+            if not name.startswith(("get_", "generate_")) or not callable(func):
+                continue
+            if getattr(func, "__module__", None) != module.__name__:
+                continue
+            args = arguments.get(name, ())
+            required = [p for p in inspect.signature(func).parameters.values() if p.default is p.empty]
+            if len(required) > len(args):
+                continue
+            functions.append((f"{short}.{name}", func, args))
+    return functions
+
+# Mesurer chaque fonction sans cache (attribut .uncached) : {nom: résumé des durées + taille}
+# Les generate_* sont mesurées avec le cache des requêtes chaud (coût du rendu seul)
+def micro_benchmarks(repeat=5, on_result=None):
+    report = {}
+    for name, func, args in model_functions():
+        uncached = getattr(func, "uncached", func)
+        samples, result = [], None
+        try:
+            if ".generate_" in name:
+                func(*args)
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = uncached(*args)
+                samples.append(time.perf_counter() - start)
+        except Exception as e:
+            # ex. : fichiers GeoJSON absents ; la fonction est signalée sans interrompre les mesures
+            report[name] = {"error": f"{type(e).__name__}: {e}"}
+        else:
+            report[name] = dict(summarize(samples), **result_size(result))
+        if on_result:
+            on_result(name, report[name])
+    return report
+
+###################################################################
+# Test de charge HTTP
+
+# URL mesurées : toutes les pages préchauffées (onglets, vues, API, tableau de bord) et les exports
+def load_test_urls():
+    from models.warmup_utils import warmup_urls
+    from controllers.main_controller import QUERY_HEADERS
+    urls = warmup_urls()
+    for query_type in QUERY_HEADERS:
+        urls.append(f"/download_csv?query={query_type}")
+        urls.append(f"/download_excel?query={query_type}")
+    return urls
+
+# Exécuter une requête (corps lu en entier, y compris les réponses en flux) : (durée, statut, octets)
+def _request(client, url):
+    start = time.perf_counter()
+    response = client.get(url)
+    size = len(response.get_data())
+    return time.perf_counter() - start, response.status_code, size
+
+# Premier passage séquentiel (caches froids) puis "requests" requêtes réparties sur "concurrency" threads
+# Renvoie {"cold": {url: ms}, "urls": {url: résumé}, "overall": résumé, "throughput_rps", "errors", "peak_rss_mb"}
+def load_test(app, urls, requests=200, concurrency=8):
+    client = app.test_client()
+    cold = {}
+    for url in urls:
+        duration, status, _ = _request(client, url)
+        cold[url] = {"ms": round(duration * 1000, 3), "status": status}
+
+    local = threading.local()
+    def worker(i):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        url = urls[i % len(urls)]
+        return (url,) + _request(local.client, url)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(requests)))
+    wall = time.perf_counter() - start
+
+    per_url = {}
+    for url, duration, status, size in results:
+        entry = per_url.setdefault(url, {"samples": [], "errors": 0, "bytes": size})
+        entry["samples"].append(duration)
+        entry["errors"] += status >= 400
+    return {
+        "cold": cold,
+        "urls": {url: dict(summarize(e["samples"]), errors=e["errors"], bytes=e["bytes"])
+                 for url, e in per_url.items()},
+        "overall": summarize([r[1] for r in results]),
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / wall, 1) if wall else None,
+        "errors": sum(r[2] >= 400 for r in results),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+###################################################################
+# Mémoire : résultats en lignes (sqlite3.Row) ou en colonnes (config.COMPACT_ROWS)
+
+# Exécuter func en suivant les allocations : (résultat, Kio retenus à la fin, pic en Kio)
+def traced(func):
+    tracemalloc.start()
+    try:
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, round(current / 1024, 1), round(peak / 1024, 1)
+
+# Pour chaque onglet et chaque représentation : mémoire retenue et pic de la fonction get_*,
+# pic des requêtes /api/<onglet> (JSON) et /?query=<onglet> (tableau rendu par le template)
+# Les caches sont désactivés pendant la mesure : chaque requête relit la base
+def memory_benchmarks(app, on_result=None):
+    from controllers.main_controller import QUERY_FUNCTIONS
+    saved = (config.COMPACT_ROWS, config.QUERY_CACHE_ENABLED, config.FRAGMENT_CACHE_ENABLED, config.TABLE_SERVER_SIDE)
+    config.QUERY_CACHE_ENABLED = config.FRAGMENT_CACHE_ENABLED = config.TABLE_SERVER_SIDE = False
+    client = app.test_client()
+    report = {}
+    try:
+        for query_type, func in QUERY_FUNCTIONS.items():
+            entry = {}
+            for mode, compact in (("row_objects", False), ("columns", True)):
+                config.COMPACT_ROWS = compact
+                result, retained, peak = traced(getattr(func, "uncached", func))
+                _, _, api_peak = traced(lambda: client.get(f"/api/{query_type}").get_data())
+                _, _, table_peak = traced(lambda: client.get(f"/?query={query_type}&view=table").get_data())
+                entry[mode] = {"retained_kb": retained, "peak_kb": peak,
+                               "api_peak_kb": api_peak, "table_peak_kb": table_peak}
+                entry["rows"] = len(result)
+            before, after = entry["row_objects"], entry["columns"]
+            entry["reduction"] = {key: round(1 - after[key] / before[key], 3) for key in before if before[key]}
+            report[query_type] = entry
+            if on_result:
+                on_result(query_type, entry)
+    finally:
+        config.COMPACT_ROWS, config.QUERY_CACHE_ENABLED, config.FRAGMENT_CACHE_ENABLED, config.TABLE_SERVER_SIDE = saved
+    return report
+
+###################################################################
+# Comparaison de deux résultats (détection des régressions)
+
+# Comparer les p50 des micro-mesures et des URL : [(section, nom, avant, après, rapport)]
+# seules les lignes dont le rapport dépasse "threshold" et l'écart "min_delta_ms" sont renvoyées
+# (les durées inférieures à la milliseconde varient trop d'une exécution à l'autre)
+def compare_results(previous, current, threshold=1.2, min_delta_ms=1.0):
+    regressions = []
+    sections = [("micro", previous.get("micro", {}), current.get("micro", {})),
+                ("load", previous.get("load", {}).get("urls", {}), current.get("load", {}).get("urls", {}))]
+    for section, before, after in sections:
+        for name, entry in after.items():
+            old, new = before.get(name, {}).get("p50"), entry.get("p50")
+            if old and new and new / old > threshold and new - old > min_delta_ms:
+                regressions.append((section, name, old, new, round(new / old, 2)))
+    return regressions
@@ -0,0 +1,134 @@
+# models/cache_utils.py
+
+# Cache en mémoire des résultats des fonctions get_* (LRU avec budget mémoire)
+# La clé contient la version de la base : remplacer WorldPopulation.db invalide le cache
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import sys                      # pour estimer la taille des résultats en mémoire
+import threading                # pour protéger le cache entre les threads
+import functools                # pour écrire le décorateur
+from collections import OrderedDict                 # ordre d'utilisation pour l'éviction LRU
+from models.db_utils import get_db_version          # identité du fichier de la base
+from models.result_utils import ResultSet           # résultats stockés par colonnes
+
+# Estimer l'empreinte mémoire d'un résultat (liste de lignes)
+def estimate_size(value):
+    if isinstance(value, ResultSet):
+        return value.nbytes()
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for row in value:
+            size += sys.getsizeof(row)
+            if isinstance(row, (str, bytes)):
+                continue
+            try:
+                size += sum(sys.getsizeof(cell) for cell in row)
+            except TypeError:
+                pass
+    return size
+
+class QueryCache:
+    """Cache LRU thread-safe borné par un budget mémoire (en octets)."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = config.QUERY_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._entries = OrderedDict()   # clé -> (valeur, taille)
+        self._lock = threading.Lock()
+        self._version = None
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Lire une entrée ; renvoie (True, valeur) ou (False, None)
+    def get(self, key):
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    # Ajouter une entrée puis évincer les moins récemment utilisées si le budget est dépassé
+    def put(self, key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._check_version()
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    # Vider le cache dès que la base a changé (les anciennes entrées ne seront plus jamais lues)
+    def _check_version(self):
+        version = get_db_version()
+        if version != self._version:
+            self._entries.clear()
+            self.current_bytes = 0
+            self._version = version
+
+    # Compteurs exposés par la route /cache_stats
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "db_version": self._version,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+# Cache partagé par toutes les fonctions get_* du processus
+query_cache = QueryCache()
+
+# Clé du cache : fonction, arguments et version de la base
+def cache_key(func, args, kwargs):
+    return (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())), get_db_version())
+
+# Résultat déjà en cache d'une fonction décorée par @cached_query, ou None (sans exécuter la requête)
+def peek_cached(cached_func, *args, **kwargs):
+    if not config.QUERY_CACHE_ENABLED:
+        return None
+    found, value = query_cache.get(cache_key(cached_func.uncached, args, kwargs))
+    return value if found else None
+
+# Décorateur : mémoriser le résultat d'une fonction get_* pour la version courante de la base
+def cached_query(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not config.QUERY_CACHE_ENABLED:
+            return func(*args, **kwargs)
+        key = cache_key(func, args, kwargs)
+        found, value = query_cache.get(key)
+        if not found:
+            value = func(*args, **kwargs)
+            # ResultSet : conservé tel quel (lecture seule) ; liste : figée en tuple
+            if not isinstance(value, ResultSet):
+                value = tuple(value)
+            # Un résultat vide signale souvent une requête en erreur : ne pas le mémoriser
+            if value:
+                query_cache.put(key, value)
+        # Renvoyer une copie : l'appelant peut modifier sa liste sans altérer le cache
+        return value if isinstance(value, ResultSet) else list(value)
+    wrapper.uncached = func
+    return wrapper
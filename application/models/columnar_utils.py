@@ -0,0 +1,295 @@
+# models/columnar_utils.py
+
+# Moteur en mémoire optionnel : les colonnes utiles de fact_population sont chargées une seule fois
+# (par version de la base) dans des tableaux NumPy, avec les codes de lieu encodés en entiers et la
+# hiérarchie pays -> sous-région -> région -> continent précalculée.
+# Les fonctions get_* de data_utils et dashboard_utils lui délèguent leurs agrégats (sommes par année,
+# parts régionales, top N) quand il est activé : aucun aller-retour SQL ni tuple Python par ligne lue.
+# Les résultats ont les mêmes colonnes, dans le même ordre, que les requêtes SQL correspondantes.
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import threading                # pour protéger le chargement entre les threads
+from models.db_utils import pooled_connection, get_db_version
+
+# NumPy est optionnel (pip install numpy) : sans lui, les requêtes SQL sont utilisées
+# Il n'est importé qu'au premier chargement du magasin (démarrage rapide si le moteur est désactivé)
+np = None
+
+def _import_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+# Colonnes chargées : nom court -> (colonne de fact_population, facteur appliqué comme dans les requêtes SQL)
+COLUMNS = {
+    "total": ("TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)", 1000),
+    "male": ("MALE POPULATION. AS OF 1 JULY (THOUSANDS)", 1000),
+    "female": ("FEMALE POPULATION. AS OF 1 JULY (THOUSANDS)", 1000),
+    "density": ("POPULATION DENSITY. AS OF 1 JULY (PERSONS PER SQUARE KM)", 1),
+    "life": ("LIFE EXPECTANCY AT BIRTH. BOTH SEXES (YEARS)", 1),
+    "death": ("CRUDE DEATH RATE (DEATHS PER 1.000 POPULATION)", 1),
+    "birth": ("CRUDE BIRTH RATE (BIRTHS PER 1.000 POPULATION)", 1),
+}
+
+WORLD_CODE = 900
+
+# Regroupement des régions en continents (même règle que le CASE de SQL_POPULATION_BY_CONTINENT)
+CONTINENT_RULES = [("Africa", "Africa"), ("Europe", "Europe"), ("Asia", "Asia"),
+                   ("Northern America", "North America"), ("South America", "South America"),
+                   ("Oceania", "Oceania")]
+
+def continent_label(region_name):
+    for keyword, label in CONTINENT_RULES:
+        if keyword.lower() in (region_name or "").lower():
+            return label
+    return "Other"
+
+class ColumnStore:
+    """Colonnes de fact_population en tableaux NumPy et hiérarchie des lieux encodée en entiers."""
+
+    def __init__(self, conn):
+        # --- faits : une ligne par (lieu, année)
+        select = ", ".join(f'"{column}"' for column, _ in COLUMNS.values())
+        rows = conn.execute(f"SELECT location_code, year, {select} FROM fact_population").fetchall()
+        data = np.array(rows, dtype=np.float64).reshape(-1, 2 + len(COLUMNS))
+        self.rows = len(data)
+        self.location_codes, self.loc = np.unique(data[:, 0].astype(np.int64), return_inverse=True)
+        self.years, self.year = np.unique(data[:, 1].astype(np.int64), return_inverse=True)
+        self.values = {name: data[:, 2 + i] * factor for i, (name, (_, factor)) in enumerate(COLUMNS.items())}
+        # colonnes entières dans SQLite (sans NULL) : les sommes sont renvoyées en entiers, comme en SQL
+        self.integer = {}
+        for name, (column, _) in COLUMNS.items():
+            count = conn.execute(
+                f"SELECT COUNT(*) FROM fact_population WHERE typeof(\"{column}\") <> 'integer'").fetchone()[0]
+            self.integer[name] = count == 0
+
+        # --- hiérarchie : pour chaque lieu (indice), noms du pays et de ses ancêtres
+        tables = {}
+        for table in ("country", "subregion", "region", "continent"):
+            tables[table] = {code: (name, parent) for code, name, parent
+                             in conn.execute(f"SELECT location_code, name, parent_code FROM {table}")}
+        countries, subregions, regions, continents = (tables[t] for t in ("country", "subregion", "region", "continent"))
+
+        size = len(self.location_codes)
+        self.region_names = sorted({name for name, _ in regions.values()})
+        region_index = {name: i for i, name in enumerate(self.region_names)}
+        self.is_region = np.zeros(size, dtype=bool)      # le lieu est une région (table region)
+        self.region_of = np.full(size, -1, dtype=np.int64)   # lieu région : indice de son nom
+        self.country_region = np.full(size, -1, dtype=np.int64)  # pays : indice du nom de sa région
+        self.country_ranked = np.zeros(size, dtype=bool)  # pays dont la hiérarchie va jusqu'au continent
+        self.labels = [None] * size                       # pays : (pays, sous-région, région, continent)
+        for i, code in enumerate(self.location_codes.tolist()):
+            if code in regions:
+                self.is_region[i] = True
+                self.region_of[i] = region_index[regions[code][0]]
+            if code not in countries:
+                continue
+            name, sub_code = countries[code]
+            if sub_code not in subregions:
+                continue
+            sub_name, region_code = subregions[sub_code]
+            if region_code not in regions:
+                continue
+            region_name, continent_code = regions[region_code]
+            self.country_region[i] = region_index[region_name]
+            continent = continents.get(continent_code)
+            self.country_ranked[i] = continent is not None
+            self.labels[i] = (name, sub_name, region_name, continent[0] if continent else None)
+
+    # Tableaux NumPy du magasin (les valeurs d'indicateurs s'ajoutent sous le nom values_<indicateur>)
+    ARRAYS = ("location_codes", "loc", "years", "year", "is_region", "region_of", "country_region", "country_ranked")
+
+    # Tableaux et métadonnées JSON du magasin, pour l'instantané partagé entre processus (snapshot_utils)
+    def to_snapshot(self):
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays.update({f"values_{name}": values for name, values in self.values.items()})
+        meta = {"rows": self.rows, "integer": self.integer, "region_names": self.region_names, "labels": self.labels}
+        return arrays, meta
+
+    # Magasin reconstruit à partir d'un instantané (tableaux en mmap : aucune copie)
+    @classmethod
+    def from_snapshot(cls, arrays, meta):
+        store = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(store, name, arrays[name])
+        store.values = {name: arrays[f"values_{name}"] for name in COLUMNS}
+        store.rows = meta["rows"]
+        store.integer = meta["integer"]
+        store.region_names = meta["region_names"]
+        store.labels = [tuple(label) if label is not None else None for label in meta["labels"]]
+        return store
+
+    # Valeurs de sortie : entiers Python si la colonne est entière dans SQLite, sinon flottants
+    def _output(self, name, values):
+        values = np.asarray(values)
+        if self.integer[name] and not np.isnan(values).any():
+            return values.astype(np.int64).tolist()
+        return [None if v != v else v for v in values.tolist()]
+
+    # Somme par groupe (NULL ignorés comme SUM en SQL) : renvoie (sommes, nombre de valeurs non NULL)
+    @staticmethod
+    def _group_sum(groups, values, count):
+        present = ~np.isnan(values)
+        sums = np.bincount(groups[present], weights=values[present], minlength=count)
+        counts = np.bincount(groups[present], minlength=count)
+        return sums, counts
+
+    ###################################################################
+    # Équivalents des requêtes SQL de data_utils et dashboard_utils
+
+    # SQL_WORLD_POPULATION_BY_YEAR : (année, hommes, femmes, total) pour la somme des régions
+    def world_population_by_year(self):
+        mask = self.is_region[self.loc]
+        year = self.year[mask]
+        male = np.nan_to_num(self.values["male"][mask])
+        female = np.nan_to_num(self.values["female"][mask])
+        count = len(self.years)
+        male_sum = np.bincount(year, weights=male, minlength=count)
+        female_sum = np.bincount(year, weights=female, minlength=count)
+        present = np.bincount(year, minlength=count) > 0
+        males, females = self._output("male", male_sum[present]), self._output("female", female_sum[present])
+        return [(y, m, f, m + f) for y, m, f in zip(self.years[present].tolist(), males, females)]
+
+    # SQL_POPULATION_BY_CONTINENT : (continent, année, population), trié par année puis population décroissante
+    def population_by_continent(self):
+        labels = sorted({continent_label(name) for name in self.region_names})
+        label_of_region = np.array([labels.index(continent_label(name)) for name in self.region_names], dtype=np.int64)
+        mask = self.is_region[self.loc]
+        label = label_of_region[self.region_of[self.loc[mask]]]
+        groups = label * len(self.years) + self.year[mask]
+        sums, counts = self._group_sum(groups, self.values["total"][mask], len(labels) * len(self.years))
+        keys = np.flatnonzero(np.bincount(groups, minlength=len(sums)))
+        populations = sums[keys]
+        order = np.lexsort((-populations, keys % len(self.years)))
+        keys, values = keys[order], self._output("total", populations[order])
+        values = [v if counts[k] else None for k, v in zip(keys.tolist(), values)]
+        return [(labels[k // len(self.years)], int(self.years[k % len(self.years)]), v)
+                for k, v in zip(keys.tolist(), values)]
+
+    # SQL_POPULATION_BY_REGION : (région, année, population), trié par région puis année
+    def population_by_region(self):
+        mask = self.is_region[self.loc]
+        groups = self.region_of[self.loc[mask]] * len(self.years) + self.year[mask]
+        sums, counts = self._group_sum(groups, self.values["total"][mask], len(self.region_names) * len(self.years))
+        keys = np.flatnonzero(np.bincount(groups, minlength=len(sums)))
+        values = self._output("total", sums[keys])
+        return [(self.region_names[k // len(self.years)], int(self.years[k % len(self.years)]),
+                 v if counts[k] else None) for k, v in zip(keys.tolist(), values)]
+
+    # SQL_TOP_10_COUNTRIES : les n pays les plus peuplés de chaque année
+    # (année, pays, sous-région, région, continent, population), trié par année puis population décroissante
+    def top_countries(self, n=10):
+        rows = np.flatnonzero(self.country_ranked[self.loc])
+        population = self.values["total"][rows]
+        # NULL en dernier dans un tri décroissant (plus petite valeur en SQLite)
+        order = np.lexsort((-np.nan_to_num(population, nan=-np.inf), self.year[rows]))
+        rows, population, year = rows[order], population[order], self.year[rows[order]]
+        first = np.searchsorted(year, year, side="left")
+        keep = np.arange(len(rows)) - first < n
+        rows, population = rows[keep], population[keep]
+        values = self._output("total", population)
+        return [(int(self.years[self.year[r]]), *self.labels[self.loc[r]], v)
+                for r, v in zip(rows.tolist(), values)]
+
+    # SQL_EUROPE_POPULATION_BY_YEAR : (année, pays, population, densité) des pays de la région "Europe"
+    def europe_population_by_year(self, region="Europe"):
+        if region not in self.region_names:
+            return []
+        rows = np.flatnonzero(self.country_region[self.loc] == self.region_names.index(region))
+        names = [self.labels[l][0] for l in self.loc[rows].tolist()]
+        name_order = {name: i for i, name in enumerate(sorted(set(names)))}
+        order = np.lexsort((self.year[rows], np.array([name_order[n] for n in names], dtype=np.int64)))
+        rows = rows[order]
+        population = self._output("total", self.values["total"][rows])
+        density = self._output("density", self.values["density"][rows])
+        return [(int(self.years[self.year[r]]), self.labels[self.loc[r]][0], p, d)
+                for r, p, d in zip(rows.tolist(), population, density)]
+
+    # SQL_SEX_RATIO : (année, hommes, femmes, ratio H/F * 100) du monde entre 1950 et 2023
+    def sex_ratio(self, year_from=1950, year_to=2023):
+        index = np.searchsorted(self.location_codes, WORLD_CODE)
+        if index >= len(self.location_codes) or self.location_codes[index] != WORLD_CODE:
+            return []
+        rows = np.flatnonzero(self.loc == index)
+        years = self.years[self.year[rows]]
+        rows = rows[(years >= year_from) & (years <= year_to)]
+        rows = rows[np.argsort(self.year[rows], kind="stable")]
+        male, female = self.values["male"][rows], self.values["female"][rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = male / female * 100
+        return [(int(self.years[self.year[r]]), m, f, None if r_ != r_ or f == 0 else round(r_, 2))
+                for r, m, f, r_ in zip(rows.tolist(), self._output("male", male), self._output("female", female),
+                                       ratio.tolist())]
+
+    # SQL_COUNTRY_REGION_SHARE : part de chaque pays dans la population de sa région, par année
+    # (région, pays, année, pop. pays, pop. région, part en %), trié par année décroissante, région, part décroissante
+    def country_region_share(self):
+        rows = np.flatnonzero(self.country_region[self.loc] >= 0)
+        region = self.country_region[self.loc[rows]]
+        year = self.year[rows]
+        population = self.values["total"][rows]
+        count = len(self.region_names) * len(self.years)
+        region_sums, region_counts = self._group_sum(region * len(self.years) + year, population, count)
+        region_population = region_sums[region * len(self.years) + year]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            share = np.round(population / region_population * 100, 2)
+        order = np.lexsort((-np.nan_to_num(share, nan=-np.inf), region, -year))
+        rows, share, region_population = rows[order], share[order], region_population[order]
+        populations = self._output("total", population[order])
+        totals = self._output("total", region_population)
+        return [(self.region_names[self.country_region[self.loc[r]]], self.labels[self.loc[r]][0],
+                 int(self.years[self.year[r]]), p, t, None if s != s else s)
+                for r, p, t, s in zip(rows.tolist(), populations, totals, share.tolist())]
+
+    # SQL_DASHBOARD_KPIS : (année, hommes, femmes, espérance de vie, mortalité, natalité) des deux années
+    # populations = somme des régions, taux = valeurs du monde (location_code 900)
+    def dashboard_kpis(self, year_from, year_to):
+        totals = {row[0]: row[1:3] for row in self.world_population_by_year()}
+        rates = {}
+        index = np.searchsorted(self.location_codes, WORLD_CODE)
+        if index < len(self.location_codes) and self.location_codes[index] == WORLD_CODE:
+            for r in np.flatnonzero(self.loc == index).tolist():
+                values = (self.values[name][r] for name in ("life", "death", "birth"))
+                rates[int(self.years[self.year[r]])] = tuple(None if v != v else float(v) for v in values)
+        return [(year,) + totals.get(year, (0, 0)) + rates.get(year, (None, None, None))
+                for year in sorted({year_from, year_to}) if year in totals or year in rates]
+
+###################################################################
+# Magasin du processus, chargé une fois par version de la base
+
+_store = None
+_store_version = None
+_store_lock = threading.Lock()
+
+# Magasin de la version courante de la base, ou None (désactivé, NumPy absent ou chargement impossible)
+# L'instantané partagé entre processus (snapshot_utils) est utilisé en priorité quand il est disponible
+def get_store():
+    global _store, _store_version
+    if not (config.COLUMNAR_ENGINE or config.SNAPSHOT_ENABLED) or not _import_numpy():
+        return None
+    # import local : snapshot_utils importe ce module
+    from models import snapshot_utils
+    snapshot = snapshot_utils.get_snapshot()
+    if snapshot is not None:
+        return snapshot.store
+    if not config.COLUMNAR_ENGINE:
+        return None
+    version = get_db_version()
+    if _store_version == version:
+        return _store
+    with _store_lock:
+        if _store_version != version:
+            try:
+                with pooled_connection() as conn:
+                    _store = ColumnStore(conn)
+            except Exception as e:
+                print(f"Moteur en mémoire indisponible : {e}")
+                _store = None
+            _store_version = version
+    return _store
@@ -0,0 +1,174 @@
+# models/compress_utils.py
+
+# Compression des réponses (gzip, et brotli s'il est installé) et fichiers statiques précompressés
+# - choix de l'encodage d'après l'en-tête Accept-Encoding du navigateur (brotli préféré à qualité égale)
+# - corps déjà compressés gardés en mémoire par ETag : une page en cache n'est compressée qu'une fois
+# - précompression des fichiers de static/ (script precompress.py) : fichiers .gz et .br à côté des originaux,
+#   compressés au niveau maximal une fois pour toutes et servis tels quels
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import os                       # pour parcourir le dossier static
+import gzip                     # compression gzip
+import shutil                   # copie par blocs des fichiers à compresser
+import tempfile                 # écriture atomique des fichiers précompressés
+import threading                # pour protéger le cache entre les threads
+from collections import OrderedDict                 # ordre d'utilisation pour l'éviction LRU
+
+# brotli est optionnel (pip install brotli) : sans lui, seul gzip est proposé
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Extensions des fichiers précompressés, par encodage
+EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+# Types de contenu compressibles (texte, JSON, tuiles vectorielles) ; les images et classeurs le sont déjà
+COMPRESSIBLE_MIMETYPES = {
+    "text/html", "text/css", "text/plain", "text/csv", "text/javascript", "application/javascript",
+    "application/json", "application/geo+json", "image/svg+xml", "application/vnd.mapbox-vector-tile",
+}
+# Extensions des fichiers statiques à précompresser
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".json", ".geojson", ".svg", ".csv", ".txt")
+
+# Types absents du module mimetypes
+STATIC_MIMETYPES = {".geojson": "application/geo+json"}
+
+# Encodages proposés, par ordre de préférence
+def available_encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+# Meilleur encodage accepté par le navigateur (Accept-Encoding, avec ses qualités), ou None
+# encodings : encodages possibles (par défaut, ceux disponibles) ; une liste vide donne None
+def choose_encoding(accept_encodings, encodings=None):
+    best, best_quality = None, 0
+    for encoding in (available_encodings() if encodings is None else encodings):
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def is_compressible(mimetype):
+    return mimetype in COMPRESSIBLE_MIMETYPES
+
+# Compresser un corps de réponse (niveaux rapides : compression à la volée)
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=config.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=config.COMPRESS_GZIP_LEVEL, mtime=0)
+
+###################################################################
+# Corps compressés en mémoire, par ETag (LRU borné par un budget en octets)
+
+class CompressedCache:
+    """Corps compressés des réponses identifiées par un ETag fort : {(etag, encodage): octets}."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+
+    def get_or_compress(self, etag, encoding, data):
+        key = (etag, encoding)
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+        body = compress(data, encoding)
+        max_bytes = config.COMPRESS_CACHE_MAX_BYTES if self.max_bytes is None else self.max_bytes
+        if len(body) <= max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = body
+                    self.current_bytes += len(body)
+                while self.current_bytes > max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.current_bytes -= len(evicted)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+# Cache partagé par tout le processus
+compressed_cache = CompressedCache()
+
+# Corps compressé d'une réponse : mis en cache si son ETag (fort) identifie le contenu
+def compress_body(data, encoding, etag=None):
+    if etag is None:
+        return compress(data, encoding)
+    return compressed_cache.get_or_compress(etag, encoding, data)
+
+###################################################################
+# Fichiers statiques précompressés
+
+# Version précompressée d'un fichier pour le navigateur : (encodage, chemin), ou (None, None)
+# Une version plus ancienne que l'original (fichier modifié depuis la précompression) est ignorée
+def precompressed_variant(path, accept_encodings):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, None
+    candidates = {}
+    for encoding, extension in EXTENSIONS.items():
+        try:
+            if os.stat(path + extension).st_mtime_ns >= mtime:
+                candidates[encoding] = path + extension
+        except OSError:
+            continue
+    encoding = choose_encoding(accept_encodings, [e for e in ("br", "gzip") if e in candidates])
+    return (encoding, candidates[encoding]) if encoding else (None, None)
+
+# Écrire une version compressée d'un fichier (par blocs : les GeoJSON de plusieurs dizaines de Mo
+# ne sont jamais entièrement en mémoire), dans un fichier temporaire renommé à la fin
+def _write_compressed(path, encoding):
+    target = path + EXTENSIONS[encoding]
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with open(path, "rb") as source, os.fdopen(fd, "wb") as out:
+            if encoding == "br":
+                compressor = brotli.Compressor(quality=11)
+                for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                    out.write(compressor.process(chunk))
+                out.write(compressor.finish())
+            else:
+                with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=9, mtime=0) as compressed:
+                    shutil.copyfileobj(source, compressed, 1024 * 1024)
+        shutil.copystat(path, tmp_path)          # même date que l'original : la version n'est pas périmée
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return os.path.getsize(target)
+
+# Précompresser les fichiers d'un dossier : [(chemin, taille, {encodage: taille compressée})]
+# Les fichiers à jour sont ignorés (sauf force=True), ainsi que ceux dont la version compressée n'est pas plus petite
+def precompress_directory(directory, min_size=None, force=False, on_file=None):
+    min_size = config.COMPRESS_MIN_SIZE if min_size is None else min_size
+    report = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if not name.lower().endswith(COMPRESSIBLE_EXTENSIONS) or os.path.getsize(path) < min_size:
+                continue
+            size, sizes = os.path.getsize(path), {}
+            for encoding in available_encodings():
+                target = path + EXTENSIONS[encoding]
+                if not force and os.path.exists(target) and os.stat(target).st_mtime_ns >= os.stat(path).st_mtime_ns:
+                    continue
+                sizes[encoding] = _write_compressed(path, encoding)
+                if sizes[encoding] >= size:
+                    os.remove(target)           # aucun gain : le fichier est servi tel quel
+            if sizes:
+                report.append((path, size, sizes))
+                if on_file:
+                    on_file(path, size, sizes)
+    return report
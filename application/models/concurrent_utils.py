@@ -0,0 +1,92 @@
+# models/concurrent_utils.py
+
+# Exécution concurrente des fonctions des modèles : une vue lance plusieurs requêtes indépendantes
+# sur un pool de threads (chacune avec sa connexion du pool SQLite) et attend la plus lente,
+# au lieu d'additionner leurs durées. Au-delà du délai, les requêtes encore en cours sont interrompues
+# (sqlite3.Connection.interrupt) et celles qui n'ont pas commencé sont annulées.
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import threading                # pour protéger la création du pool de threads
+import contextvars              # portée d'annulation et mesures (Server-Timing) transmises aux threads
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+class QueryTimeout(TimeoutError):
+    """Délai dépassé pour un groupe de requêtes concurrentes."""
+
+class QueryCancelled(RuntimeError):
+    """Requête abandonnée : son groupe a été annulé (délai dépassé ou erreur d'une autre requête)."""
+
+class CancelScope:
+    """Connexions utilisées par un groupe de tâches, interrompues si le groupe est annulé."""
+
+    def __init__(self):
+        self.cancelled = False
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    # Appelé par db_utils.pooled_connection à l'emprunt et au retour d'une connexion
+    def register(self, conn):
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled("Groupe de requêtes annulé")
+            self._connections.add(conn)
+
+    def unregister(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+
+    # Interrompre les requêtes en cours : elles échouent avec sqlite3.OperationalError("interrupted")
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            for conn in self._connections:
+                conn.interrupt()
+
+_scope = contextvars.ContextVar("cancel_scope", default=None)
+
+# Portée d'annulation de la tâche en cours (None hors de run_parallel)
+def current_scope():
+    return _scope.get()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Pool de threads du processus (créé au premier appel, au plus une connexion SQLite par thread)
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config.CONCURRENT_WORKERS or config.DB_POOL_SIZE,
+                                               thread_name_prefix="query")
+    return _executor
+
+# Exécuter des fonctions sans argument en parallèle : {nom: fonction} -> {nom: résultat}
+# timeout : délai global en secondes (None : config.QUERY_TIMEOUT) ; au-delà, QueryTimeout est levée
+# La première erreur d'une tâche annule les autres et est relevée telle quelle
+def run_parallel(tasks, timeout=None):
+    timeout = config.QUERY_TIMEOUT if timeout is None else timeout
+    # Une seule tâche, ou appel depuis une tâche déjà parallèle (pas de pool imbriqué) : exécution directe
+    if len(tasks) <= 1 or not config.CONCURRENT_QUERIES or current_scope() is not None:
+        return {name: func() for name, func in tasks.items()}
+
+    scope = CancelScope()
+    def run(func):
+        _scope.set(scope)
+        return func()
+
+    executor = get_executor()
+    # chaque tâche s'exécute dans une copie du contexte : ses mesures s'ajoutent à celles de la requête HTTP
+    futures = {name: executor.submit(contextvars.copy_context().run, run, func) for name, func in tasks.items()}
+    done, pending = wait(futures.values(), timeout=timeout, return_when=FIRST_EXCEPTION)
+    if pending:
+        scope.cancel()
+        for future in pending:
+            future.cancel()
+        failed = [f for f in done if f.exception() is not None]
+        if failed:
+            raise failed[0].exception()
+        late = [name for name, future in futures.items() if future in pending]
+        raise QueryTimeout(f"Délai de {timeout} s dépassé pour : {', '.join(late)}")
+    return {name: future.result() for name, future in futures.items()}
@@ -1,103 +1,114 @@
 # models/dashboard_utils.py
 
-import pandas as pd
-from models import data_utils as du
-from models.db_utils import get_db_connection
-import locale
+from models.db_utils import pooled_connection
+from models.cache_utils import cached_query
+from models import columnar_utils as cs       # moteur en mémoire optionnel (NumPy)
 
-# Configurer la locale pour le formatage des nombres en français
-locale.setlocale(locale.LC_NUMERIC, 'fr_FR.UTF-8')
-
-# indicateurs clés sur les différentes mesures démographiques et leur évolution entre 1950 et 2023
+# indicateurs clés sur les différentes mesures démographiques et leur évolution entre deux années
 # les différents indicateurs sont assemblés ausein d'une même page HTML pour former un tableau de bord
 # Chaque indicateur est représenté sous forme d'une carte de type "carte de visite" (card)
 
-# Récupération de la mortalité, de l'espérance de vie et du taux de natalité mondiale par année
-def get_additional_demographic_data():
-    # Connection à la base de données
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = """
+# Années par défaut du tableau de bord
+DEFAULT_YEAR_FROM = 1950
+DEFAULT_YEAR_TO = 2023
+
+# Tous les indicateurs des deux années en une seule requête (index sur year, location_code) :
+# - populations masculine et féminine mondiales = somme des régions (comme get_world_population_by_year)
+# - espérance de vie, mortalité et natalité = valeurs de l'agrégat "Monde" (location_code 900)
+SQL_DASHBOARD_KPIS = """
     SELECT
-        year, 
-        "LIFE EXPECTANCY AT BIRTH. BOTH SEXES (YEARS)" AS life_expectancy,
-        "CRUDE DEATH RATE (DEATHS PER 1.000 POPULATION)" AS mortality_rate,
-        "CRUDE BIRTH RATE (BIRTHS PER 1.000 POPULATION)" AS birth_rate
-    FROM fact_population
-    WHERE year IN (1950, 2023) AND location_code = '900'
-    ORDER BY year;
+        fp.year,
+        SUM(CASE WHEN r.location_code IS NOT NULL
+                 THEN IFNULL(fp."MALE POPULATION. AS OF 1 JULY (THOUSANDS)", 0) * 1000
+                 ELSE 0 END) AS male_population,
+        SUM(CASE WHEN r.location_code IS NOT NULL
+                 THEN IFNULL(fp."FEMALE POPULATION. AS OF 1 JULY (THOUSANDS)", 0) * 1000
+                 ELSE 0 END) AS female_population,
+        MAX(CASE WHEN fp.location_code = 900
+                 THEN fp."LIFE EXPECTANCY AT BIRTH. BOTH SEXES (YEARS)" END) AS life_expectancy,
+        MAX(CASE WHEN fp.location_code = 900
+                 THEN fp."CRUDE DEATH RATE (DEATHS PER 1.000 POPULATION)" END) AS mortality_rate,
+        MAX(CASE WHEN fp.location_code = 900
+                 THEN fp."CRUDE BIRTH RATE (BIRTHS PER 1.000 POPULATION)" END) AS birth_rate
+    FROM fact_population fp
+    LEFT JOIN region r ON r.location_code = fp.location_code
+    WHERE fp.year IN (?, ?)
+      AND (r.location_code IS NOT NULL OR fp.location_code = 900)
+    GROUP BY fp.year
+    ORDER BY fp.year;
     """
-    # Exécuter la requête, récupérer et renvoyer les résultats
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
-    return results
-
-def generate_population_dashboard():
-    # Récupérer les données nécessaires
-    data = du.get_world_population_by_year()
-
-    # Créer un DataFrame Pandas avec les données
-    df = pd.DataFrame(data, columns=["Année", "Hommes", "Femmes", "Total"])
-
-    # Indicateur 1 : Population mondiale en 1950
-    population_1950 = df[df["Année"] == 1950]["Total"].values[0]
-
-    # Indicateur 2 : Population mondiale en 2023
-    population_2023 = df[df["Année"] == 2023]["Total"].values[0]
-
-    # Indicateur 3 : Croissance de la population entre 1950 et 2023
-    growth_population = ((population_2023 - population_1950) / population_1950) * 100
 
-    # Indicateur 4 : Population masculine en 1950
-    male_population_1950 = df[df["Année"] == 1950]["Hommes"].values[0]
-
-    # Indicateur 5 : Population masculine en 2023
-    male_population_2023 = df[df["Année"] == 2023]["Hommes"].values[0]
-
-    #Indicateur 6 : Croissance de la population masculine entre 1950 et 2023
-    growth_male_population = ((male_population_2023 - male_population_1950) / male_population_1950) * 100
-
-    # Indicateur 7 : Population féminine en 1950
-    female_population_1950 = df[df["Année"] == 1950]["Femmes"].values[0]
-
-    # Indicateur 8 : Population féminine en 2023
-    female_population_2023 = df[df["Année"] == 2023]["Femmes"].values[0]
-
-    # Indicateur 9 : Croissance de la population féminine entre 1950 et 2023
-    growth_female_population = ((female_population_2023 - female_population_1950) / female_population_1950) * 100
+# Années disponibles dans la base (pour valider les paramètres ?from=&to=)
+SQL_AVAILABLE_YEARS = """
+    SELECT DISTINCT year FROM fact_population WHERE location_code = 900 ORDER BY year;
+    """
 
-    additional_data = get_additional_demographic_data()
-    
-    # Indicateurs 11 : variation de l'espérance de vie entre 1950 et 2023 (en %)
-    life_expectancy_1950 = additional_data[0][1]
-    life_expectancy_2023 = additional_data[1][1]
-    growth_life_expectancy = ((life_expectancy_2023 - life_expectancy_1950) / life_expectancy_1950) * 100
-    
-    # Indicateurs 10 : variation de la mortalité entre 1950 et 2023 (en %)
-    mortality_1950 = additional_data[0][2]
-    mortality_2023 = additional_data[1][2]
-    growth_mortality = ((mortality_2023 - mortality_1950) / mortality_1950) * 100
-    
-    # Indicateurs 12 : variation du taux de natalité entre 1950 et 2023 (en %)
-    birth_rate_1950 = additional_data[0][3]
-    birth_rate_2023 = additional_data[1][3]
-    growth_birth_rate = ((birth_rate_2023 - birth_rate_1950) / birth_rate_1950) * 100
+@cached_query
+def get_available_years():
+    with pooled_connection() as conn:
+        results = conn.execute(SQL_AVAILABLE_YEARS).fetchall()
+    return results
 
+# Indicateurs des deux années : {année: ligne}
+@cached_query
+def get_dashboard_kpis(year_from, year_to):
+    store = cs.get_store()
+    if store is not None:
+        return store.dashboard_kpis(year_from, year_to)
+    # Emprunter une connexion au pool, exécuter la requête et renvoyer les résultats
+    with pooled_connection() as conn:
+        results = conn.execute(SQL_DASHBOARD_KPIS, (year_from, year_to)).fetchall()
+    return results
 
+# Variation en % entre deux valeurs (None si elle n'est pas calculable)
+def growth_rate(start, end):
+    if start in (None, 0) or end is None:
+        return None
+    return ((end - start) / start) * 100
+
+# Mise en forme à la française ("2 536 431 000" et "+217%") sans dépendre de la locale du processus
+def format_number(value):
+    return "n.d." if value is None else f"{value:,.0f}".replace(',', ' ')
+
+def format_growth(value):
+    return "n.d." if value is None else f"{value:+.0f}%"
+
+def generate_population_dashboard(year_from=DEFAULT_YEAR_FROM, year_to=DEFAULT_YEAR_TO):
+    # Récupérer les indicateurs des deux années en une seule requête
+    # (lignes lues par position : résultat SQL ou moteur en mémoire)
+    fields = ["male_population", "female_population", "life_expectancy", "mortality_rate", "birth_rate"]
+    rows = {row[0]: dict(zip(fields, row[1:])) for row in get_dashboard_kpis(year_from, year_to)}
+    empty = dict.fromkeys(fields)
+    start, end = rows.get(year_from, empty), rows.get(year_to, empty)
+
+    # Indicateurs 1 à 3 : population mondiale (hommes + femmes) et sa croissance
+    population_start = start["male_population"] + start["female_population"] if start["male_population"] is not None else None
+    population_end = end["male_population"] + end["female_population"] if end["male_population"] is not None else None
+    growth_population = growth_rate(population_start, population_end)
+
+    # Indicateurs 4 à 9 : populations masculine et féminine et leur croissance
+    growth_male_population = growth_rate(start["male_population"], end["male_population"])
+    growth_female_population = growth_rate(start["female_population"], end["female_population"])
+
+    # Indicateurs 10 à 12 : variation de la natalité, de l'espérance de vie et de la mortalité (en %)
+    growth_birth_rate = growth_rate(start["birth_rate"], end["birth_rate"])
+    growth_life_expectancy = growth_rate(start["life_expectancy"], end["life_expectancy"])
+    growth_mortality = growth_rate(start["mortality_rate"], end["mortality_rate"])
+
+    a, b = year_from, year_to
     # Retourner les indicateurs sous forme d'un tableau de dictionnaires'
     dashboard_data = [
-        {"title": "Population mondiale en 1950", "value": f"{population_1950:,}".replace(',', ' '), "description": "Nombre total d'habitants dans le monde en 1950"},
-        {"title": "Population mondiale en 2023", "value": f"{population_2023:,}".replace(',', ' '), "description": "Nombre total d'habitants dans le monde en 2023"},
-        {"title": "Croissance de la population mondiale (1950-2023)", "value": f"{growth_population:+.0f}%", "description": "Pourcentage d'augmentation de la population mondiale entre 1950 et 2023"},
-        {"title": "Population masculine en 1950", "value": f"{male_population_1950:,}".replace(',', ' '), "description": "Nombre d'hommes dans le monde en 1950"},
-        {"title": "Population masculine en 2023", "value": f"{male_population_2023:,}".replace(',', ' '), "description": "Nombre d'hommes dans le monde en 2023"},
-        {"title": "Croissance de la population masculine (1950-2023)", "value": f"{growth_male_population:+.0f}%", "description": "Pourcentage d'augmentation de la population masculine entre 1950 et 2023"},
-        {"title": "Population féminine en 1950", "value": f"{female_population_1950:,}".replace(',', ' '), "description": "Nombre de femmes dans le monde en 1950"},
-        {"title": "Population féminine en 2023", "value": f"{female_population_2023:,}".replace(',', ' '), "description": "Nombre de femmes dans le monde en 2023"},
-        {"title": "Croissance de la population féminine (1950-2023)", "value": f"{growth_female_population:+.0f}%", "description": "Pourcentage d'augmentation de la population féminine entre 1950 et 2023"},
-        {"title": "Variation du taux de natalité (1950-2023)", "value": f"{growth_birth_rate:+.0f}%", "description": "Pourcentage de variation du taux de natalité entre 1950 et 2023"},
-        {"title": "Variation de l'espérance de vie (1950-2023)", "value": f"{growth_life_expectancy:+.0f}%", "description": "Pourcentage de variation de l'espérance de vie entre 1950 et 2023"},
-        {"title": "Variation du taux de mortalité (1950-2023)", "value": f"{growth_mortality:+.0f}%", "description": "Pourcentage de variation du taux de mortalité entre 1950 et 2023"},
+        {"title": f"Population mondiale en {a}", "value": format_number(population_start), "description": f"Nombre total d'habitants dans le monde en {a}"},
+        {"title": f"Population mondiale en {b}", "value": format_number(population_end), "description": f"Nombre total d'habitants dans le monde en {b}"},
+        {"title": f"Croissance de la population mondiale ({a}-{b})", "value": format_growth(growth_population), "description": f"Pourcentage d'augmentation de la population mondiale entre {a} et {b}"},
+        {"title": f"Population masculine en {a}", "value": format_number(start["male_population"]), "description": f"Nombre d'hommes dans le monde en {a}"},
+        {"title": f"Population masculine en {b}", "value": format_number(end["male_population"]), "description": f"Nombre d'hommes dans le monde en {b}"},
+        {"title": f"Croissance de la population masculine ({a}-{b})", "value": format_growth(growth_male_population), "description": f"Pourcentage d'augmentation de la population masculine entre {a} et {b}"},
+        {"title": f"Population féminine en {a}", "value": format_number(start["female_population"]), "description": f"Nombre de femmes dans le monde en {a}"},
+        {"title": f"Population féminine en {b}", "value": format_number(end["female_population"]), "description": f"Nombre de femmes dans le monde en {b}"},
+        {"title": f"Croissance de la population féminine ({a}-{b})", "value": format_growth(growth_female_population), "description": f"Pourcentage d'augmentation de la population féminine entre {a} et {b}"},
+        {"title": f"Variation du taux de natalité ({a}-{b})", "value": format_growth(growth_birth_rate), "description": f"Pourcentage de variation du taux de natalité entre {a} et {b}"},
+        {"title": f"Variation de l'espérance de vie ({a}-{b})", "value": format_growth(growth_life_expectancy), "description": f"Pourcentage de variation de l'espérance de vie entre {a} et {b}"},
+        {"title": f"Variation du taux de mortalité ({a}-{b})", "value": format_growth(growth_mortality), "description": f"Pourcentage de variation du taux de mortalité entre {a} et {b}"},
     ]
-    return dashboard_data
\ No newline at end of file
+    return dashboard_data
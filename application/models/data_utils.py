@@ -2,11 +2,22 @@
 
 # modules nécessaires
 import config                   # importer la configuration de l'application
-from models.db_utils import get_db_connection # pour se connecter à la base de données
-import json                 # pour manipuler les données GeoJSON
-import plotly.express as px # pour la création de graphiques interactifs
-import pandas as pd         # pour la manipulation et l'analyse des données 
-import folium               # pour la création de cartes interactives
+from models.db_utils import pooled_connection # pour se connecter à la base de données
+from models.cache_utils import cached_query    # pour mémoriser les résultats des requêtes
+from models import rollup_utils as ru         # pour lire les agrégats pré-calculés (rollups)
+from models import columnar_utils as cs       # moteur en mémoire optionnel (NumPy)
+from models import result_utils as rs         # résultats stockés par colonnes
+from models.fragment_utils import cached_fragment  # pour mémoriser le HTML des graphiques et cartes
+from models import geo_utils # pour les frontières GeoJSON mises en cache
+
+# plotly, pandas et folium ne sont importés que dans les fonctions generate_* qui les utilisent :
+# leur chargement (plusieurs centaines de ms) ne ralentit plus le démarrage des workers,
+# et les routes qui n'en ont pas besoin (tableaux, API, exports) ne les chargent jamais
+
+# Convertir une figure en fragment HTML (div + JSON de la figure) sans y embarquer plotly.js :
+# le bundle est servi une seule fois par la route /assets/js/ et chargé dans index.html
+def figure_to_html(fig):
+    return fig.to_html(full_html=False, include_plotlyjs=False)
 
 ###################################################################
 # NOUVEL ONGLET : Part des pays dans la région (Treemap)
@@ -15,11 +26,8 @@ import folium               # pour la création de cartes interactives
 
 # ... (garder les autres imports)
 
-def get_country_region_share():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Nouvelle requête SQL fournie
-    query = """
+# Nouvelle requête SQL fournie
+SQL_COUNTRY_REGION_SHARE = """
     SELECT
         r.name        AS region,
         c.name        AS country,
@@ -58,15 +66,25 @@ def get_country_region_share():
         r.name,
         population_rate_percent DESC;
     """
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
+
+@cached_query
+def get_country_region_share():
+    # Moteur en mémoire s'il est activé (aucune requête SQL)
+    store = cs.get_store()
+    if store is not None:
+        return rs.as_result(store.country_region_share())
+    # Lire la table pré-calculée si elle existe, sinon calculer l'agrégat à la volée
+    query = ru.SQL_ROLLUP_COUNTRY_REGION_SHARE if ru.rollups_available() else SQL_COUNTRY_REGION_SHARE
+    with pooled_connection() as conn:
+        results = rs.fetch_result(conn, query)
     return results
 
+@cached_fragment
 def generate_share_treemap():
+    import plotly.express as px # pour la création de graphiques interactifs
     data = get_country_region_share()
     # Adaptation des colonnes au DataFrame pour le Treemap
-    df = pd.DataFrame(data, columns=["Région", "Pays", "Année", "Pop. Pays", "Pop. Région", "Part (%)"])
+    df = rs.to_frame(data, ["Région", "Pays", "Année", "Pop. Pays", "Pop. Région", "Part (%)"])
     
     latest_year = df['Année'].max()
     df_latest = df[df['Année'] == latest_year]
@@ -82,18 +100,15 @@ def generate_share_treemap():
     )
     
     fig.update_layout(margin=dict(t=50, l=25, r=25, b=25))
-    return fig.to_html(full_html=False)
+    return figure_to_html(fig)
 
 
 
 ###################################################################
 # NOUVEL ONGLET : Ratio H/F (CORRIGÉ)
 
-def get_sex_ratio_data():
-    conn = get_db_connection()
-    cursor = conn.cursor() # <--- Modification effectuée ici
-    # On calcule le ratio (Hommes/Femmes * 100) directement en SQL
-    query = """
+# On calcule le ratio (Hommes/Femmes * 100) directement en SQL
+SQL_SEX_RATIO = """
     SELECT
         year,
         "MALE POPULATION. AS OF 1 JULY (THOUSANDS)" * 1000 AS male_pop,
@@ -105,14 +120,22 @@ def get_sex_ratio_data():
       AND year BETWEEN 1950 AND 2023
     ORDER BY year;
     """
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
+
+@cached_query
+def get_sex_ratio_data():
+    # Moteur en mémoire s'il est activé (aucune requête SQL)
+    store = cs.get_store()
+    if store is not None:
+        return rs.as_result(store.sex_ratio())
+    with pooled_connection() as conn:
+        results = rs.fetch_result(conn, SQL_SEX_RATIO)
     return results
 
+@cached_fragment
 def generate_sex_ratio_plot():
+    import plotly.express as px # pour la création de graphiques interactifs
     data = get_sex_ratio_data()
-    df = pd.DataFrame(data, columns=["Année", "Hommes", "Femmes", "Ratio"])
+    df = rs.to_frame(data, ["Année", "Hommes", "Femmes", "Ratio"])
     
     fig = px.line(df, x="Année", y="Ratio", 
                   title="Évolution du Sex-Ratio mondial (Nombre d'hommes pour 100 femmes)",
@@ -122,15 +145,12 @@ def generate_sex_ratio_plot():
     fig.add_hline(y=100, line_dash="dash", line_color="red", annotation_text="Équilibre (100)")
     
     fig.update_layout(hovermode="x unified")
-    return fig.to_html(full_html=False)
+    return figure_to_html(fig)
 
 ###################################################################
 # NOUVEL ONGLET : Population par Continent (item "Continents")
 
-def get_population_by_continent():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = """
+SQL_POPULATION_BY_CONTINENT = """
         SELECT 
             CASE 
                 WHEN r.name LIKE '%Africa%' THEN 'Africa'
@@ -148,20 +168,24 @@ def get_population_by_continent():
         GROUP BY continent, fp.year
         ORDER BY fp.year, population DESC;
     """
-    try:
-        cursor.execute(query)
-        results = cursor.fetchall()
-    except Exception as e:
-        print(f"Erreur SQL : {e}")
-        results = []
-    finally:
-        conn.close()
+
+@cached_query
+def get_population_by_continent():
+    # Moteur en mémoire s'il est activé (aucune requête SQL)
+    store = cs.get_store()
+    if store is not None:
+        return rs.as_result(store.population_by_continent())
+    query = ru.SQL_ROLLUP_POPULATION_BY_CONTINENT if ru.rollups_available() else SQL_POPULATION_BY_CONTINENT
+    with pooled_connection() as conn:
+        results = rs.fetch_result(conn, query)
     return results
 
+@cached_fragment
 def generate_continent_pie_plot():
+    import plotly.express as px # pour la création de graphiques interactifs
     data = get_population_by_continent()
     # On définit bien les 3 colonnes ici
-    df = pd.DataFrame(data, columns=["Continent", "Année", "Population"])
+    df = rs.to_frame(data, ["Continent", "Année", "Population"])
     
     fig = px.pie(df, values='Population', names='Continent', 
                   title="Répartition de la population mondiale par continent (2023)",
@@ -169,15 +193,12 @@ def generate_continent_pie_plot():
                   color_discrete_sequence=px.colors.sequential.RdBu)
     
     fig.update_layout(paper_bgcolor='rgba(0,0,0,0)')
-    return fig.to_html(full_html=False)
+    return figure_to_html(fig)
 
 ###################################################################
 # Population mondiale par sexe et par année (item "Population mondiale")
 
-def get_world_population_by_year():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = """
+SQL_WORLD_POPULATION_BY_YEAR = """
         SELECT
             year,
             SUM(CASE WHEN   fp."MALE POPULATION. AS OF 1 JULY (THOUSANDS)" IS NOT NULL
@@ -201,14 +222,23 @@ def get_world_population_by_year():
         ORDER BY
             fp.year;
     """
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
+
+@cached_query
+def get_world_population_by_year():
+    # Moteur en mémoire s'il est activé (aucune requête SQL)
+    store = cs.get_store()
+    if store is not None:
+        return rs.as_result(store.world_population_by_year())
+    query = ru.SQL_ROLLUP_WORLD_POPULATION_BY_YEAR if ru.rollups_available() else SQL_WORLD_POPULATION_BY_YEAR
+    with pooled_connection() as conn:
+        results = rs.fetch_result(conn, query)
     return results
 
+@cached_fragment
 def generate_population_plot():
+    import plotly.express as px # pour la création de graphiques interactifs
     data = get_world_population_by_year()
-    df = pd.DataFrame(data, columns=["Année", "Hommes", "Femmes", "Total"])
+    df = rs.to_frame(data, ["Année", "Hommes", "Femmes", "Total"])
     fig = px.area(
         df,
         x="Année",
@@ -229,15 +259,12 @@ def generate_population_plot():
         yaxis_title="Population mondiale",
         hovermode="x unified",
     )
-    return fig.to_html(full_html=False)
+    return figure_to_html(fig)
 
 ###################################################################
 # Récupérer la population par région et par année (item "Population par région")
 
-def get_population_by_region():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = """
+SQL_POPULATION_BY_REGION = """
         SELECT
             r.name AS region_name,
             fp.year,
@@ -251,14 +278,23 @@ def get_population_by_region():
         ORDER BY
             r.name, fp.year;
     """
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
+
+@cached_query
+def get_population_by_region():
+    # Moteur en mémoire s'il est activé (aucune requête SQL)
+    store = cs.get_store()
+    if store is not None:
+        return rs.as_result(store.population_by_region())
+    query = ru.SQL_ROLLUP_POPULATION_BY_REGION if ru.rollups_available() else SQL_POPULATION_BY_REGION
+    with pooled_connection() as conn:
+        results = rs.fetch_result(conn, query)
     return results
 
+@cached_fragment
 def generate_region_plot():
+    import plotly.express as px # pour la création de graphiques interactifs
     data = get_population_by_region()
-    df = pd.DataFrame(data, columns=["Région", "Année", "Population"])
+    df = rs.to_frame(data, ["Région", "Année", "Population"])
     fig = px.line(df, x="Année", y="Population", color="Région",
                   title="Évolution de la population par région",
                   markers=True)    
@@ -267,46 +303,75 @@ def generate_region_plot():
         yaxis_title="Population",
         hovermode="x unified",
     )
-    return fig.to_html(full_html=False)
+    return figure_to_html(fig)
 
 ###################################################################
 # Récupérer le top 10 des pays les plus peuplés (item "Top 10")
 
+# Classement des pays par population pour chaque année (rang 1 = pays le plus peuplé)
+SQL_RANKED_COUNTRIES = """
+        SELECT
+            fp.year,
+            c.name AS country_name,
+            sr.name AS subregion_name,
+            r.name AS region_name,
+            ct.name AS continent_name,
+            fp."TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)" * 1000 AS population,
+            ROW_NUMBER() OVER (
+                PARTITION BY fp.year
+                ORDER BY fp."TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)" * 1000 DESC
+            ) AS rank
+        FROM fact_population fp
+        JOIN country c ON fp.location_code = c.location_code
+        JOIN subregion sr ON c.parent_code = sr.location_code
+        JOIN region r ON sr.parent_code = r.location_code
+        JOIN continent ct ON r.parent_code = ct.location_code
+    """
+
+SQL_TOP_10_COUNTRIES = f"""
+        SELECT
+            year, country_name, subregion_name, region_name, continent_name, population
+        FROM ({SQL_RANKED_COUNTRIES})
+        WHERE rank <= 10
+        ORDER BY year, population DESC;
+    """
+
+@cached_query
 def get_top_10_countries():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = """
+    # Moteur en mémoire s'il est activé (aucune requête SQL)
+    store = cs.get_store()
+    if store is not None:
+        return rs.as_result(store.top_countries(10))
+    query = ru.SQL_ROLLUP_TOP_10_COUNTRIES if ru.rollups_available() else SQL_TOP_10_COUNTRIES
+    with pooled_connection() as conn:
+        results = rs.fetch_result(conn, query)
+    return results
+
+# Top N de chaque année (N variable : images de l'animation, cf. frames_utils)
+SQL_TOP_N_COUNTRIES = f"""
         SELECT
             year, country_name, subregion_name, region_name, continent_name, population
-        FROM (
-            SELECT
-                fp.year,
-                c.name AS country_name,
-                sr.name AS subregion_name,
-                r.name AS region_name,
-                ct.name AS continent_name,
-                fp."TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)" * 1000 AS population,
-                ROW_NUMBER() OVER (
-                    PARTITION BY fp.year
-                    ORDER BY fp."TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)" * 1000 DESC
-                ) AS rn
-            FROM fact_population fp
-            JOIN country c ON fp.location_code = c.location_code
-            JOIN subregion sr ON c.parent_code = sr.location_code
-            JOIN region r ON sr.parent_code = r.location_code
-            JOIN continent ct ON r.parent_code = ct.location_code
-        )
-        WHERE rn <= 10
+        FROM ({SQL_RANKED_COUNTRIES})
+        WHERE rank <= ?
         ORDER BY year, population DESC;
     """
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
+
+@cached_query
+def get_top_countries(n):
+    # Moteur en mémoire s'il est activé (aucune requête SQL)
+    store = cs.get_store()
+    if store is not None:
+        return rs.as_result(store.top_countries(n))
+    query = ru.SQL_ROLLUP_TOP_N_COUNTRIES if ru.rollups_available() else SQL_TOP_N_COUNTRIES
+    with pooled_connection() as conn:
+        results = rs.fetch_result(conn, query, (n,))
     return results
 
+@cached_fragment
 def generate_top_10_bar_plot():
+    import plotly.express as px # pour la création de graphiques interactifs
     data = get_top_10_countries()
-    df = pd.DataFrame(data, columns=[ "Année", "Pays", "Sous-région", "Région", "Continent", "Population"])
+    df = rs.to_frame(data, ["Année", "Pays", "Sous-région", "Région", "Continent", "Population"])
     fig = px.bar(
         df,
         x="Pays",
@@ -323,15 +388,12 @@ def generate_top_10_bar_plot():
         xaxis={'categoryorder': 'total descending', 'tickangle': 10},
         yaxis=dict(range=[0, ymax])
     )
-    return fig.to_html(full_html=False)
+    return figure_to_html(fig)
 
 ###################################################################
 # Démographie européenne (item "Europe")
 
-def get_europe_population_by_year():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = """
+SQL_EUROPE_POPULATION_BY_YEAR = """
     SELECT
         fp.year, c.name AS country_name,
         fp."TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)" * 1000 AS population,
@@ -343,14 +405,24 @@ def get_europe_population_by_year():
     WHERE r.name = 'Europe'
     ORDER BY c.name, fp.year;
     """
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
+
+@cached_query
+def get_europe_population_by_year():
+    # Moteur en mémoire s'il est activé (aucune requête SQL)
+    store = cs.get_store()
+    if store is not None:
+        return rs.as_result(store.europe_population_by_year())
+    with pooled_connection() as conn:
+        results = rs.fetch_result(conn, SQL_EUROPE_POPULATION_BY_YEAR)
     return results
 
+@cached_fragment
 def generate_europe_dens_map():
+    import folium               # pour la création de cartes interactives
+    from branca.colormap import StepColormap        # échelle de couleurs par classes (légende de la carte)
+    from branca.utilities import color_brewer       # palettes ColorBrewer (YlGnBu)
     data = get_europe_population_by_year()
-    df = pd.DataFrame(data, columns=["Année", "Pays", "Population", "Densité"])
+    df = rs.to_frame(data, ["Année", "Pays", "Population", "Densité"])
     latest_year = 2023
     df_latest = df[df["Année"] == latest_year]
     
@@ -358,42 +430,61 @@ def generate_europe_dens_map():
     for p in ["Monaco", "Gibraltar", "Holy See", "Malta", "San Marino", "Guernsey", "Jersey"]:
         df_latest = df_latest[df_latest["Pays"] != p]
 
-    with open(config.GEOJSON_10M, 'r', encoding='utf-8') as f:
-        geojson_data = json.load(f)
-
-    europe_countries = df_latest["Pays"].unique().tolist()
+    # Frontières lues une seule fois par processus, filtrées et simplifiées pour le zoom initial (cache)
     dens_dict = df_latest.set_index("Pays")["Densité"].to_dict()
+    geojson_data = geo_utils.get_feature_collection(
+        df_latest["Pays"].unique().tolist(),
+        resolution=config.EUROPE_MAP_RESOLUTION,
+        zoom=config.EUROPE_MAP_ZOOM,
+        extra_properties={pays: {"DENSITÉ": float(dens)} for pays, dens in dens_dict.items()},
+    )
 
-    filtered_features = []
-    for feature in geojson_data["features"]:
-        country_name = feature["properties"].get("NAME_ENGL")
-        if country_name in europe_countries:
-            feature["properties"]["DENSITÉ"] = float(dens_dict[country_name])
-            filtered_features.append(feature)
-    geojson_data["features"] = filtered_features
-
-    m = folium.Map(location=[60, 74], zoom_start=3, width="100%", height="450px")
-    folium.Choropleth(
-        geo_data=geojson_data,
-        name="Densité",
-        data=df_latest,
-        columns=["Pays", "Densité"],
-        key_on="feature.properties.NAME_ENGL",
-        fill_color="YlGnBu",
-        bins=[0, 50, 100, 200, 400, df_latest["Densité"].max()],
-        fill_opacity=0.6,
-        line_opacity=0.4,
-        legend_name="Densité (hab/km²)"
-    ).add_to(m)
+    # Classes de densité (bornes croissantes même si la densité maximale est inférieure à 400)
+    max_density = df_latest["Densité"].max()
+    bins = [b for b in [0, 50, 100, 200, 400] if b < max_density] + [max_density]
+    colormap = StepColormap(
+        color_brewer("YlGnBu", n=len(bins) - 1),
+        index=bins,
+        vmin=bins[0],
+        vmax=bins[-1],
+        caption="Densité (hab/km²)",
+    )
 
+    # Une seule couche GeoJson (remplissage, contour et infobulle) : la géométrie n'est embarquée qu'une fois
+    m = folium.Map(location=[60, 74], zoom_start=config.EUROPE_MAP_ZOOM, width="100%", height="450px")
     folium.GeoJson(
         geojson_data,
-        style_function=lambda x: {'weight': 1, 'color': 'black', 'fillOpacity': 0},
+        name="Densité",
+        style_function=lambda x: {
+            'fillColor': colormap(x["properties"]["DENSITÉ"]),
+            'fillOpacity': 0.6,
+            'weight': 1,
+            'color': 'black',
+            'opacity': 0.4,
+        },
         tooltip=folium.GeoJsonTooltip(fields=["NAME_ENGL", "DENSITÉ"], aliases=["Pays :", "Densité :"])
     ).add_to(m)
+    colormap.add_to(m)
 
     return m._repr_html_()
 
+###################################################################
+# Requête SQL de chaque onglet (table pré-calculée si elle existe)
+# Utilisée par le traitement côté serveur des tableaux (models/table_utils.py)
+
+def get_query_sql(query_type):
+    rollup = ru.rollups_available()
+    queries = {
+        'world': ru.SQL_ROLLUP_WORLD_POPULATION_BY_YEAR if rollup else SQL_WORLD_POPULATION_BY_YEAR,
+        'continent': ru.SQL_ROLLUP_POPULATION_BY_CONTINENT if rollup else SQL_POPULATION_BY_CONTINENT,
+        'sex_ratio': SQL_SEX_RATIO,
+        'region': ru.SQL_ROLLUP_POPULATION_BY_REGION if rollup else SQL_POPULATION_BY_REGION,
+        'top10': ru.SQL_ROLLUP_TOP_10_COUNTRIES if rollup else SQL_TOP_10_COUNTRIES,
+        'europe': SQL_EUROPE_POPULATION_BY_YEAR,
+        'share': ru.SQL_ROLLUP_COUNTRY_REGION_SHARE if rollup else SQL_COUNTRY_REGION_SHARE,
+    }
+    return queries.get(query_type)
+
 ###################################################################
 # Informations sur le projet (item "À propos")
 
@@ -3,9 +3,174 @@
 # modules nécessaires
 import config               # importer la configuration de l'application
 import sqlite3              # pour interagir avec la base de données SQLite
+import os                   # pour lire l'identité du fichier de la base (mtime, taille)
+import queue                # file thread-safe pour stocker les connexions libres
+import threading            # pour protéger la création du pool
+import time                 # pour mesurer l'attente d'une connexion libre
+from contextlib import contextmanager  # pour utiliser le pool avec un bloc "with"
+from urllib.parse import quote         # pour construire l'URI de la base de données
+from models import metrics_utils       # pour mesurer les requêtes SQL (Server-Timing, /metrics)
+from models import concurrent_utils    # portée d'annulation des requêtes concurrentes
 
 # Fonction pour se connecter à la base de données
+# Connexion classique (lecture/écriture), réservée aux scripts hors requêtes HTTP
 def get_db_connection():
     conn = sqlite3.connect(config.DATABASE)
     conn.row_factory = sqlite3.Row
-    return conn
\ No newline at end of file
+    return conn
+
+###################################################################
+# Pool de connexions en lecture seule partagé par tout le processus
+
+# Ouvrir une connexion en lecture seule (URI "mode=ro" ou "immutable=1") et la régler
+def open_readonly_connection(database=None):
+    database = database or config.DATABASE
+    uri = f"file:{quote(database)}?mode=ro"
+    if config.DB_IMMUTABLE:
+        uri += "&immutable=1"
+    # check_same_thread=False : une connexion peut être rendue au pool par un autre thread
+    # connexion instrumentée : durée de chaque requête et nombre de lignes lues
+    factory = metrics_utils.InstrumentedConnection if config.METRICS_ENABLED else sqlite3.Connection
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=factory,
+                           cached_statements=config.DB_STATEMENT_CACHE)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA mmap_size = {int(config.DB_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = {int(config.DB_CACHE_SIZE)}")
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+class ConnectionPool:
+    """Pool thread-safe de connexions SQLite réutilisables.
+
+    Les connexions sont créées à la demande jusqu'à `size`, puis réutilisées.
+    Si toutes sont occupées, `checkout` attend qu'une connexion soit rendue.
+    """
+
+    def __init__(self, database=None, size=None, timeout=None):
+        self.database = database or config.DATABASE
+        self.size = size or config.DB_POOL_SIZE
+        self.timeout = config.DB_POOL_TIMEOUT if timeout is None else timeout
+        self._idle = queue.LifoQueue()   # LIFO : réutiliser la connexion dont le cache est le plus chaud
+        self._created = 0
+        self._lock = threading.Lock()
+
+    # Emprunter une connexion au pool
+    def checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                conn = open_readonly_connection(self.database)
+                self._created += 1
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Aucune connexion libre après {self.timeout} s (pool de {self.size})")
+
+    # Rendre une connexion au pool
+    def checkin(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    # Emprunter une connexion le temps d'un bloc "with"
+    @contextmanager
+    def connection(self):
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    # Compteurs exposés par la route /metrics
+    def stats(self):
+        return {"size": self.size, "created": self._created, "idle": self._idle.qsize()}
+
+    # Fermer toutes les connexions libres (ex. : avant un fork ou un remplacement de la base)
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Récupérer le pool du processus (créé au premier appel)
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+# Fermer et oublier le pool du processus
+def reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+
+# Raccourci utilisé par les modèles : with pooled_connection() as conn: ...
+@contextmanager
+def pooled_connection():
+    pool = get_pool()
+    start = time.perf_counter()
+    conn = pool.checkout()
+    metrics_utils.record("pool", time.perf_counter() - start)
+    # dans une tâche de run_parallel : la connexion peut être interrompue si le groupe est annulé
+    scope = concurrent_utils.current_scope()
+    try:
+        if scope is not None:
+            scope.register(conn)
+        yield conn
+    finally:
+        if scope is not None:
+            scope.unregister(conn)
+        pool.checkin(conn)
+
+# Exécuter une requête et renvoyer ses lignes par lots (fetchmany), sans tout charger en mémoire
+# La connexion reste empruntée au pool jusqu'à la fin (ou l'abandon) de l'itération
+def iter_query(query, params=(), batch_size=None):
+    batch_size = batch_size or config.EXPORT_BATCH_SIZE
+    with pooled_connection() as conn:
+        cursor = conn.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+###################################################################
+# Version de la base de données : identité du fichier (mtime + taille + inode)
+# Sert de clé aux différents caches : remplacer la base les invalide automatiquement
+
+_db_version = None
+_db_version_lock = threading.Lock()
+
+def get_db_version():
+    global _db_version
+    try:
+        st = os.stat(config.DATABASE)
+        version = f"{st.st_mtime_ns:x}-{st.st_size:x}-{st.st_ino:x}"
+    except OSError:
+        version = "absent"
+    if version != _db_version:
+        with _db_version_lock:
+            # La base a été remplacée : les connexions ouvertes pointent encore sur l'ancien fichier
+            if _db_version is not None and version != _db_version:
+                reset_pool()
+            _db_version = version
+    return version
@@ -0,0 +1,70 @@
+# models/export_utils.py
+
+# Export Excel sans passer par un DataFrame pandas : les lignes sont écrites directement
+# dans un classeur openpyxl en mode "write_only" (mémoire constante)
+# Le fichier produit est gardé sur disque pour la version courante de la base et du code
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import os                       # pour gérer les fichiers du cache
+import glob                     # pour retrouver les anciennes versions d'un export
+import tempfile                 # fichier temporaire avant remplacement atomique
+from models.db_utils import get_db_version          # version de la base (clé du cache)
+from models.fragment_utils import code_version      # version du code (en-têtes, formats, write_excel)
+
+# Couleurs de la ligne d'en-tête (openpyxl n'est importé qu'à l'écriture d'un classeur)
+HEADER_COLOR = "FFFFFF"
+HEADER_BACKGROUND = "1D6F42"
+
+# Chemin du fichier en cache pour un onglet, la version courante de la base et celle du code
+def excel_cache_path(query_type):
+    return os.path.join(config.EXPORT_CACHE_DIR, f"export_{query_type}_{get_db_version()}-{code_version()}.xlsx")
+
+# Écrire le classeur : en-tête stylé puis lignes lues par lots
+# Les valeurs numériques de SQLite (int, float) deviennent des cellules numériques Excel
+def write_excel(path, headers, batches, sheet_name="Données"):
+    from openpyxl import Workbook                       # classeur Excel
+    from openpyxl.cell import WriteOnlyCell             # cellule stylée en mode write_only
+    from openpyxl.styles import Font, PatternFill, Alignment
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.font = Font(bold=True, color=HEADER_COLOR)
+        cell.fill = PatternFill(start_color=HEADER_BACKGROUND, end_color=HEADER_BACKGROUND, fill_type="solid")
+        cell.alignment = Alignment(horizontal="center")
+        header_cells.append(cell)
+    sheet.append(header_cells)
+    for rows in batches:
+        for row in rows:
+            sheet.append(tuple(row))
+    workbook.save(path)
+
+# Renvoyer le chemin du classeur d'un onglet, en le construisant s'il n'est pas déjà en cache
+# get_batches : fonction sans argument renvoyant les lots de lignes (appelée seulement si nécessaire)
+def get_excel_export(query_type, headers, get_batches):
+    path = excel_cache_path(query_type)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(config.EXPORT_CACHE_DIR, exist_ok=True)
+    # Écrire dans un fichier temporaire puis le renommer : aucun lecteur ne voit un fichier incomplet
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx.tmp", dir=config.EXPORT_CACHE_DIR)
+    os.close(fd)
+    try:
+        write_excel(tmp_path, headers, get_batches())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    # Supprimer les exports de cet onglet construits pour d'anciennes versions de la base ou du code
+    for old in glob.glob(os.path.join(config.EXPORT_CACHE_DIR, f"export_{query_type}_*.xlsx")):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return path
@@ -0,0 +1,187 @@
+# models/fragment_utils.py
+
+# Cache des fragments générés (HTML des graphiques et cartes, JSON de l'API)
+# Un fragment ne dépend que de la version de la base et du code qui le génère : il est gardé en mémoire (LRU)
+# et sur disque (réutilisé après un redémarrage), et accompagné d'une empreinte servant d'ETag
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import os                       # pour gérer les fichiers du cache
+import shutil                   # pour supprimer les dossiers d'anciennes versions
+import hashlib                  # pour calculer l'empreinte (ETag) du contenu
+import tempfile                 # fichier temporaire avant remplacement atomique
+import threading                # pour protéger le cache entre les threads
+import time                     # pour mesurer la durée de construction d'un fragment
+import functools                # pour écrire le décorateur
+import importlib.metadata       # versions des bibliothèques de rendu (sans les importer)
+from collections import OrderedDict                 # ordre d'utilisation pour l'éviction LRU
+from models.db_utils import get_db_version          # version de la base (clé du cache)
+from models import metrics_utils                    # pour mesurer la construction des fragments
+
+# Empreinte forte d'un contenu (texte ou octets), utilisable comme ETag
+def content_etag(content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()[:32]
+
+# Code dont dépendent les fragments : sources de l'application et bibliothèques de rendu
+CODE_DIRS = ("models", "controllers", "templates")
+CODE_EXTENSIONS = (".py", ".html")
+RENDER_LIBRARIES = ("plotly", "folium", "branca", "pandas", "openpyxl")
+
+# Empreinte du code (models, controllers, templates, config.py) et des versions des bibliothèques de rendu :
+# après un déploiement, les fragments et exports écrits sur disque par l'ancien code ne sont plus lus
+@functools.lru_cache(maxsize=None)
+def code_version():
+    digest = hashlib.sha256()
+    paths = [os.path.join(config.BASE_DIR, "config.py")]
+    for directory in CODE_DIRS:
+        for root, dirs, files in os.walk(os.path.join(config.BASE_DIR, directory)):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            paths += [os.path.join(root, name) for name in sorted(files) if name.endswith(CODE_EXTENSIONS)]
+    for path in paths:
+        digest.update(os.path.relpath(path, config.BASE_DIR).encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    for library in RENDER_LIBRARIES:
+        try:
+            digest.update(f"{library}={importlib.metadata.version(library)}".encode("utf-8"))
+        except importlib.metadata.PackageNotFoundError:
+            continue
+    return digest.hexdigest()[:12]
+
+# Construire un fragment en mesurant la durée (étape "render" de Server-Timing et /metrics)
+def build_fragment(builder):
+    start = time.perf_counter()
+    content = builder()
+    metrics_utils.record("render", time.perf_counter() - start, size=len(content))
+    return content
+
+class FragmentCache:
+    """Cache de fragments à deux niveaux : mémoire (LRU) puis disque, par version de la base."""
+
+    def __init__(self, directory=None, max_entries=None):
+        self.directory = directory or config.FRAGMENT_CACHE_DIR
+        self.max_entries = max_entries or config.FRAGMENT_CACHE_MAX_ENTRIES
+        self._entries = OrderedDict()   # (version, nom) -> (contenu, etag)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # Dossier des fragments d'une version de la base et du code
+    def _version_dir(self, version):
+        return os.path.join(self.directory, f"{version}-{code_version()}")
+
+    def _path(self, version, name, binary):
+        return os.path.join(self._version_dir(version), name + ('.bin' if binary else '.html'))
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, version, name):
+        for binary in (False, True):
+            path = self._path(version, name, binary)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    content = f.read()
+                return content if binary else content.decode('utf-8')
+        return None
+
+    def _write_disk(self, version, name, content):
+        binary = isinstance(content, bytes)
+        directory = self._version_dir(version)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+            # nouvelle version de la base : supprimer les fragments des versions précédentes
+            for other in os.listdir(self.directory):
+                if os.path.join(self.directory, other) != directory:
+                    shutil.rmtree(os.path.join(self.directory, other), ignore_errors=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content if binary else content.encode('utf-8'))
+        os.replace(tmp_path, self._path(version, name, binary))
+
+    # Renvoyer (contenu, etag) du fragment "name", en appelant builder() seulement s'il est absent
+    def get_or_build(self, name, builder):
+        version = get_db_version()
+        key = (version, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        content = self._read_disk(version, name)
+        if content is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            with self._lock:
+                self.misses += 1
+            content = build_fragment(builder)
+            try:
+                self._write_disk(version, name, content)
+            except OSError as e:
+                print(f"Cache de fragments : écriture impossible ({e})")
+        entry = (content, content_etag(content))
+        self._remember(key, entry)
+        return entry
+
+    # Vider le cache (mémoire et disque)
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "disk_hits": self.disk_hits, "misses": self.misses}
+
+# Cache partagé par tout le processus
+fragment_cache = FragmentCache()
+
+# Décorateur : mémoriser le fragment renvoyé par une fonction generate_* sans argument
+def cached_fragment(func):
+    @functools.wraps(func)
+    def wrapper():
+        if not config.FRAGMENT_CACHE_ENABLED:
+            return build_fragment(func)
+        content, _ = fragment_cache.get_or_build(func.__name__, func)
+        return content
+    wrapper.uncached = func
+    return wrapper
+
+###################################################################
+# ETag des pages complètes : mémorisé au premier rendu pour répondre 304 sans refaire le rendu
+# (LRU borné : les clés viennent des paramètres d'URL)
+
+MAX_PAGE_ETAGS = 256
+
+_page_etags = OrderedDict()
+_page_etags_lock = threading.Lock()
+
+def get_page_etag(key):
+    with _page_etags_lock:
+        key = (get_db_version(),) + key
+        etag = _page_etags.get(key)
+        if etag is not None:
+            _page_etags.move_to_end(key)
+        return etag
+
+def remember_page_etag(key, etag):
+    version = get_db_version()
+    with _page_etags_lock:
+        # ne garder que les pages de la version courante de la base
+        for old in [k for k in _page_etags if k[0] != version]:
+            del _page_etags[old]
+        _page_etags[(version,) + key] = etag
+        _page_etags.move_to_end((version,) + key)
+        while len(_page_etags) > MAX_PAGE_ETAGS:
+            _page_etags.popitem(last=False)
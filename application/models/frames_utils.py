@@ -0,0 +1,66 @@
+# models/frames_utils.py
+
+# Images (frames) de l'animation du top N des pays les plus peuplés
+# Le classement de toutes les années est lu une fois (get_top_countries, en cache), puis indexé par année :
+# la route /api/top10/frames ne sérialise que les quelques années demandées (première image, puis fenêtres
+# de préchargement), quelle que soit l'étendue de la période couverte par la base
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import threading                # pour protéger l'index entre les threads
+from bisect import bisect_left  # recherche de la première année d'une fenêtre
+from models.db_utils import get_db_version
+from models import data_utils as du             # classement des pays par année
+
+class TopFrames:
+    """Top N de chaque année : lignes triées par année et position de la première ligne de chaque année."""
+
+    def __init__(self, n, data):
+        self.n = n
+        rows = list(data)
+        self.years = []
+        self.offsets = []
+        for i, row in enumerate(rows):
+            if not self.years or row[0] != self.years[-1]:
+                self.years.append(row[0])
+                self.offsets.append(i)
+        self.offsets.append(len(rows))
+        self.countries = [row[1] for row in rows]
+        self.populations = [row[5] for row in rows]
+        self.max = max((p for p in self.populations if p is not None), default=None)
+
+    # Image d'une année : pays et population, du plus peuplé au moins peuplé
+    def frame(self, year):
+        i = bisect_left(self.years, year)
+        if i == len(self.years) or self.years[i] != year:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return {"Pays": self.countries[start:end], "Population": self.populations[start:end]}
+
+    # Années d'une fenêtre : count années à partir de la première année >= start
+    def window(self, start, count):
+        i = bisect_left(self.years, start)
+        return self.years[i:i + count]
+
+###################################################################
+# Index du processus, construit une fois par version de la base et par N
+
+_frames = {}
+_frames_version = None
+_lock = threading.Lock()
+
+def get_top_frames(n=None):
+    global _frames_version
+    n = n or config.TOP_FRAMES_N
+    version = get_db_version()
+    with _lock:
+        if _frames_version != version:
+            _frames.clear()
+            _frames_version = version
+        frames = _frames.get(n)
+    if frames is None:
+        frames = TopFrames(n, du.get_top_countries(n))
+        with _lock:
+            if _frames_version == version:
+                _frames[n] = frames
+    return frames
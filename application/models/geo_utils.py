@@ -0,0 +1,175 @@
+# models/geo_utils.py
+
+# Cache des frontières GeoJSON (CNTR_RG_03M/10M/20M) utilisées par les cartes
+# Chaque fichier est lu une seule fois par processus puis indexé par nom de pays (NAME_ENGL) ;
+# les sous-ensembles de pays (ex. : Europe) et leurs géométries simplifiées par niveau de zoom
+# sont mémorisés à leur tour
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import os                       # pour détecter la modification d'un fichier
+import json                     # pour lire les fichiers GeoJSON
+import threading                # pour protéger le cache entre les threads
+
+# Simplification respectant la topologie avec shapely s'il est installé (pip install shapely),
+# sinon algorithme de Douglas-Peucker appliqué anneau par anneau
+try:
+    from shapely.geometry import shape, mapping
+except ImportError:
+    shape = mapping = None
+
+# Fichiers disponibles par résolution
+def geojson_files():
+    return {'03M': config.GEOJSON_03M, '10M': config.GEOJSON_10M, '20M': config.GEOJSON_20M}
+
+# Date de modification d'un fichier (sans le lire) ; None s'il est absent
+def geojson_mtime(resolution):
+    try:
+        return os.stat(geojson_files()[resolution]).st_mtime_ns
+    except OSError:
+        return None
+
+_lock = threading.RLock()
+_files = {}         # résolution -> (mtime, {"features": [...], "by_name": {NAME_ENGL: feature}})
+_subsets = {}       # (résolution, mtime, noms, zoom) -> liste de features (géométrie seule)
+
+###################################################################
+# Lecture et indexation des fichiers
+
+# Charger un fichier (une seule fois tant qu'il n'est pas modifié) et l'indexer par NAME_ENGL
+def load_geojson(resolution='10M'):
+    path = geojson_files()[resolution]
+    mtime = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _files.get(resolution)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            by_name = {}
+            for feature in data["features"]:
+                name = feature["properties"].get("NAME_ENGL")
+                if name is not None:
+                    by_name[name] = feature
+            cached = (mtime, {"features": data["features"], "by_name": by_name})
+            _files[resolution] = cached
+            # les sous-ensembles de l'ancienne version du fichier ne serviront plus
+            for key in [k for k in _subsets if k[0] == resolution]:
+                del _subsets[key]
+        return cached
+
+###################################################################
+# Simplification des géométries
+
+# Tolérance de simplification (en degrés) pour un niveau de zoom Leaflet ; None : géométrie complète
+def tolerance_for_zoom(zoom):
+    if zoom is None:
+        return None
+    tolerances = config.GEOJSON_SIMPLIFY_TOLERANCES
+    eligible = [z for z in tolerances if z >= zoom]
+    return tolerances[min(eligible)] if eligible else None
+
+# Distance d'un point au segment [a, b]
+def _segment_distance(p, a, b):
+    (x, y), (x1, y1), (x2, y2) = p, a, b
+    dx, dy = x2 - x1, y2 - y1
+    if dx == 0 and dy == 0:
+        return ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy)))
+    px, py = x1 + t * dx, y1 + t * dy
+    return ((x - px) ** 2 + (y - py) ** 2) ** 0.5
+
+# Douglas-Peucker itératif sur une ligne
+def douglas_peucker(points, tolerance):
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        index, max_dist = None, tolerance
+        for i in range(first + 1, last):
+            dist = _segment_distance(points[i], points[first], points[last])
+            if dist > max_dist:
+                index, max_dist = i, dist
+        if index is not None:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+# Simplifier un anneau fermé en gardant au moins 4 points (sinon l'anneau est conservé tel quel)
+def _simplify_ring(ring, tolerance, precision):
+    simplified = douglas_peucker(ring, tolerance)
+    if len(simplified) < 4:
+        simplified = ring
+    return [[round(x, precision), round(y, precision)] for x, y in simplified]
+
+def simplify_geometry(geometry, tolerance, precision=5):
+    if tolerance is None:
+        return geometry
+    if shape is not None:
+        simplified = mapping(shape(geometry).simplify(tolerance, preserve_topology=True))
+        return json.loads(json.dumps(simplified))
+    if geometry["type"] == "Polygon":
+        rings = [_simplify_ring(ring, tolerance, precision) for ring in geometry["coordinates"]]
+        return {"type": "Polygon", "coordinates": rings}
+    if geometry["type"] == "MultiPolygon":
+        polygons = [[_simplify_ring(ring, tolerance, precision) for ring in polygon]
+                    for polygon in geometry["coordinates"]]
+        return {"type": "MultiPolygon", "coordinates": polygons}
+    return geometry
+
+###################################################################
+# Sous-ensembles de pays
+
+# Features des pays demandés (géométrie éventuellement simplifiée pour le zoom), mémorisées
+# Avec l'instantané partagé (snapshot_utils), seules les géométries demandées sont lues (en mmap) :
+# le fichier complet n'est ni lu ni gardé en mémoire par le processus
+def get_features(names, resolution='10M', zoom=None):
+    geometry = snapshot_geometry(resolution)
+    mtime, data = (geojson_mtime(resolution), None) if geometry is not None else load_geojson(resolution)
+    key = (resolution, mtime, frozenset(names), zoom)
+    with _lock:
+        features = _subsets.get(key)
+        if features is None:
+            if geometry is not None:
+                by_name = {name: {"properties": geometry.properties[i], "geometry": geometry.geometry(i)}
+                           for name, i in geometry.by_name.items() if name in names}
+            else:
+                by_name = data["by_name"]
+            tolerance = tolerance_for_zoom(zoom)
+            features = [
+                {
+                    "type": "Feature",
+                    "properties": dict(by_name[name]["properties"]),
+                    "geometry": simplify_geometry(by_name[name]["geometry"], tolerance),
+                }
+                for name in sorted(names) if name in by_name
+            ]
+            _subsets[key] = features
+        return features
+
+# Frontières d'une résolution dans l'instantané partagé, ou None
+def snapshot_geometry(resolution):
+    if not config.SNAPSHOT_ENABLED:
+        return None
+    # import local : snapshot_utils importe ce module
+    from models import snapshot_utils
+    snapshot = snapshot_utils.get_snapshot()
+    return snapshot.geometry.get(resolution) if snapshot is not None else None
+
+# FeatureCollection des pays demandés, avec des propriétés supplémentaires par pays
+# extra_properties : {nom du pays: {propriété: valeur}} ; les features en cache ne sont pas modifiées
+def get_feature_collection(names, resolution='10M', zoom=None, extra_properties=None):
+    extra_properties = extra_properties or {}
+    features = []
+    for feature in get_features(names, resolution, zoom):
+        name = feature["properties"].get("NAME_ENGL")
+        properties = dict(feature["properties"], **extra_properties.get(name, {}))
+        features.append({"type": "Feature", "properties": properties, "geometry": feature["geometry"]})
+    return {"type": "FeatureCollection", "features": features}
+
+# Vider le cache (ex. : après remplacement des fichiers GeoJSON)
+def clear_cache():
+    with _lock:
+        _files.clear()
+        _subsets.clear()
@@ -0,0 +1,109 @@
+# models/index_utils.py
+
+# Conseiller d'index : analyser le plan d'exécution (EXPLAIN QUERY PLAN) de toutes les requêtes
+# des modèles, signaler les parcours complets de table et créer les index manquants
+
+# modules nécessaires
+import time                     # pour mesurer la durée des requêtes avant/après
+
+# Colonnes de population lues par les requêtes : ajoutées en fin de clé pour obtenir des index
+# « couvrants » (SQLite n'a pas de clause INCLUDE, la requête est alors servie par l'index seul)
+POPULATION_COLUMNS = [
+    '"TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)"',
+    '"MALE POPULATION. AS OF 1 JULY (THOUSANDS)"',
+    '"FEMALE POPULATION. AS OF 1 JULY (THOUSANDS)"',
+    '"POPULATION DENSITY. AS OF 1 JULY (PERSONS PER SQUARE KM)"',
+]
+
+# Index recommandés pour les chemins d'accès des requêtes : (nom, table, colonnes)
+RECOMMENDED_INDEXES = [
+    # filtres location_code = ... AND year ... et jointures fact_population -> country / region
+    ("idx_fact_population_location_year", "fact_population",
+     ["location_code", "year"] + POPULATION_COLUMNS),
+    # filtres et regroupements par année (WHERE year IN (...), GROUP BY year)
+    ("idx_fact_population_year_location", "fact_population",
+     ["year", "location_code"] + POPULATION_COLUMNS),
+    # remontée de la hiérarchie pays -> sous-région -> région -> continent
+    ("idx_country_location_parent", "country", ["location_code", "parent_code", "name"]),
+    ("idx_country_parent", "country", ["parent_code", "location_code"]),
+    ("idx_subregion_location_parent", "subregion", ["location_code", "parent_code", "name"]),
+    ("idx_region_location_parent", "region", ["location_code", "parent_code", "name"]),
+    ("idx_region_name", "region", ["name", "location_code"]),
+    ("idx_continent_location", "continent", ["location_code", "name"]),
+]
+
+# Paramètres d'exemple des requêtes paramétrées (placeholders "?"), pour le plan et la mesure
+SAMPLE_PARAMS = {
+    "dashboard_utils.SQL_DASHBOARD_KPIS": (1950, 2023),
+    "data_utils.SQL_TOP_N_COUNTRIES": (10,),
+    "rollup_utils.SQL_ROLLUP_TOP_N_COUNTRIES": (10,),
+    "query_utils.compile_query": (2000, 2023, 2, 9, 19, 142, 150, 150, 150, 150, 1000),
+}
+
+# Récupérer toutes les requêtes SQL_* des modèles : {"module.NOM": requête}
+def collect_statements():
+    from models import data_utils, dashboard_utils, rollup_utils, query_utils
+    statements = {}
+    for module in (data_utils, dashboard_utils, rollup_utils, query_utils):
+        short = module.__name__.split(".")[-1]
+        for name in sorted(dir(module)):
+            if name.startswith("SQL_") and isinstance(getattr(module, name), str):
+                statements[f"{short}.{name}"] = getattr(module, name)
+    # forme typique d'une requête à la carte : quelques lieux, deux indicateurs
+    statements["query_utils.compile_query"] = query_utils.compile_query(("total", "density"), 8, None)
+    return statements
+
+# Lister les tables présentes dans la base
+def existing_tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+# Plan d'exécution d'une requête : liste des étapes (texte de la colonne "detail")
+def query_plan(conn, query, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+
+# Étapes du plan qui parcourent une table entière sans index
+def full_scans(plan):
+    return [step for step in plan
+            if step.startswith("SCAN") and "USING INDEX" not in step and "USING COVERING INDEX" not in step]
+
+# Mesurer la durée médiane d'une requête (en secondes)
+def time_query(conn, query, repeat=5, params=()):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return durations[len(durations) // 2]
+
+# Analyser toutes les requêtes : {nom: {"plan": [...], "full_scans": [...], "seconds": durée}}
+# Les requêtes visant des tables absentes (ex. : rollups non construits) sont ignorées
+def analyze_statements(conn, statements, repeat=5):
+    report = {}
+    for name, query in statements.items():
+        params = SAMPLE_PARAMS.get(name, ())
+        try:
+            plan = query_plan(conn, query, params)
+        except Exception as e:
+            report[name] = {"error": str(e)}
+            continue
+        report[name] = {
+            "plan": plan,
+            "full_scans": full_scans(plan),
+            "seconds": time_query(conn, query, repeat, params) if repeat else None,
+        }
+    return report
+
+# Index recommandés qui n'existent pas encore (et dont la table existe)
+def missing_indexes(conn):
+    tables = existing_tables(conn)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    return [(name, table, columns) for name, table, columns in RECOMMENDED_INDEXES
+            if table in tables and name not in existing]
+
+# Créer les index manquants puis mettre à jour les statistiques de l'optimiseur
+def create_indexes(conn, indexes):
+    with conn:
+        for name, table, columns in indexes:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+    conn.execute("ANALYZE")
@@ -0,0 +1,369 @@
+# models/ingest_utils.py
+
+# Ingestion incrémentale d'une publication des World Population Prospects (WPP) dans WorldPopulation.db
+# - lecture en flux d'un fichier CSV (éventuellement .gz ou .zip) ou XLSX, par lots
+# - chargement de chaque lot dans une table temporaire (executemany), puis comparaison avec fact_population :
+#   seules les lignes (lieu, année) nouvelles ou modifiées sont écrites, dans une transaction par lot
+# - mise à jour des tables country / subregion / region (noms et rattachements)
+# - les rollups ne sont recalculés que pour les années touchées
+# - tout est fait sur une copie de la base, qui remplace l'original d'un seul coup (os.replace) :
+#   les workers en cours lisent l'ancien fichier jusqu'à ce que get_db_version détecte le nouveau
+# Utilisé par le script ingest.py
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import os                       # pour les chemins et le remplacement atomique
+import io                       # pour lire les fichiers compressés comme du texte
+import csv                      # pour lire les publications CSV
+import gzip                     # CSV compressés (.csv.gz)
+import zipfile                  # CSV compressés (.zip)
+import sqlite3                  # pour écrire la base
+import shutil                   # pour reporter les droits de la base sur sa copie
+import tempfile                 # copie de travail de la base
+import time                     # pour mesurer la durée de l'ingestion
+from urllib.parse import quote  # chemin de la base dans une URI SQLite
+from models import rollup_utils as ru               # mise à jour des agrégats pré-calculés
+from models import index_utils as iu                # index (lieu, année) de fact_population
+
+# En-têtes normalisés (majuscules, virgules -> points, comme les colonnes de fact_population)
+# des colonnes d'identification dans le classeur WPP
+KEY_COLUMNS = {
+    "LOCATION CODE": "location_code",
+    "YEAR": "year",
+    "TYPE": "type",
+    "PARENT CODE": "parent_code",
+    "REGION. SUBREGION. COUNTRY OR AREA *": "name",
+    "VARIANT": "variant",
+}
+
+# Noms des colonnes du fichier CSV de la WPP (WPP20xx_Demographic_Indicators_*.csv) -> en-têtes du classeur
+CSV_ALIASES = {
+    "LocID": "LOCATION CODE",
+    "Time": "YEAR",
+    "LocTypeName": "TYPE",
+    "ParentID": "PARENT CODE",
+    "Location": "REGION. SUBREGION. COUNTRY OR AREA *",
+    "Variant": "VARIANT",
+    "TPopulation1July": "TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)",
+    "TPopulationMale1July": "MALE POPULATION. AS OF 1 JULY (THOUSANDS)",
+    "TPopulationFemale1July": "FEMALE POPULATION. AS OF 1 JULY (THOUSANDS)",
+    "PopDensity": "POPULATION DENSITY. AS OF 1 JULY (PERSONS PER SQUARE KM)",
+    "LEx": "LIFE EXPECTANCY AT BIRTH. BOTH SEXES (YEARS)",
+    "CDR": "CRUDE DEATH RATE (DEATHS PER 1.000 POPULATION)",
+    "CBR": "CRUDE BIRTH RATE (BIRTHS PER 1.000 POPULATION)",
+}
+
+# Type de lieu WPP -> table de dimension (les continents sont un regroupement propre à l'application)
+TYPE_TABLES = {"Region": "region", "Subregion": "subregion", "Country/Area": "country"}
+# Libellés des types dans le fichier CSV -> libellés du classeur
+TYPE_ALIASES = {"Geographic region": "Region", "Country": "Country/Area"}
+
+# Valeurs manquantes dans les publications
+MISSING_VALUES = ("", "...", "…", "NA")
+
+class IngestError(ValueError):
+    """Fichier de publication illisible ou incompatible avec la base."""
+
+# Normaliser un en-tête : "Total Population, as of 1 July (thousands)" -> "TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)"
+def normalize_header(header):
+    header = CSV_ALIASES.get(str(header).strip(), header)
+    return " ".join(str(header).split()).upper().replace(",", ".")
+
+def _number(value):
+    if value is None or (isinstance(value, str) and value.strip() in MISSING_VALUES):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+###################################################################
+# Lecture en flux des fichiers
+
+# Ouvrir un CSV, éventuellement compressé (.gz, ou .zip contenant un seul CSV)
+def _open_csv(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    if path.endswith(".zip"):
+        archive = zipfile.ZipFile(path)
+        names = [n for n in archive.namelist() if n.lower().endswith(".csv")]
+        if len(names) != 1:
+            raise IngestError(f"{path} : l'archive doit contenir un seul fichier CSV")
+        return io.TextIOWrapper(archive.open(names[0]), encoding="utf-8-sig", newline="")
+    return open(path, encoding="utf-8-sig", newline="")
+
+# Lignes d'un CSV : (en-têtes normalisés, itérateur de lignes)
+def _csv_tables(path):
+    with _open_csv(path) as f:
+        sample = f.read(4096)
+        f.seek(0)
+        delimiter = ";" if sample.count(";") > sample.count(",") else ","
+        reader = csv.reader(f, delimiter=delimiter)
+        headers = [normalize_header(h) for h in next(reader)]
+        yield headers, reader
+
+# Lignes des feuilles d'un classeur (openpyxl en lecture seule) ; l'en-tête suit un préambule de plusieurs lignes
+def _xlsx_tables(path, sheets=None):
+    from openpyxl import load_workbook      # chargé seulement pour les classeurs
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet_name in sheets or workbook.sheetnames[:1]:
+            if sheet_name not in workbook.sheetnames:
+                raise IngestError(f"{path} : feuille introuvable '{sheet_name}'")
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            for row in rows:
+                headers = [normalize_header(h) if h is not None else "" for h in row]
+                if "LOCATION CODE" in headers and "YEAR" in headers:
+                    yield headers, rows
+                    break
+            else:
+                raise IngestError(f"{path} : en-tête introuvable dans la feuille '{sheet_name}'")
+    finally:
+        workbook.close()
+
+# Enregistrements (code, année, type, code parent, nom, variante, valeurs...) d'une publication
+# indicator_columns : colonnes de fact_population à lire, dans cet ordre
+def iter_records(path, indicator_columns, sheets=None):
+    tables = _xlsx_tables(path, sheets) if path.endswith((".xlsx", ".xlsm")) else _csv_tables(path)
+    for headers, rows in tables:
+        missing = [column for column in ("LOCATION CODE", "YEAR") if column not in headers]
+        if missing:
+            raise IngestError(f"{path} : colonnes absentes {', '.join(missing)}")
+        keys = [headers.index(column) if column in headers else None for column in KEY_COLUMNS]
+        values = [headers.index(column) if column in headers else None for column in indicator_columns]
+        for row in rows:
+            code, year = _number(row[keys[0]]), _number(row[keys[1]])
+            if code is None or year is None:
+                continue        # lignes de titre ou de séparation
+            info = [row[i] if i is not None and i < len(row) else None for i in keys[2:]]
+            parent = _number(info[1])
+            yield (int(code), int(year), TYPE_ALIASES.get(info[0], info[0]), None if parent is None else int(parent),
+                   info[2], info[3], *(_number(row[i]) if i is not None and i < len(row) else None for i in values))
+
+# Colonnes d'indicateurs présentes dans le fichier (pour créer fact_population dans une base neuve)
+def file_indicator_columns(path, sheets=None):
+    tables = _xlsx_tables(path, sheets) if path.endswith((".xlsx", ".xlsm")) else _csv_tables(path)
+    for headers, _ in tables:
+        # les indicateurs WPP portent leur unité entre parenthèses : "... (THOUSANDS)"
+        return [h for h in headers if h.endswith(")") and h not in KEY_COLUMNS]
+    return []
+
+###################################################################
+# Écriture dans la base
+
+def _quoted(columns):
+    return [f'"{column}"' for column in columns]
+
+# Créer les tables absentes (base neuve) ; renvoie les colonnes d'indicateurs de fact_population
+def ensure_schema(conn, path, sheets=None):
+    tables = iu.existing_tables(conn)
+    with conn:
+        if "fact_population" not in tables:
+            columns = file_indicator_columns(path, sheets)
+            if not columns:
+                raise IngestError(f"{path} : aucune colonne d'indicateur")
+            definitions = ", ".join(f"{column} REAL" for column in _quoted(columns))
+            conn.execute(f"CREATE TABLE fact_population (location_code INTEGER, year INTEGER, {definitions})")
+        if "continent" not in tables:
+            conn.execute("CREATE TABLE continent (location_code INTEGER PRIMARY KEY, name TEXT)")
+        for table in TYPE_TABLES.values():
+            if table not in tables:
+                conn.execute(f"CREATE TABLE {table} (location_code INTEGER PRIMARY KEY, name TEXT, parent_code INTEGER)")
+    # index (lieu, année) : comparaison et mise à jour des lots sans parcours complet de la table
+    iu.create_indexes(conn, [index for index in iu.missing_indexes(conn)
+                             if index[0] == "idx_fact_population_location_year"])
+    return [row[1] for row in conn.execute("PRAGMA table_info(fact_population)")
+            if row[1] not in ("location_code", "year")]
+
+# Mettre à jour les tables de dimension d'après les lignes d'un lot ; renvoie le nombre de lieux ajoutés ou modifiés
+# Le rattachement des régions aux continents est propre à l'application : il n'est pas modifié
+def upsert_dimensions(conn, records, dimensions):
+    inserts, updates = {}, {}
+    for code, _, loc_type, parent, name, *_ in records:
+        table = TYPE_TABLES.get(loc_type)
+        if table is None or name is None:
+            continue
+        existing = dimensions[table].get(code)
+        if existing is None:
+            if table == "region" and parent not in dimensions["continent"]:
+                parent = None       # continent à renseigner à la main (le code parent WPP n'en est pas un)
+            inserts.setdefault(table, {})[code] = (code, name, parent)
+        elif existing[0] != name or (table != "region" and existing[1] != parent):
+            updates.setdefault(table, {})[code] = (name, existing[1] if table == "region" else parent, code)
+    changed = 0
+    for table, rows in inserts.items():
+        conn.executemany(f"INSERT INTO {table} (location_code, name, parent_code) VALUES (?, ?, ?)", rows.values())
+        for code, name, parent in rows.values():
+            dimensions[table][code] = (name, parent)
+        changed += len(rows)
+    for table, rows in updates.items():
+        conn.executemany(f"UPDATE {table} SET name = ?, parent_code = ? WHERE location_code = ?", rows.values())
+        for name, parent, code in rows.values():
+            dimensions[table][code] = (name, parent)
+        changed += len(rows)
+    return changed
+
+# Charger un lot dans la table temporaire, puis écrire les lignes nouvelles ou modifiées
+# Renvoie {année: (nouvelles, modifiées)} et le nombre de lignes identiques
+def apply_chunk(conn, rows, columns):
+    quoted = _quoted(columns)
+    conn.execute("DELETE FROM temp.ingest_stage")
+    conn.executemany(
+        f"INSERT OR REPLACE INTO temp.ingest_stage VALUES (?, ?, {', '.join('?' * len(columns))})", rows)
+    differs = " OR ".join(f"f.{c} IS NOT s.{c}" for c in quoted) or "0"
+    changes = {year: (new, changed) for year, new, changed in conn.execute(f"""
+        SELECT s.year, SUM(f.location_code IS NULL), SUM(f.location_code IS NOT NULL)
+        FROM temp.ingest_stage s
+        LEFT JOIN fact_population f ON f.location_code = s.location_code AND f.year = s.year
+        WHERE f.location_code IS NULL OR {differs}
+        GROUP BY s.year""")}
+    if changes:
+        assignments = ", ".join(f"{c} = s.{c}" for c in quoted)
+        conn.execute(f"""
+            UPDATE fact_population AS f SET {assignments}
+            FROM temp.ingest_stage s
+            WHERE f.location_code = s.location_code AND f.year = s.year AND ({differs})""")
+        conn.execute(f"""
+            INSERT INTO fact_population (location_code, year, {', '.join(quoted)})
+            SELECT s.location_code, s.year, {', '.join('s.' + c for c in quoted)}
+            FROM temp.ingest_stage s
+            WHERE NOT EXISTS (SELECT 1 FROM fact_population f
+                              WHERE f.location_code = s.location_code AND f.year = s.year)""")
+    staged = conn.execute("SELECT COUNT(*) FROM temp.ingest_stage").fetchone()[0]
+    return changes, staged - sum(new + changed for new, changed in changes.values())
+
+# Ingérer une publication dans une connexion ouverte (lots de chunk_size lignes, une transaction par lot)
+# variant : ne garder que cette variante (ex. : "Medium") ; types : types de lieux gardés
+def ingest_release(conn, path, sheets=None, variant=None, chunk_size=None, types=None, on_chunk=None):
+    chunk_size = chunk_size or config.INGEST_CHUNK_SIZE
+    types = set(types or config.INGEST_LOCATION_TYPES)
+    columns = ensure_schema(conn, path, sheets)
+    quoted = _quoted(columns)
+    conn.execute("DROP TABLE IF EXISTS temp.ingest_stage")
+    conn.execute(f"CREATE TEMP TABLE ingest_stage (location_code INTEGER, year INTEGER, "
+                 f"{', '.join(c + ' REAL' for c in quoted)}, PRIMARY KEY (location_code, year))")
+    dimensions = {table: {row[0]: (row[1], row[2]) for row in
+                          conn.execute(f"SELECT location_code, name, parent_code FROM {table}")}
+                  for table in TYPE_TABLES.values()}
+    # continents : seuls leurs codes servent (rattachement des nouvelles régions)
+    dimensions["continent"] = {row[0] for row in conn.execute("SELECT location_code FROM continent")}
+
+    report = {"read": 0, "skipped": 0, "inserted": 0, "updated": 0, "unchanged": 0, "locations": 0, "years": set()}
+    def flush(records):
+        with conn:
+            report["locations"] += upsert_dimensions(conn, records, dimensions)
+            changes, unchanged = apply_chunk(conn, [(r[0], r[1], *r[6:]) for r in records], columns)
+        for year, (new, changed) in changes.items():
+            report["inserted"] += new
+            report["updated"] += changed
+            report["years"].add(year)
+        report["unchanged"] += unchanged
+        if on_chunk:
+            on_chunk(report)
+
+    chunk = []
+    for record in iter_records(path, columns, sheets):
+        report["read"] += 1
+        loc_type, row_variant = record[2], record[5]
+        if (loc_type is not None and loc_type not in types) or (variant and row_variant and row_variant != variant):
+            report["skipped"] += 1
+            continue
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    conn.execute("DROP TABLE IF EXISTS temp.ingest_stage")
+    report["years"] = sorted(report["years"])
+    return report
+
+###################################################################
+# Copie de travail et remplacement atomique de la base
+
+# Copier la base (API de sauvegarde SQLite : copie cohérente même pendant des lectures) dans le même dossier
+def working_copy(database):
+    directory = os.path.dirname(os.path.abspath(database))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(database) + ".", suffix=".ingest", dir=directory)
+    os.close(fd)
+    if os.path.exists(database):
+        source = sqlite3.connect(f"file:{quote(database)}?mode=ro", uri=True)
+        target = sqlite3.connect(tmp_path)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+    return tmp_path
+
+# Donner à la copie les droits et le propriétaire de la base (mkstemp la crée en 0600 : les workers
+# lancés sous un autre utilisateur ne pourraient plus l'ouvrir) ; base neuve : droits par défaut (umask)
+def _copy_permissions(database, tmp_path):
+    if not os.path.exists(database):
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        return
+    shutil.copymode(database, tmp_path)
+    if hasattr(os, "chown"):
+        stat = os.stat(database)
+        try:
+            os.chown(tmp_path, stat.st_uid, stat.st_gid)
+        except PermissionError:
+            # sans droits d'administration : garder au moins le groupe si possible
+            try:
+                os.chown(tmp_path, -1, stat.st_gid)
+            except PermissionError:
+                pass
+
+# Remplacer la base par la copie : le nouveau fichier est complet sur disque avant d'apparaître sous son nom
+def swap_database(tmp_path, database):
+    _copy_permissions(database, tmp_path)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, database)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(os.path.dirname(os.path.abspath(database)), os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+# Ingestion complète : copie, chargement, mise à jour des rollups, remplacement (sauf dry_run)
+# Renvoie le rapport d'ingestion, complété par "rollups" et "seconds"
+def ingest(path, database=None, sheets=None, variant=None, chunk_size=None, dry_run=False,
+           refresh_rollups=True, on_chunk=None):
+    database = database or config.DATABASE
+    start = time.perf_counter()
+    tmp_path = working_copy(database)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            report = ingest_release(conn, path, sheets, variant, chunk_size, on_chunk=on_chunk)
+            report["rollups"] = None
+            if refresh_rollups and (report["years"] or report["locations"]) and ru.rollups_built(conn):
+                # un nom ou un rattachement modifié touche toutes les années : reconstruction complète
+                if report["locations"]:
+                    ru.build_rollups(conn)
+                    report["rollups"] = "all"
+                else:
+                    ru.refresh_rollups(conn, report["years"])
+                    report["rollups"] = report["years"]
+            if report["years"] or report["locations"]:
+                conn.execute("ANALYZE")
+            conn.execute("PRAGMA journal_mode = DELETE")     # aucun fichier -wal à côté de la base
+        finally:
+            conn.close()
+        changed = bool(report["years"] or report["locations"])
+        if dry_run or not changed:
+            os.remove(tmp_path)
+        else:
+            swap_database(tmp_path, database)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    report["swapped"] = changed and not dry_run
+    report["seconds"] = time.perf_counter() - start
+    return report
@@ -0,0 +1,33 @@
+# models/json_utils.py
+
+# Sérialisation JSON des résultats de requêtes pour l'API (/api/<query_type>)
+# Format en colonnes : une liste de valeurs par colonne, plus compact et plus rapide à tracer
+# côté navigateur qu'une liste de lignes
+
+# modules nécessaires
+import json                     # encodeur JSON de la bibliothèque standard (repli)
+from models.result_utils import ResultSet           # résultats déjà stockés par colonnes
+
+# Encodeur rapide optionnel : orjson s'il est installé (pip install orjson)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Transformer une liste de lignes en colonnes : {"columns": [...], "data": {colonne: [valeurs]}}
+def to_columns(rows, headers):
+    if isinstance(rows, ResultSet):
+        columns = rows.column_lists()
+    else:
+        columns = list(zip(*rows)) if rows else [()] * len(headers)
+    return {
+        "columns": list(headers),
+        "rows": len(rows),
+        "data": {header: list(values) for header, values in zip(headers, columns)},
+    }
+
+# Encoder un objet en JSON compact (bytes UTF-8)
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,266 @@
+# models/metrics_utils.py
+
+# Instrumentation des requêtes : durée de chaque étape (SQL, attente du pool, construction des figures,
+# rendu des templates), nombre de lignes lues et taille des réponses
+# - par requête HTTP : en-tête Server-Timing (les étapes de la requête en cours sont suivies par un ContextVar)
+# - pour tout le processus : compteurs et histogrammes au format texte Prometheus (route /metrics)
+# - à la demande : profileur par échantillonnage produisant des piles "repliées" (flame graph)
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import os                       # pour écrire les profils
+import hmac                     # comparaison du jeton des routes internes
+import sys                      # pour lire les piles des threads (profileur)
+import time                     # pour mesurer les durées
+import sqlite3                  # pour instrumenter les connexions
+import threading                # pour protéger les compteurs entre les threads
+import contextvars              # étapes de la requête en cours
+from contextlib import contextmanager
+
+###################################################################
+# Étapes de la requête en cours (Server-Timing)
+
+class RequestTimings:
+    """Durées cumulées par étape pour une requête : {étape: [secondes, appels, lignes, octets]}."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, rows=0, size=0):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0, 0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+            entry[2] += rows
+            entry[3] += size
+
+    # Valeur de l'en-tête Server-Timing : sql;dur=12.3;desc="4 appels, 740 lignes", ..., total;dur=...
+    def header(self):
+        parts = []
+        with self._lock:
+            for stage, (seconds, calls, rows, size) in self.stages.items():
+                desc = f"{calls} appel{'s' if calls > 1 else ''}"
+                if rows:
+                    desc += f", {rows} lignes"
+                if size:
+                    desc += f", {size} octets"
+                parts.append(f'{stage};dur={seconds * 1000:.1f};desc="{desc}"')
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+# Commencer le suivi d'une requête (renvoie le jeton pour end_request)
+def start_request():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+def end_request(token):
+    _current.reset(token)
+
+def current_timings():
+    return _current.get()
+
+# Enregistrer la durée d'une étape : dans la requête en cours (s'il y en a une) et dans les métriques
+def record(stage, seconds, rows=0, size=0):
+    if not config.METRICS_ENABLED:
+        return
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds, rows, size)
+    STAGE_DURATION.observe(seconds, stage=stage)
+    if rows:
+        SQL_ROWS.inc(rows)
+
+# Mesurer un bloc : with timed("render"): ...
+@contextmanager
+def timed(stage, size=0):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, size=size)
+
+###################################################################
+# Connexions SQLite instrumentées : durée de chaque execute/fetch et nombre de lignes lues
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            record("sql", time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        record("sql", time.perf_counter() - start, rows=len(rows))
+        return rows
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        record("sql", time.perf_counter() - start, rows=len(rows))
+        return rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        record("sql", time.perf_counter() - start, rows=row is not None)
+        return row
+
+class InstrumentedConnection(sqlite3.Connection):
+    # Connection.execute n'appelle pas self.cursor() : passer explicitement par le curseur instrumenté
+    def execute(self, sql, params=()):
+        return self.cursor(InstrumentedCursor).execute(sql, params)
+
+###################################################################
+# Métriques Prometheus (format texte 0.0.4), sans dépendance externe
+
+# Bornes des histogrammes de durée (en secondes)
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name, self.help = name, help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(dict(key))} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS):
+        self.name, self.help, self.buckets = name, help_text, buckets
+        self._values = {}   # labels -> [compteurs par borne, somme, nombre]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                labels = dict(key)
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels(dict(labels, le=bound))} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_labels(dict(labels, le='+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+REQUESTS = Counter("app_requests_total", "Requêtes HTTP traitées par route, méthode et statut")
+REQUEST_DURATION = Histogram("app_request_duration_seconds", "Durée des requêtes HTTP par route")
+RESPONSE_BYTES = Counter("app_response_bytes_total", "Octets envoyés par route (réponses de taille connue)")
+STAGE_DURATION = Histogram("app_stage_duration_seconds", "Durée des étapes (sql, pool, render, template)")
+SQL_ROWS = Counter("app_sql_rows_total", "Lignes lues dans SQLite")
+
+METRICS = [REQUESTS, REQUEST_DURATION, RESPONSE_BYTES, STAGE_DURATION, SQL_ROWS]
+
+# Fonctions appelées à chaque lecture de /metrics : renvoient [(nom, type, aide, {labels}, valeur)]
+_collectors = []
+
+def register_collector(func):
+    _collectors.append(func)
+    return func
+
+# Texte complet de la route /metrics
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    declared = set()
+    for collector in _collectors:
+        for name, kind, help_text, labels, value in collector():
+            if name not in declared:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                declared.add(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+###################################################################
+# Accès aux routes internes (métriques, compteurs des caches, profileur)
+
+# Requête autorisée : jeton PROFILE_TOKEN (en-tête X-Profile-Token ou Authorization: Bearer),
+# ou, sans jeton configuré, requête locale directe
+def internal_access_allowed(request):
+    if config.PROFILE_TOKEN:
+        token = request.headers.get('X-Profile-Token', '')
+        authorization = request.headers.get('Authorization', '')
+        if not token and authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+        # comparaison en octets : un en-tête non ASCII (décodé en latin-1) est refusé, sans TypeError
+        return hmac.compare_digest(token.encode("utf-8"), config.PROFILE_TOKEN.encode("utf-8"))
+    return request.remote_addr in config.PROFILE_ALLOWED_ADDRS and 'X-Forwarded-For' not in request.headers
+
+###################################################################
+# Profileur par échantillonnage : un thread relève la pile du thread de la requête à intervalle régulier
+# Le résultat est au format "replié" (fonction;fonction;... nombre), lu par flamegraph.pl ou speedscope
+
+class SamplingProfiler:
+    def __init__(self, thread_id=None, interval=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval or config.PROFILE_INTERVAL
+        self.samples = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0) + 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    # Écrire les piles repliées dans config.PROFILE_DIR ; renvoie le nom du fichier (dans ce dossier)
+    def dump(self, name):
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+        path = os.path.join(config.PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        return os.path.basename(path)
@@ -0,0 +1,235 @@
+# models/query_utils.py
+
+# Requêtes à la carte sur fact_population : plage d'années, lieux (codes, niveau de la hiérarchie
+# ou descendants d'un lieu) et indicateurs choisis, compilés en SQL paramétré.
+# Seules les lignes et colonnes demandées sont lues, via l'index (location_code, year) ;
+# le texte SQL ne dépend que de la forme de la demande, ce qui permet à SQLite de réutiliser
+# ses requêtes préparées (cache "cached_statements" de chaque connexion du pool).
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import functools                # pour mémoriser le SQL compilé
+from models.db_utils import pooled_connection
+from models.cache_utils import cached_query         # pour mémoriser les résultats
+
+class QueryError(ValueError):
+    """Paramètre de requête invalide (message destiné à l'utilisateur)."""
+
+class NoDataError(QueryError):
+    """Base vide ou en cours d'ingestion : aucune année disponible."""
+
+# Indicateurs disponibles : nom court -> (colonne de fact_population, facteur, libellé)
+INDICATORS = {
+    "total": ("TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)", 1000, "Population"),
+    "male": ("MALE POPULATION. AS OF 1 JULY (THOUSANDS)", 1000, "Hommes"),
+    "female": ("FEMALE POPULATION. AS OF 1 JULY (THOUSANDS)", 1000, "Femmes"),
+    "density": ("POPULATION DENSITY. AS OF 1 JULY (PERSONS PER SQUARE KM)", 1, "Densité"),
+    "life": ("LIFE EXPECTANCY AT BIRTH. BOTH SEXES (YEARS)", 1, "Espérance de vie"),
+    "death": ("CRUDE DEATH RATE (DEATHS PER 1.000 POPULATION)", 1, "Taux de mortalité"),
+    "birth": ("CRUDE BIRTH RATE (BIRTHS PER 1.000 POPULATION)", 1, "Taux de natalité"),
+}
+
+# Niveaux de la hiérarchie : nom -> table des lieux ("world" : agrégat mondial, code 900)
+LEVELS = {"continent": "continent", "region": "region", "subregion": "subregion", "country": "country"}
+WORLD_CODE = 900
+
+# Tous les lieux de la hiérarchie
+SQL_LOCATIONS = """
+    SELECT location_code, name, parent_code, 'continent' AS level FROM continent
+    UNION ALL SELECT location_code, name, parent_code, 'region' FROM region
+    UNION ALL SELECT location_code, name, parent_code, 'subregion' FROM subregion
+    UNION ALL SELECT location_code, name, parent_code, 'country' FROM country
+    ORDER BY location_code;
+    """
+
+SQL_YEAR_BOUNDS = """
+    SELECT MIN(year), MAX(year) FROM fact_population;
+    """
+
+@cached_query
+def get_locations():
+    with pooled_connection() as conn:
+        results = conn.execute(SQL_LOCATIONS).fetchall()
+    return results
+
+@cached_query
+def get_year_bounds():
+    with pooled_connection() as conn:
+        results = conn.execute(SQL_YEAR_BOUNDS).fetchall()
+    return results
+
+# (première année, dernière année) de la base ; NoDataError si fact_population est vide
+def year_bounds():
+    rows = get_year_bounds()
+    if not rows or rows[0][0] is None:
+        raise NoDataError("aucune année disponible dans la base")
+    return tuple(rows[0])
+
+# {code: (nom, code parent, niveau)}, avec l'agrégat mondial
+def location_index():
+    index = {WORLD_CODE: ("World", None, "world")}
+    index.update({row[0]: (row[1], row[2], row[3]) for row in get_locations()})
+    return index
+
+# Codes de tous les descendants d'un lieu (pays d'une région, sous-régions d'un continent, ...)
+def descendants(code, index):
+    children = {}
+    for child, (_, parent, _) in index.items():
+        children.setdefault(parent, []).append(child)
+    found, stack = set(), list(children.get(code, []))
+    while stack:
+        child = stack.pop()
+        if child not in found:
+            found.add(child)
+            stack.extend(children.get(child, []))
+    return found
+
+###################################################################
+# Lecture et validation des paramètres
+
+def _year(value, bounds, name):
+    if value == "latest":
+        return bounds[1]
+    if value == "first":
+        return bounds[0]
+    try:
+        return int(value)
+    except ValueError:
+        raise QueryError(f"{name} : année attendue (ou 'first' / 'latest'), reçu '{value}'")
+
+def _codes(value):
+    try:
+        return {int(code) for code in value.split(",") if code.strip()}
+    except ValueError:
+        raise QueryError(f"locations : liste de codes numériques attendue, reçu '{value}'")
+
+# Paramètres d'URL -> demande normalisée (dictionnaire d'arguments de run_query)
+# from / to      : années (ou 'first' / 'latest' ; par défaut la dernière année seulement)
+# locations      : codes séparés par des virgules
+# level          : world, continent, region, subregion ou country
+# within         : code d'un lieu dont on veut les descendants (ex. : within=908&level=country)
+# indicators     : noms courts séparés par des virgules (par défaut : total)
+def parse_query(args):
+    bounds = year_bounds()
+    year_to = _year(args.get("to", "latest"), bounds, "to")
+    year_from = _year(args.get("from", str(year_to)), bounds, "from")
+    if year_from > year_to:
+        raise QueryError("from doit être inférieure ou égale à to")
+
+    indicators = tuple(dict.fromkeys(i.strip() for i in args.get("indicators", "total").split(",") if i.strip()))
+    unknown = [i for i in indicators if i not in INDICATORS]
+    if not indicators or unknown:
+        raise QueryError(f"indicators : valeurs possibles {', '.join(INDICATORS)}")
+
+    level = args.get("level") or None
+    if level is not None and level != "world" and level not in LEVELS:
+        raise QueryError(f"level : valeurs possibles world, {', '.join(LEVELS)}")
+
+    codes = _codes(args.get("locations", ""))
+    within = args.get("within")
+    # sans critère de lieu : agrégat mondial
+    if not codes and not within and level is None:
+        level = "world"
+    if within:
+        index = location_index()
+        try:
+            parent = int(within)
+        except ValueError:
+            raise QueryError(f"within : code numérique attendu, reçu '{within}'")
+        if parent not in index:
+            raise QueryError(f"within : lieu inconnu {parent}")
+        codes |= {code for code in descendants(parent, index) if level in (None, index[code][2])}
+        level = None
+    elif level == "world":
+        codes.add(WORLD_CODE)
+        level = None
+    if not codes and level is None:
+        raise QueryError("Aucun lieu ne correspond à la demande")
+    if len(codes) > config.QUERY_MAX_LOCATIONS:
+        raise QueryError(f"Au plus {config.QUERY_MAX_LOCATIONS} lieux par requête")
+
+    return {"year_from": year_from, "year_to": year_to, "codes": tuple(sorted(codes)),
+            "level": level, "indicators": indicators}
+
+###################################################################
+# Compilation et exécution
+
+# Nombre de paramètres de la clause IN arrondi à la puissance de 2 supérieure :
+# peu de textes SQL différents, donc des requêtes préparées réutilisées
+def code_slots(count):
+    slots = 1
+    while slots < count:
+        slots *= 2
+    return slots if count else 0
+
+# Texte SQL d'une forme de demande (mémorisé) : paramètres année début, année fin, codes..., limite
+@functools.lru_cache(maxsize=256)
+def compile_query(indicators, slots, level):
+    columns = []
+    for name in indicators:
+        column, factor, _ = INDICATORS[name]
+        columns.append(f'fp."{column}"' + (f" * {factor}" if factor != 1 else "") + f" AS {name}")
+    where = ["fp.year BETWEEN ? AND ?"]
+    if slots:
+        where.append(f"fp.location_code IN ({', '.join('?' * slots)})")
+    if level is not None:
+        where.append(f"fp.location_code IN (SELECT location_code FROM {LEVELS[level]})")
+    return (f"SELECT fp.location_code, fp.year, {', '.join(columns)} FROM fact_population fp "
+            f"WHERE {' AND '.join(where)} ORDER BY fp.location_code, fp.year LIMIT ?")
+
+# En-têtes des colonnes du résultat
+def result_headers(indicators):
+    return ["Code", "Lieu", "Année"] + [INDICATORS[name][2] for name in indicators]
+
+# Exécuter une demande : lignes (code, lieu, année, indicateurs...) ; au plus "limit" lignes
+@cached_query
+def run_query(year_from, year_to, codes, level, indicators, limit):
+    slots = code_slots(len(codes))
+    padded = list(codes) + [codes[-1]] * (slots - len(codes)) if codes else []
+    with pooled_connection() as conn:
+        rows = conn.execute(compile_query(indicators, slots, level),
+                            [year_from, year_to, *padded, limit]).fetchall()
+    names = location_index()
+    return [(row[0], names.get(row[0], (None,))[0], *row[1:]) for row in rows]
+
+###################################################################
+# Valeurs par pays pour une année (cartes choroplèthes, cf. tile_utils)
+
+# Paramètres d'URL d'une carte : indicator (défaut : density), year (défaut : dernière année),
+# within (optionnel : seuls les pays de ce lieu ont une valeur)
+def parse_map_query(args):
+    bounds = year_bounds()
+    indicator = args.get("indicator", "density")
+    if indicator not in INDICATORS:
+        raise QueryError(f"indicator : valeurs possibles {', '.join(INDICATORS)}")
+    year = _year(args.get("year", "latest"), bounds, "year")
+    if not bounds[0] <= year <= bounds[1]:
+        raise QueryError(f"year : entre {bounds[0]} et {bounds[1]}")
+    within = args.get("within") or None
+    if within is not None:
+        try:
+            within = int(within)
+        except ValueError:
+            raise QueryError(f"within : code numérique attendu, reçu '{within}'")
+        if within not in location_index():
+            raise QueryError(f"within : lieu inconnu {within}")
+    return {"indicator": indicator, "year": year, "within": within}
+
+# Valeur d'un indicateur pour chaque pays : [(code, nom, valeur)]
+@cached_query
+def get_country_values(indicator, year):
+    column, factor, _ = INDICATORS[indicator]
+    value = f'fp."{column}"' + (f" * {factor}" if factor != 1 else "")
+    query = (f"SELECT c.location_code, c.name, {value} FROM country c "
+             f"JOIN fact_population fp ON fp.location_code = c.location_code WHERE fp.year = ?")
+    with pooled_connection() as conn:
+        results = conn.execute(query, (year,)).fetchall()
+    return results
+
+# {nom du pays: valeur} d'une carte (nom = NAME_ENGL des fichiers GeoJSON, comme la carte de densité)
+def country_value_lookup(indicator, year, within=None):
+    rows = get_country_values(indicator, year)
+    if within is not None:
+        codes = descendants(within, location_index())
+        rows = [row for row in rows if row[0] in codes]
+    return {row[1]: row[2] for row in rows if row[2] is not None}
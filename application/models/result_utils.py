@@ -0,0 +1,151 @@
+# models/result_utils.py
+
+# Résultats de requêtes en colonnes : au lieu d'une liste d'objets sqlite3.Row (un objet par ligne
+# et par cellule), chaque colonne est stockée une seule fois
+# - entiers et réels : array typé ('q' ou 'd'), 8 octets par valeur, sans objet Python par cellule
+# - textes : liste dont les valeurs répétées (noms de régions, de continents...) partagent le même objet
+# - colonnes mixtes ou avec NULL : liste ordinaire
+# Le résultat se parcourt comme une liste de tuples (templates, CSV, Excel) et alimente directement
+# les DataFrame (numpy.frombuffer, sans copie) et le JSON en colonnes.
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import sys                      # pour estimer la taille en mémoire
+from array import array         # colonnes numériques typées
+
+# Type de l'array d'une colonne homogène (les booléens restent en liste)
+ARRAY_TYPECODES = {int: "q", float: "d"}
+NUMPY_DTYPES = {"q": "int64", "d": "float64"}
+
+# Stocker une colonne sous la forme la plus compacte qui conserve exactement les valeurs
+# shared : textes déjà rencontrés dans la colonne (partagé entre les lots d'un même curseur)
+def compact_column(values, shared=None):
+    types = set(map(type, values))
+    if len(types) == 1:
+        kind = types.pop()
+        if kind in ARRAY_TYPECODES:
+            try:
+                return array(ARRAY_TYPECODES[kind], values)
+            except OverflowError:
+                return values
+        if kind is str:
+            shared = {} if shared is None else shared
+            return [shared.setdefault(value, value) for value in values]
+    return values
+
+# Ajouter un lot de valeurs à une colonne ; un array redevient une liste si le lot ne convient pas
+# (NULL, autre type, entier hors de l'intervalle 64 bits)
+def extend_column(column, values, shared):
+    if column is None:
+        return compact_column(list(values), shared)
+    if isinstance(column, array):
+        kind = float if column.typecode == "d" else int
+        if all(type(value) is kind for value in values):
+            size = len(column)
+            try:
+                column.extend(values)
+                return column
+            except OverflowError:
+                del column[size:]
+        column = column.tolist()
+    column.extend(shared.setdefault(value, value) if type(value) is str else value for value in values)
+    return column
+
+class ResultSet:
+    """Résultat d'une requête stocké par colonnes ; se parcourt comme une liste de tuples (lecture seule)."""
+
+    __slots__ = ("names", "columns", "_length")
+
+    def __init__(self, names, columns):
+        self.names = tuple(names)
+        self.columns = tuple(columns)
+        self._length = len(self.columns[0]) if self.columns else 0
+
+    # Construire depuis des lignes (tuples) ; names : noms des colonnes (par défaut c0, c1, ...)
+    @classmethod
+    def from_rows(cls, rows, names=None):
+        columns = [compact_column(list(values)) for values in zip(*rows)]
+        if names is None:
+            names = [f"c{i}" for i in range(len(columns))]
+        if not columns:
+            columns = [[] for _ in names]
+        return cls(names, columns)
+
+    # Lire un curseur par lots, chaque lot étant ajouté aux colonnes compactes :
+    # seuls les tuples d'un lot existent en même temps (pic mémoire proche de la taille finale)
+    @classmethod
+    def from_cursor(cls, cursor, batch_size=None):
+        batch_size = batch_size or config.EXPORT_BATCH_SIZE
+        cursor.row_factory = None       # tuples plutôt que sqlite3.Row
+        names = [description[0] for description in cursor.description]
+        columns = [None] * len(names)
+        shared = [{} for _ in names]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for i, values in enumerate(zip(*rows)):
+                columns[i] = extend_column(columns[i], values, shared[i])
+        return cls(names, [[] if column is None else column for column in columns])
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return zip(*self.columns)
+
+    # result[i] : tuple de la ligne i ; result[i:j] : liste de tuples (lots d'export)
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(zip(*(column[index] for column in self.columns)))
+        return tuple(column[index] for column in self.columns)
+
+    def __repr__(self):
+        return f"<ResultSet {len(self)} lignes x {len(self.columns)} colonnes>"
+
+    # Colonnes en listes Python (sérialisation JSON)
+    def column_lists(self):
+        return [column.tolist() if isinstance(column, array) else column for column in self.columns]
+
+    # DataFrame pandas : les colonnes numériques sont lues sans copie (numpy.frombuffer)
+    def to_frame(self, names=None):
+        import numpy as np          # dépendance de pandas
+        import pandas as pd
+        names = list(names or self.names)
+        data = {}
+        for name, column in zip(names, self.columns):
+            if isinstance(column, array) and len(column):
+                data[name] = np.frombuffer(column, dtype=NUMPY_DTYPES[column.typecode])
+            else:
+                data[name] = column
+        return pd.DataFrame(data, columns=names)
+
+    # Empreinte mémoire estimée (les textes partagés ne sont comptés qu'une fois)
+    def nbytes(self):
+        size = sys.getsizeof(self)
+        for column in self.columns:
+            size += sys.getsizeof(column)
+            if not isinstance(column, array):
+                size += sum(sys.getsizeof(value) for value in {id(v): v for v in column}.values())
+        return size
+
+# Lire le résultat d'une requête : ResultSet, ou liste de sqlite3.Row si config.COMPACT_ROWS est désactivé
+def fetch_result(conn, query, params=()):
+    cursor = conn.execute(query, params)
+    if not config.COMPACT_ROWS:
+        return cursor.fetchall()
+    try:
+        return ResultSet.from_cursor(cursor)
+    finally:
+        cursor.close()
+
+# Même représentation pour un résultat déjà calculé sous forme de tuples (moteur en mémoire)
+def as_result(rows):
+    return ResultSet.from_rows(rows) if config.COMPACT_ROWS else rows
+
+# DataFrame d'un résultat, quelle que soit sa représentation
+def to_frame(data, names):
+    if isinstance(data, ResultSet):
+        return data.to_frame(names)
+    import pandas as pd
+    return pd.DataFrame(data, columns=names)
@@ -0,0 +1,158 @@
+# models/rollup_utils.py
+
+# Tables d'agrégats pré-calculées (rollups) stockées dans WorldPopulation.db
+# Elles sont construites hors ligne par le script build_rollups.py ;
+# les fonctions get_* les lisent quand elles existent et reviennent aux requêtes à la volée sinon
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import sqlite3                  # pour intercepter les erreurs SQLite
+import time                     # pour mesurer la durée de construction de chaque table
+from models.db_utils import pooled_connection, get_db_version
+
+# Version du schéma des rollups : à incrémenter dès qu'une table ou une colonne change
+ROLLUP_SCHEMA_VERSION = 1
+ROLLUP_META_TABLE = "rollup_meta"
+
+###################################################################
+# Requêtes de lecture des tables pré-calculées
+# Elles renvoient les mêmes colonnes, dans le même ordre, que les requêtes à la volée de data_utils
+
+SQL_ROLLUP_COUNTRY_REGION_SHARE = """
+    SELECT region, country, year, country_population, region_population, population_rate_percent
+    FROM rollup_country_region_share
+    ORDER BY year DESC, region, population_rate_percent DESC;
+    """
+
+SQL_ROLLUP_POPULATION_BY_CONTINENT = """
+    SELECT continent, year, population
+    FROM rollup_population_by_continent
+    ORDER BY year, population DESC;
+    """
+
+SQL_ROLLUP_WORLD_POPULATION_BY_YEAR = """
+    SELECT year, male_population, female_population, total_population
+    FROM rollup_world_population_by_year
+    ORDER BY year;
+    """
+
+SQL_ROLLUP_POPULATION_BY_REGION = """
+    SELECT region_name, year, total_population
+    FROM rollup_population_by_region
+    ORDER BY region_name, year;
+    """
+
+SQL_ROLLUP_TOP_10_COUNTRIES = """
+    SELECT year, country_name, subregion_name, region_name, continent_name, population
+    FROM rollup_ranked_countries
+    WHERE rank <= 10
+    ORDER BY year, population DESC;
+    """
+
+SQL_ROLLUP_TOP_N_COUNTRIES = """
+    SELECT year, country_name, subregion_name, region_name, continent_name, population
+    FROM rollup_ranked_countries
+    WHERE rank <= ?
+    ORDER BY year, population DESC;
+    """
+
+###################################################################
+# Disponibilité des rollups (mémorisée pour la version courante de la base)
+
+_available = {}
+
+def rollups_available():
+    if not config.ROLLUPS_ENABLED:
+        return False
+    version = get_db_version()
+    if version not in _available:
+        try:
+            with pooled_connection() as conn:
+                row = conn.execute(
+                    f"SELECT value FROM {ROLLUP_META_TABLE} WHERE key = 'schema_version'"
+                ).fetchone()
+            available = row is not None and int(row[0]) == ROLLUP_SCHEMA_VERSION
+        except sqlite3.Error:
+            # table rollup_meta absente : la base n'a pas été préparée
+            available = False
+        _available.clear()
+        _available[version] = available
+    return _available[version]
+
+###################################################################
+# Construction des rollups (script build_rollups.py)
+
+# Liste des tables à matérialiser : (nom, requête de construction, index)
+def rollup_definitions():
+    # import local : data_utils importe ce module
+    from models import data_utils as du
+    return [
+        ("rollup_country_region_share", du.SQL_COUNTRY_REGION_SHARE,
+         ["year, region, population_rate_percent"]),
+        ("rollup_population_by_continent", du.SQL_POPULATION_BY_CONTINENT,
+         ["year, population"]),
+        ("rollup_world_population_by_year", du.SQL_WORLD_POPULATION_BY_YEAR,
+         ["year"]),
+        ("rollup_population_by_region", du.SQL_POPULATION_BY_REGION,
+         ["region_name, year"]),
+        ("rollup_ranked_countries", du.SQL_RANKED_COUNTRIES,
+         ["rank, year"]),
+    ]
+
+# (Re)construire toutes les tables dans une seule transaction ; renvoie {table: (lignes, secondes)}
+def build_rollups(conn):
+    report = {}
+    with conn:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {ROLLUP_META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+        for table, query, indexes in rollup_definitions():
+            start = time.perf_counter()
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"CREATE TABLE {table} AS {query.strip().rstrip(';')}")
+            for i, columns in enumerate(indexes):
+                conn.execute(f"CREATE INDEX idx_{table}_{i} ON {table} ({columns})")
+            rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            report[table] = (rows, time.perf_counter() - start)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {ROLLUP_META_TABLE} (key, value) VALUES (?, ?)",
+            [("schema_version", str(ROLLUP_SCHEMA_VERSION)),
+             ("built_at", time.strftime("%Y-%m-%dT%H:%M:%S"))],
+        )
+    conn.execute("ANALYZE")
+    return report
+
+# Les rollups ont-ils été construits dans cette base (connexion en écriture, hors pool) ?
+def rollups_built(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ROLLUP_META_TABLE,)
+    ).fetchone()
+    return row is not None
+
+# Recalculer uniquement les lignes des années indiquées (ingestion incrémentale, script ingest.py)
+# Toutes les tables ont une colonne year et chaque année y est calculée indépendamment des autres
+def refresh_rollups(conn, years):
+    years = sorted(set(years))
+    report = {}
+    if not years:
+        return report
+    placeholders = ", ".join("?" * len(years))
+    with conn:
+        for table, query, _ in rollup_definitions():
+            start = time.perf_counter()
+            conn.execute(f"DELETE FROM {table} WHERE year IN ({placeholders})", years)
+            cursor = conn.execute(
+                f"INSERT INTO {table} SELECT * FROM ({query.strip().rstrip(';')}) WHERE year IN ({placeholders})",
+                years,
+            )
+            report[table] = (cursor.rowcount, time.perf_counter() - start)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {ROLLUP_META_TABLE} (key, value) VALUES ('built_at', ?)",
+            (time.strftime("%Y-%m-%dT%H:%M:%S"),),
+        )
+    return report
+
+# Supprimer les rollups : les fonctions get_* reviennent aux requêtes à la volée
+def drop_rollups(conn):
+    with conn:
+        for table, _, _ in rollup_definitions():
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"DROP TABLE IF EXISTS {ROLLUP_META_TABLE}")
@@ -0,0 +1,251 @@
+# models/snapshot_utils.py
+
+# Instantané en lecture seule partagé par les processus workers d'un serveur WSGI (gunicorn --preload -w N)
+# - construit une seule fois, par le processus maître avant le fork, à partir de WorldPopulation.db
+#   (colonnes du moteur en mémoire, columnar_utils) et des fichiers GeoJSON (coordonnées à plat)
+# - écrit en fichiers NumPy .npy dans cache/snapshot/<clé>/, puis ouvert en mmap (lecture seule) :
+#   les pages sont celles du cache du système, communes à tous les processus, sans copie ni analyse par worker
+# - la clé dépend de la version de la base et des fichiers GeoJSON : un instantané périmé n'est jamais lu,
+#   le suivant est reconstruit en arrière-plan (un seul processus à la fois) et les requêtes SQL servent en attendant
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import os                       # pour les chemins
+import json                     # métadonnées de l'instantané et lecture des GeoJSON
+import shutil                   # pour supprimer les anciens instantanés
+import hashlib                  # clé de l'instantané
+import tempfile                 # construction dans un dossier temporaire, renommé à la fin
+import threading                # construction en arrière-plan
+from models.db_utils import pooled_connection, get_db_version, reset_pool
+from models import columnar_utils as cs         # colonnes de fact_population (NumPy)
+from models import geo_utils                    # fichiers de frontières
+
+# Verrou entre processus (Unix) : un seul worker reconstruit l'instantané
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Version du format : à incrémenter dès qu'un tableau ou une métadonnée change
+SNAPSHOT_FORMAT = 1
+MANIFEST = "manifest.json"
+
+###################################################################
+# Clé et emplacement
+
+# Clé de l'instantané : format, version de la base et date de modification de chaque fichier GeoJSON
+def snapshot_key():
+    parts = [str(SNAPSHOT_FORMAT), get_db_version()]
+    parts += [f"{resolution}={geo_utils.geojson_mtime(resolution)}" for resolution in sorted(geo_utils.geojson_files())]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+def snapshot_path(key):
+    return os.path.join(config.SNAPSHOT_DIR, key)
+
+###################################################################
+# Géométrie à plat : une feature GeoJSON = des polygones = des anneaux = des points
+
+class SnapshotGeometry:
+    """Frontières d'un fichier GeoJSON : coordonnées en mmap, géométries reconstruites à la demande."""
+
+    def __init__(self, arrays, meta, path=None):
+        self.path = path                                # dossier de l'instantané (clé des caches)
+        self.coords = arrays["coords"]                  # (points, 2) : lon, lat
+        self.ring_offsets = arrays["ring_offsets"]      # anneau r : points ring_offsets[r]:ring_offsets[r + 1]
+        self.polygon_rings = arrays["polygon_rings"]    # polygone p : anneaux polygon_rings[p]:polygon_rings[p + 1]
+        self.feature_polygons = arrays["feature_polygons"]  # feature f : polygones (idem)
+        self.bounds = arrays["polygon_bounds"]          # (polygones, 4) : emprise de l'anneau extérieur
+        self.types = meta["types"]
+        self.properties = meta["properties"]
+        self.by_name = {p.get("NAME_ENGL"): i for i, p in enumerate(self.properties) if p.get("NAME_ENGL") is not None}
+
+    def ring(self, r):
+        return self.coords[self.ring_offsets[r]:self.ring_offsets[r + 1]].tolist()
+
+    def polygon(self, p):
+        return [self.ring(r) for r in range(self.polygon_rings[p], self.polygon_rings[p + 1])]
+
+    # Polygone p lu seulement quand on l'indexe (polygon[0], polygon[1:])
+    def polygon_view(self, p):
+        return SnapshotPolygon(self, p)
+
+    def polygon_range(self, f):
+        return range(self.feature_polygons[f], self.feature_polygons[f + 1])
+
+    # Géométrie GeoJSON de la feature f (mêmes listes que json.load)
+    def geometry(self, f):
+        polygons = [self.polygon(p) for p in self.polygon_range(f)]
+        if self.types[f] == "Polygon":
+            return {"type": "Polygon", "coordinates": polygons[0]}
+        if self.types[f] == "MultiPolygon":
+            return {"type": "MultiPolygon", "coordinates": polygons}
+        return None
+
+    # Mettre à plat les features d'un fichier GeoJSON : (tableaux, métadonnées)
+    @staticmethod
+    def flatten(features):
+        np = cs.np
+        coords, ring_offsets, polygon_rings, feature_polygons, bounds = [], [0], [0], [0], []
+        types, properties = [], []
+        for feature in features:
+            geometry = feature.get("geometry") or {}
+            kind = geometry.get("type")
+            polygons = ([geometry["coordinates"]] if kind == "Polygon"
+                        else geometry["coordinates"] if kind == "MultiPolygon" else [])
+            for polygon in polygons:
+                for ring in polygon:
+                    coords.extend(ring)
+                    ring_offsets.append(len(coords))
+                polygon_rings.append(len(ring_offsets) - 1)
+                lons = [lon for lon, _ in polygon[0]]
+                lats = [lat for _, lat in polygon[0]]
+                bounds.append((min(lons), min(lats), max(lons), max(lats)))
+            feature_polygons.append(len(polygon_rings) - 1)
+            types.append(kind if polygons else None)
+            properties.append(feature.get("properties") or {})
+        arrays = {
+            "coords": np.array(coords, dtype=np.float64).reshape(-1, 2),
+            "ring_offsets": np.array(ring_offsets, dtype=np.int64),
+            "polygon_rings": np.array(polygon_rings, dtype=np.int64),
+            "feature_polygons": np.array(feature_polygons, dtype=np.int64),
+            "polygon_bounds": np.array(bounds, dtype=np.float64).reshape(-1, 4),
+        }
+        return arrays, {"types": types, "properties": properties}
+
+class SnapshotPolygon:
+    """Polygone d'un instantané, reconstruit en listes GeoJSON à l'indexation."""
+
+    __slots__ = ("geometry", "index")
+
+    def __init__(self, geometry, index):
+        self.geometry = geometry
+        self.index = index
+
+    def __getitem__(self, item):
+        return self.geometry.polygon(self.index)[item]
+
+    def __len__(self):
+        return int(self.geometry.polygon_rings[self.index + 1] - self.geometry.polygon_rings[self.index])
+
+class Snapshot:
+    """Instantané ouvert : magasin de colonnes et frontières par résolution."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.store = cs.ColumnStore.from_snapshot(self._arrays("store"), self.manifest["store"])
+        self.geometry = {resolution: SnapshotGeometry(self._arrays(f"geo_{resolution}"), meta, path)
+                         for resolution, meta in self.manifest["geometry"].items()}
+
+    # Tableaux d'un groupe, ouverts en mmap (lecture seule, partagés entre processus)
+    def _arrays(self, group):
+        np = cs.np
+        return {name: np.load(os.path.join(self.path, f"{group}.{name}.npy"), mmap_mode="r")
+                for name in self.manifest["arrays"][group]}
+
+###################################################################
+# Construction
+
+def _save_arrays(directory, group, arrays, manifest):
+    np = cs.np
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, f"{group}.{name}.npy"), np.ascontiguousarray(values))
+    manifest["arrays"][group] = list(arrays)
+
+# Écrire l'instantané dans un dossier temporaire puis le renommer (jamais lu à moitié écrit)
+def build_snapshot(key):
+    os.makedirs(config.SNAPSHOT_DIR, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix=f".{key}.", dir=config.SNAPSHOT_DIR)
+    try:
+        manifest = {"format": SNAPSHOT_FORMAT, "db_version": get_db_version(), "arrays": {}, "geometry": {}}
+        with pooled_connection() as conn:
+            arrays, manifest["store"] = cs.ColumnStore(conn).to_snapshot()
+        _save_arrays(directory, "store", arrays, manifest)
+        # fichiers lus directement (sans le cache de geo_utils : rien n'est gardé en mémoire dans le maître)
+        for resolution, path in geo_utils.geojson_files().items():
+            if resolution not in config.SNAPSHOT_GEOJSON or not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                features = json.load(f)["features"]
+            arrays, manifest["geometry"][resolution] = SnapshotGeometry.flatten(features)
+            del features
+            _save_arrays(directory, f"geo_{resolution}", arrays, manifest)
+        with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.rename(directory, snapshot_path(key))
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    # les anciens instantanés encore ouverts par d'autres processus restent lisibles (fichiers déjà en mmap)
+    for name in os.listdir(config.SNAPSHOT_DIR):
+        if name != key and not name.startswith("."):
+            shutil.rmtree(os.path.join(config.SNAPSHOT_DIR, name), ignore_errors=True)
+
+# Construire l'instantané s'il n'existe pas encore, sous verrou ; wait=False : renoncer si un autre processus construit
+# Renvoie True si l'instantané de la clé existe à la fin
+def ensure_snapshot(key, wait=True):
+    if os.path.isdir(snapshot_path(key)):
+        return True
+    os.makedirs(config.SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(config.SNAPSHOT_DIR, ".lock"), "w") as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                return False
+        if not os.path.isdir(snapshot_path(key)):
+            build_snapshot(key)
+    return True
+
+###################################################################
+# Instantané du processus
+
+_snapshot = None
+_snapshot_key = None
+_building = set()
+_lock = threading.Lock()
+
+def _build_in_background(key):
+    try:
+        ensure_snapshot(key, wait=False)
+    except Exception as e:
+        print(f"Instantané indisponible : {e}")
+    finally:
+        with _lock:
+            _building.discard(key)
+
+# Instantané de la version courante de la base et des frontières, ou None (désactivé, NumPy absent,
+# en cours de construction) ; un instantané absent est construit en arrière-plan
+def get_snapshot():
+    global _snapshot, _snapshot_key
+    if not config.SNAPSHOT_ENABLED or not cs._import_numpy():
+        return None
+    key = snapshot_key()
+    if _snapshot_key == key:
+        return _snapshot
+    with _lock:
+        if _snapshot_key == key:
+            return _snapshot
+        if os.path.isdir(snapshot_path(key)):
+            try:
+                _snapshot = Snapshot(snapshot_path(key))
+            except Exception as e:
+                print(f"Instantané illisible : {e}")
+                _snapshot = None
+            _snapshot_key = key
+            return _snapshot
+        if key not in _building:
+            _building.add(key)
+            threading.Thread(target=_build_in_background, args=(key,), daemon=True).start()
+    return None
+
+# À appeler dans le processus maître avant le fork des workers : construire l'instantané et l'ouvrir,
+# puis fermer les connexions SQLite (elles ne doivent pas être partagées avec les processus enfants)
+def prepare_snapshot():
+    if not config.SNAPSHOT_ENABLED or not cs._import_numpy():
+        return None
+    ensure_snapshot(snapshot_key())
+    snapshot = get_snapshot()
+    reset_pool()
+    return snapshot
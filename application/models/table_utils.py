@@ -0,0 +1,249 @@
+# models/table_utils.py
+
+# Traitement côté serveur des tableaux DataTables : pagination, tri et recherche
+# - avec les rollups : exécutés par SQLite (LIMIT/OFFSET, ORDER BY, LIKE) sur les tables pré-calculées
+# - sans rollups : sur le résultat en cache de la fonction get_* de l'onglet (la requête d'agrégation
+#   n'est exécutée qu'une fois par version de la base, et non à chaque page, tri ou frappe dans la recherche)
+# La recherche porte sur les valeurs telles qu'affichées (nombres mis en forme), dans les deux cas
+
+# modules nécessaires
+import threading                # pour protéger les marque-pages entre les threads
+from array import array         # ordres et rangs des lignes (pagination en mémoire)
+from collections import OrderedDict                 # marque-pages bornés (LRU)
+from models.db_utils import pooled_connection, get_db_version
+from models.cache_utils import cached_query         # pour mémoriser les comptages et listes de valeurs
+from models.concurrent_utils import run_parallel    # page et comptages lus en parallèle
+from models.result_utils import ResultSet           # résultats par colonnes (pagination en mémoire)
+
+# Nombre maximal de lignes renvoyées par page (protection contre length=-1 sur les gros onglets)
+MAX_PAGE_LENGTH = 1000
+
+# Nombre maximal de marque-pages de pagination mémorisés
+MAX_BOOKMARKS = 1024
+
+# Nombre maximal d'ordres de tri et de textes de recherche mémorisés (pagination en mémoire)
+MAX_MEMORY_ENTRIES = 32
+
+# Expression SQL de la valeur affichée d'une colonne (par défaut : son texte)
+DEFAULT_DISPLAY_SQL = "CAST({} AS TEXT)"
+
+# Retirer le point-virgule final pour utiliser une requête comme sous-requête
+def as_subquery(sql):
+    return sql.strip().rstrip(';')
+
+def quote_column(name):
+    return '"' + name.replace('"', '""') + '"'
+
+# Noms des colonnes renvoyées par une requête (sans l'exécuter)
+@cached_query
+def get_column_names(sql):
+    with pooled_connection() as conn:
+        cursor = conn.execute(f"SELECT * FROM ({as_subquery(sql)}) LIMIT 0")
+        return [description[0] for description in cursor.description]
+
+# Nombre de lignes d'une requête, éventuellement filtrée
+@cached_query
+def count_rows(sql, where="", params=()):
+    with pooled_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM ({as_subquery(sql)}) {where}", params).fetchall()
+
+# Valeurs distinctes d'une colonne (listes déroulantes de filtre des tableaux)
+@cached_query
+def distinct_values(sql, column):
+    col = quote_column(column)
+    with pooled_connection() as conn:
+        return conn.execute(
+            f"SELECT DISTINCT {col} FROM ({as_subquery(sql)}) WHERE {col} IS NOT NULL ORDER BY {col}"
+        ).fetchall()
+
+# Construire la clause WHERE : recherche globale (LIKE sur toutes les colonnes)
+# et filtres par colonne (égalité exacte, utilisés par les listes déroulantes)
+# display_sql : expression SQL de la valeur affichée de chaque colonne ("printf('%.0f', {})"...),
+# pour que la recherche trouve les nombres tels qu'ils apparaissent dans le tableau
+def build_filters(columns, search="", column_filters=None, display_sql=None):
+    clauses, params = [], []
+    if search:
+        display_sql = display_sql or [DEFAULT_DISPLAY_SQL] * len(columns)
+        clauses.append("(" + " OR ".join(f"{expression.format(quote_column(c))} LIKE ?"
+                                         for c, expression in zip(columns, display_sql)) + ")")
+        params.extend([f"%{search}%"] * len(columns))
+    for index, value in sorted((column_filters or {}).items()):
+        if value != "" and 0 <= index < len(columns):
+            clauses.append(f"CAST({quote_column(columns[index])} AS TEXT) = ?")
+            params.append(value)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, tuple(params)
+
+# Ordre de tri : la colonne demandée puis toutes les autres (ordre total, pages stables)
+def sort_columns(columns, order_index):
+    order_index = order_index if 0 <= order_index < len(columns) else 0
+    return [columns[order_index]] + [c for i, c in enumerate(columns) if i != order_index]
+
+###################################################################
+# Pagination par clé (« keyset ») : quand la page demandée suit directement la précédente,
+# on repart de la dernière ligne servie au lieu de faire relire à SQLite les lignes sautées par OFFSET
+
+_bookmarks = OrderedDict()
+_bookmarks_lock = threading.Lock()
+
+def _remember(key, values):
+    with _bookmarks_lock:
+        _bookmarks[key] = values
+        _bookmarks.move_to_end(key)
+        while len(_bookmarks) > MAX_BOOKMARKS:
+            _bookmarks.popitem(last=False)
+
+def _recall(key):
+    with _bookmarks_lock:
+        return _bookmarks.get(key)
+
+# Condition « ligne située après le marque-page » dans l'ordre de tri (NULL est la plus petite valeur)
+def keyset_condition(sort_cols, values, descending):
+    condition = None
+    for col, _ in reversed(list(zip(sort_cols, values))):
+        col = quote_column(col)
+        after = f"({col} < ? OR {col} IS NULL)" if descending else f"{col} > ?"
+        condition = after if condition is None else f"({after} OR ({col} = ? AND {condition}))"
+    # chaque colonne apparaît dans l'ordre : valeur pour la comparaison stricte, puis pour l'égalité
+    params = []
+    for value in values[:-1]:
+        params.extend([value, value])
+    params.append(values[-1])
+    return condition, params
+
+# Récupérer une page : renvoie (lignes, nombre total, nombre après filtrage)
+def fetch_page(sql, start=0, length=10, order_index=0, descending=False, search="", column_filters=None,
+               display_sql=None):
+    columns = get_column_names(sql)
+    where, params = build_filters(columns, search, column_filters, display_sql)
+    sort_cols = sort_columns(columns, order_index)
+    direction = "DESC" if descending else "ASC"
+    order_by = ", ".join(f"{quote_column(c)} {direction}" for c in sort_cols)
+    length = MAX_PAGE_LENGTH if length < 0 else min(length, MAX_PAGE_LENGTH)
+    start = max(start, 0)
+
+    bookmark_key = (get_db_version(), sql, where, params, order_by)
+    bookmark = _recall(bookmark_key + (start,)) if start else None
+
+    query = f"SELECT * FROM ({as_subquery(sql)}) {where}"
+    query_params = list(params)
+    if bookmark is not None:
+        condition, keyset_params = keyset_condition(sort_cols, bookmark, descending)
+        query += (" AND " if where else " WHERE ") + condition
+        query += f" ORDER BY {order_by} LIMIT ?"
+        query_params += keyset_params + [length]
+    else:
+        query += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
+        query_params += [length, start]
+
+    def read_page():
+        with pooled_connection() as conn:
+            return conn.execute(query, query_params).fetchall()
+
+    # La page et les deux comptages sont indépendants : ils sont lus en parallèle
+    results = run_parallel({
+        "rows": read_page,
+        "total": lambda: count_rows(sql)[0][0],
+        "filtered": lambda: count_rows(sql, where, params)[0][0] if where else None,
+    })
+    rows = results["rows"]
+
+    # Marque-page pour la page suivante (seulement sans NULL dans la clé de tri)
+    if rows:
+        last = tuple(rows[-1][c] for c in sort_cols)
+        if None not in last:
+            _remember(bookmark_key + (start + len(rows),), last)
+
+    total = results["total"]
+    filtered = total if results["filtered"] is None else results["filtered"]
+    return rows, total, filtered
+
+###################################################################
+# Pagination en mémoire du résultat d'une fonction get_* (base sans rollups)
+# L'ordre des lignes pour chaque tri et le texte affiché de chaque ligne sont calculés une fois
+# par version de la base ; une page ne coûte ensuite qu'un filtrage et un découpage de listes
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+def _memoized(key, build):
+    with _memory_lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key]
+    value = build()
+    with _memory_lock:
+        _memory[key] = value
+        while len(_memory) > MAX_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+    return value
+
+# Résultat d'un onglet sous forme de colonnes : les listes de lignes (config.COMPACT_ROWS désactivé)
+# sont converties une fois par version de la base ; names : noms des colonnes (résultat vide)
+def as_columns(name, result, names):
+    if isinstance(result, ResultSet):
+        return result
+    return _memoized((get_db_version(), name, "columns"),
+                     lambda: ResultSet.from_rows([tuple(row) for row in result], names))
+
+# Rang de la valeur de chaque ligne dans chaque colonne (NULL : -1, la plus petite valeur comme dans SQLite),
+# et rang de chaque ligne dans l'ordre de toutes les colonnes (tris stables successifs, de la dernière à la première)
+def _row_ranks(name, result):
+    def build():
+        ranks = []
+        for column in result.columns:
+            position = {value: i for i, value in enumerate(sorted({v for v in column if v is not None}))}
+            ranks.append(array("q", [-1 if value is None else position[value] for value in column]))
+        order = list(range(len(result)))
+        for rank in reversed(ranks):
+            order.sort(key=rank.__getitem__)
+        base = array("q", bytes(8 * len(order)))
+        for position, row in enumerate(order):
+            base[row] = position
+        return ranks, base
+    return _memoized((get_db_version(), name, "ranks"), build)
+
+# Indices des lignes dans l'ordre de tri (colonne demandée puis toutes les autres, comme fetch_page) :
+# à valeur égale dans la colonne demandée, l'ordre des autres colonnes est celui de toutes les colonnes,
+# une seule clé entière suffit (rang dans la colonne, puis rang dans l'ordre complet)
+def _row_order(name, result, order_index, descending):
+    def build():
+        ranks, base = _row_ranks(name, result)
+        rank = ranks[order_index if 0 <= order_index < len(ranks) else 0]
+        size = len(base)
+        keys = [rank[row] * size + base[row] for row in range(size)]
+        return array("q", sorted(range(size), key=keys.__getitem__, reverse=descending))
+    return _memoized((get_db_version(), name, "order", order_index, descending), build)
+
+# Texte affiché de chaque ligne (cellules mises en forme, en minuscules, séparées par un caractère de contrôle)
+def _row_texts(name, result, display):
+    def build():
+        return ["\x1f".join(fmt(value) for fmt, value in zip(display, row)).lower() for row in result]
+    return _memoized((get_db_version(), name, "text"), build)
+
+# Récupérer une page du résultat d'un onglet : renvoie (lignes, nombre total, nombre après filtrage)
+# name : onglet (clé des ordres mémorisés) ; display : fonctions de mise en forme des cellules ;
+# column_filters : égalité avec le texte de la valeur (str), comme les listes déroulantes
+def page_result(name, result, start=0, length=10, order_index=0, descending=False, search="",
+                column_filters=None, display=None):
+    length = MAX_PAGE_LENGTH if length < 0 else min(length, MAX_PAGE_LENGTH)
+    start = max(start, 0)
+    order = _row_order(name, result, order_index, descending)
+    filters = [(result.columns[index], value) for index, value in sorted((column_filters or {}).items())
+               if value != "" and 0 <= index < len(result.columns)]
+    if not search and not filters:
+        rows = [result[i] for i in order[start:start + length]]
+        return rows, len(result), len(result)
+
+    texts = _row_texts(name, result, display or [str] * len(result.columns)) if search else None
+    search = search.lower()
+    def keep(row):
+        if texts is not None and search not in texts[row]:
+            return False
+        return all(column[row] is not None and str(column[row]) == value for column, value in filters)
+    selected = [row for row in order if keep(row)]
+    return [result[i] for i in selected[start:start + length]], len(result), len(selected)
+
+# Valeurs distinctes (non nulles, triées) d'une colonne du résultat (listes déroulantes de filtre)
+def result_distinct_values(result, index):
+    return sorted({value for value in result.columns[index] if value is not None})
@@ -0,0 +1,321 @@
+# models/tile_utils.py
+
+# Tuiles vectorielles (Mapbox Vector Tiles, protobuf) des cartes choroplèthes mondiales
+# - les frontières CNTR_RG_* (fichier choisi selon le zoom) sont projetées (Web Mercator) et arrondies,
+#   découpées à l'emprise de la tuile (plus une marge) puis simplifiées :
+#   la taille d'une carte dépend de la zone affichée, pas de l'ensemble des frontières
+# - la géométrie d'une tuile est gardée en mémoire et sur disque (config.TILE_CACHE_DIR) par zoom ;
+#   les valeurs de l'indicateur (une petite table {pays: valeur} par année) sont ajoutées à l'encodage
+# Encodage protobuf écrit à la main (spécification MVT 2.1) : aucune dépendance supplémentaire
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import os                       # pour le cache sur disque
+import json                     # format des géométries en cache
+import math                     # projection Web Mercator
+import struct                   # encodage des réels (double)
+import shutil                   # pour supprimer les tuiles des anciennes versions
+import tempfile                 # fichier temporaire avant remplacement atomique
+import threading                # pour protéger le cache entre les threads
+import functools                # pour mémoriser l'emprise des polygones
+from collections import OrderedDict                 # ordre d'utilisation pour l'éviction LRU
+from models import geo_utils                        # lecture des fichiers GeoJSON et Douglas-Peucker
+
+LAYER_NAME = "countries"
+MAX_LATITUDE = 85.0511287798    # limite de la projection Web Mercator
+
+# Fichier de frontières utilisé pour un zoom
+def resolution_for_zoom(zoom):
+    eligible = [z for z in config.TILE_RESOLUTIONS if z >= zoom]
+    return config.TILE_RESOLUTIONS[min(eligible)] if eligible else '03M'
+
+###################################################################
+# Géométrie : projection, simplification, découpe
+
+# Longitude/latitude -> coordonnées entières dans le monde entier au zoom donné (y vers le bas)
+def project(lon, lat, size):
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lon + 180.0) / 360.0 * size
+    sin = math.sin(math.radians(lat))
+    y = (0.5 - math.log((1 + sin) / (1 - sin)) / (4 * math.pi)) * size
+    return round(x), round(y)
+
+# Aire signée (formule du géomètre, anneau ouvert) : positive pour un anneau extérieur MVT
+def ring_area(ring):
+    area = 0
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+# Emprise (lon min, lat min, lon max, lat max) de chaque polygone des frontières (mémorisée par fichier)
+# [(nom, code, [(emprise, polygone GeoJSON), ...])]
+# Avec l'instantané partagé (snapshot_utils), emprises précalculées et polygones lus à la demande (mmap)
+@functools.lru_cache(maxsize=3)
+def polygon_bounds(resolution, mtime, snapshot_path=None):
+    geometry = geo_utils.snapshot_geometry(resolution)
+    if geometry is not None:
+        return [(properties.get("NAME_ENGL"), properties.get("CNTR_ID"),
+                 [(tuple(geometry.bounds[p].tolist()), geometry.polygon_view(p)) for p in geometry.polygon_range(f)])
+                for f, properties in enumerate(geometry.properties) if geometry.types[f] is not None]
+    _, data = geo_utils.load_geojson(resolution)
+    features = []
+    for feature in data["features"]:
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            continue
+        bounded = []
+        for polygon in polygons:
+            lons = [lon for lon, _ in polygon[0]]
+            lats = [lat for _, lat in polygon[0]]
+            bounded.append(((min(lons), min(lats), max(lons), max(lats)), polygon))
+        properties = feature.get("properties", {})
+        features.append((properties.get("NAME_ENGL"), properties.get("CNTR_ID"), bounded))
+    return features
+
+# Anneau GeoJSON -> anneau ouvert projeté, découpé à la tuile puis simplifié, orienté (extérieur : aire > 0)
+# None s'il disparaît. Les points trop proches du précédent sont écartés dès la projection, et
+# Douglas-Peucker (quadratique au pire) ne traite que la partie de l'anneau comprise dans la tuile
+def _prepare_ring(ring, size, box, exterior):
+    tolerance = config.TILE_SIMPLIFY
+    points = []
+    for lon, lat in ring:
+        x, y = project(lon, lat, size)
+        if not points or abs(x - points[-1][0]) > tolerance or abs(y - points[-1][1]) > tolerance:
+            points.append((x, y))
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    points = clip_ring(points, *box)
+    points = [p for i, p in enumerate(points) if p != points[i - 1]]
+    if len(points) < 3:
+        return None
+    points = geo_utils.douglas_peucker(points + points[:1], tolerance)[:-1]
+    area = ring_area(points) if len(points) >= 3 else 0
+    if area == 0:
+        return None
+    if (area > 0) != exterior:
+        points.reverse()
+    return points
+
+# Point d'intersection du segment [a, b] avec la droite axe = bound
+def _intersect(a, b, axis, bound):
+    t = (bound - a[axis]) / (b[axis] - a[axis])
+    other = a[1 - axis] + t * (b[1 - axis] - a[1 - axis])
+    return (bound, round(other)) if axis == 0 else (round(other), bound)
+
+# Découpe d'un anneau par un rectangle (Sutherland-Hodgman, un bord après l'autre)
+def clip_ring(ring, xmin, ymin, xmax, ymax):
+    points = ring
+    for axis, bound, upper in ((0, xmin, False), (0, xmax, True), (1, ymin, False), (1, ymax, True)):
+        if not points:
+            break
+        inside = (lambda p: p[axis] <= bound) if upper else (lambda p: p[axis] >= bound)
+        output = []
+        previous = points[-1]
+        for point in points:
+            if inside(point):
+                if not inside(previous):
+                    output.append(_intersect(previous, point, axis, bound))
+                output.append(point)
+            elif inside(previous):
+                output.append(_intersect(previous, point, axis, bound))
+            previous = point
+        points = output
+    return points
+
+###################################################################
+# Encodage protobuf
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+def _bytes_field(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+def _packed(field, values):
+    return _bytes_field(field, b"".join(_varint(v) for v in values))
+
+# Commandes de géométrie MVT d'un polygone découpé (coordonnées locales à la tuile)
+# MoveTo (1), LineTo (2), ClosePath (7) ; déplacements relatifs encodés en zigzag
+def geometry_commands(polygons):
+    commands, cx, cy = [], 0, 0
+    for polygon in polygons:
+        for ring in polygon:
+            x, y = ring[0]
+            commands += [(1 & 7) | (1 << 3), _zigzag(x - cx), _zigzag(y - cy)]
+            cx, cy = x, y
+            commands.append((2 & 7) | ((len(ring) - 1) << 3))
+            for x, y in ring[1:]:
+                commands += [_zigzag(x - cx), _zigzag(y - cy)]
+                cx, cy = x, y
+            commands.append((7 & 7) | (1 << 3))
+    return commands
+
+# Message Value : texte, entier ou réel
+def _encode_value(value):
+    if isinstance(value, str):
+        return _bytes_field(1, value.encode("utf-8"))
+    if isinstance(value, int) and not isinstance(value, bool):
+        return _key(5, 0) + _varint(value) if value >= 0 else _key(6, 0) + _varint(_zigzag(value))
+    return _key(3, 1) + struct.pack("<d", float(value))
+
+# Tuile complète : une couche "countries", propriétés name, code et value (si connue)
+# features : [(nom, code, commandes)] ; values : {nom: valeur} ; only_valued : ignorer les pays sans valeur
+def encode_tile(features, values, only_valued=False):
+    keys, value_index, encoded_values = ["name", "code", "value"], {}, []
+    def tag(value):
+        key = (type(value), value)
+        if key not in value_index:
+            value_index[key] = len(encoded_values)
+            encoded_values.append(_bytes_field(4, _encode_value(value)))
+        return value_index[key]
+
+    layer = [_key(15, 0) + _varint(2), _bytes_field(1, LAYER_NAME.encode("utf-8"))]
+    for feature_id, (name, code, commands) in enumerate(features, start=1):
+        value = values.get(name)
+        if value is None and only_valued:
+            continue
+        tags = []
+        for key_index, prop in enumerate((name, code, value)):
+            if prop is not None:
+                tags += [key_index, tag(prop)]
+        feature = (_key(1, 0) + _varint(feature_id) + _packed(2, tags)
+                   + _key(3, 0) + _varint(3) + _packed(4, commands))
+        layer.append(_bytes_field(2, feature))
+    layer += [_bytes_field(3, key.encode("utf-8")) for key in keys]
+    layer += encoded_values
+    layer.append(_key(5, 0) + _varint(config.TILE_EXTENT))
+    return _bytes_field(3, b"".join(layer))
+
+###################################################################
+# Géométrie des tuiles (cache en mémoire et sur disque)
+
+# Polygones de chaque pays découpés à l'emprise de la tuile : [(nom, code, commandes)]
+def build_tile_geometry(z, x, y):
+    resolution = resolution_for_zoom(z)
+    mtime = geo_utils.geojson_mtime(resolution)
+    geometry = geo_utils.snapshot_geometry(resolution)
+    extent, buffer, size = config.TILE_EXTENT, config.TILE_BUFFER, config.TILE_EXTENT * 2 ** z
+    ox, oy = x * extent, y * extent
+    box = (ox - buffer, oy - buffer, ox + extent + buffer, oy + extent + buffer)
+    features = []
+    for name, code, polygons in polygon_bounds(resolution, mtime, geometry and geometry.path):
+        clipped = []
+        for (lon0, lat0, lon1, lat1), polygon in polygons:
+            # emprise projetée (la projection est monotone) : polygones hors de la tuile écartés sans calcul
+            px0, py0 = project(lon0, lat1, size)
+            px1, py1 = project(lon1, lat0, size)
+            if px1 < box[0] or px0 > box[2] or py1 < box[1] or py0 > box[3]:
+                continue
+            exterior = _prepare_ring(polygon[0], size, box, True)
+            if exterior is None:
+                continue
+            holes = [_prepare_ring(ring, size, box, False) for ring in polygon[1:]]
+            rings = [exterior] + [ring for ring in holes if ring is not None]
+            clipped.append([[(px - ox, py - oy) for px, py in ring] for ring in rings])
+        if clipped:
+            features.append((name, code, geometry_commands(clipped)))
+    return features
+
+class TileCache:
+    """Géométries des tuiles : LRU en mémoire, puis fichiers JSON par version des frontières et par zoom."""
+
+    def __init__(self, directory=None, max_entries=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned = set()        # versions dont les anciens dossiers ont déjà été supprimés
+
+    def _path(self, version, z, x, y):
+        directory = self.directory or config.TILE_CACHE_DIR
+        return os.path.join(directory, version, str(z), str(x), f"{y}.json")
+
+    # Première tuile écrite pour une version : supprimer les dossiers de la même résolution construits
+    # pour d'anciennes frontières ou d'anciens réglages TILE_* (les autres résolutions restent utilisées)
+    def _prune(self, resolution, version):
+        with self._lock:
+            if version in self._pruned:
+                return
+            self._pruned.add(version)
+        directory = self.directory or config.TILE_CACHE_DIR
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            if name != version and name.startswith(f"{resolution}-"):
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    def get(self, z, x, y):
+        resolution = resolution_for_zoom(z)
+        mtime = geo_utils.geojson_mtime(resolution)
+        version = f"{resolution}-{mtime}-{config.TILE_EXTENT}-{config.TILE_BUFFER}-{config.TILE_SIMPLIFY}"
+        key = (version, z, x, y)
+        with self._lock:
+            features = self._entries.get(key)
+            if features is not None:
+                self._entries.move_to_end(key)
+                return features
+
+        path = self._path(version, z, x, y)
+        try:
+            with open(path, encoding="utf-8") as f:
+                features = [tuple(feature) for feature in json.load(f)]
+        except (OSError, ValueError):
+            features = build_tile_geometry(z, x, y)
+            self._write(path, features)
+            self._prune(resolution, version)
+
+        with self._lock:
+            self._entries[key] = features
+            while len(self._entries) > (self.max_entries or config.TILE_CACHE_MAX_ENTRIES):
+                self._entries.popitem(last=False)
+        return features
+
+    # Écrire dans un fichier temporaire puis le renommer : aucun lecteur ne voit un fichier incomplet
+    def _write(self, path, features):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(features, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError:
+            pass        # cache disque indisponible : la tuile reste en mémoire
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Cache partagé par tout le processus
+tile_cache = TileCache()
+
+# Tuile encodée d'une carte : géométrie en cache + valeurs de l'année
+# values : {nom du pays: valeur} ; only_valued : ne garder que les pays ayant une valeur (carte d'une région)
+def get_tile(z, x, y, values, only_valued=False):
+    return encode_tile(tile_cache.get(z, x, y), values, only_valued)
+
+# Bornes de classes pour la légende : quantiles des valeurs (classes d'effectifs égaux)
+def quantile_breaks(values, classes=7):
+    ordered = sorted(values)
+    if not ordered:
+        return []
+    return [ordered[min(len(ordered) - 1, len(ordered) * i // classes)] for i in range(1, classes)]
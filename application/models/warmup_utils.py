@@ -0,0 +1,100 @@
+# models/warmup_utils.py
+
+# Préchauffage des caches au démarrage : chaque onglet et chaque vue est demandé une fois
+# (requêtes SQL, figures Plotly, carte folium, rendu des pages) avant de déclarer l'application prête
+
+# modules nécessaires
+import config                   # importer la configuration de l'application
+import time                     # pour mesurer la durée de chaque élément
+import threading                # pour lancer le préchauffage en arrière-plan
+from concurrent.futures import ThreadPoolExecutor   # pour préchauffer plusieurs pages en parallèle
+
+class WarmupState:
+    """État du préchauffage, lu par la route /ready."""
+
+    def __init__(self):
+        self.status = "pending"     # pending -> running -> ready
+        self.started_at = None
+        self.duration = None
+        self.results = []           # [{"url": ..., "status": code HTTP, "ms": durée}]
+        self._done = threading.Event()
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    # Attendre la fin du préchauffage (timeout en secondes, None : sans limite)
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def mark_ready(self):
+        self.status = "ready"
+        self._done.set()
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 1) if self.duration is not None else None,
+            "errors": sum(1 for r in self.results if r["status"] >= 400),
+            "items": self.results,
+        }
+
+# État du préchauffage d'une application (dans app.extensions : une application = un état)
+def get_state(app):
+    return app.extensions.setdefault("warmup", WarmupState())
+
+# URL à préchauffer : toutes les vues de tous les onglets de main_controller.index
+def warmup_urls():
+    from controllers.main_controller import TITLES, QUERY_HEADERS, CHART_QUERIES
+    urls = []
+    for query_type in TITLES:
+        if query_type == 'about':
+            urls.append('/?query=about&view=text')
+            continue
+        urls.append(f'/?query={query_type}&view=table')
+        if config.TABLE_SERVER_SIDE and query_type in QUERY_HEADERS:
+            # première page du tableau, telle que DataTables la demande (tri décroissant sur la 1re colonne)
+            urls.append(f'/api/{query_type}/table?draw=1&start=0&length=10&order[0][column]=0&order[0][dir]=desc')
+        if query_type in CHART_QUERIES:
+            urls.append(f'/?query={query_type}&view=graph')
+            if config.CLIENT_SIDE_CHARTS:
+                urls.append(f'/api/{query_type}')
+        if query_type == 'europe':
+            urls.append('/?query=europe&view=dens_map')
+    urls.append('/dashboard')
+    return urls
+
+# Demander une URL via le client de test Flask et mesurer sa durée
+def _fetch(app, url):
+    start = time.perf_counter()
+    try:
+        status = app.test_client().get(url).status_code
+    except Exception as e:
+        print(f"Préchauffage : erreur sur {url} ({e})")
+        status = 500
+    return {"url": url, "status": status, "ms": round((time.perf_counter() - start) * 1000, 1)}
+
+# Préchauffer toutes les URL sur un pool de threads, puis déclarer l'application prête
+def run_warmup(app, workers=None):
+    state = get_state(app)
+    state.status = "running"
+    state.started_at = time.time()
+    start = time.perf_counter()
+    urls = warmup_urls()
+    with ThreadPoolExecutor(max_workers=workers or config.WARMUP_WORKERS) as executor:
+        state.results = list(executor.map(lambda url: _fetch(app, url), urls))
+    state.duration = time.perf_counter() - start
+    for result in sorted(state.results, key=lambda r: -r["ms"]):
+        print(f"Préchauffage : {result['status']} {result['ms']:8.1f} ms  {result['url']}")
+    state.mark_ready()
+    return state
+
+# Lancer le préchauffage ; wait=False : en arrière-plan (le serveur répond déjà, /ready renvoie 503)
+def start_warmup(app, wait=False):
+    if wait:
+        return run_warmup(app)
+    state = get_state(app)
+    state.status = "running"        # /ready répond 503 dès maintenant, avant le démarrage du thread
+    thread = threading.Thread(target=run_warmup, args=(app,), name="warmup", daemon=True)
+    thread.start()
+    return state
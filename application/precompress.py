@@ -0,0 +1,35 @@
+# precompress.py
+
+# Script hors ligne : écrire les versions compressées (.gz, et .br si brotli est installé) des fichiers statiques
+# Utilisation (depuis le dossier application) :
+#   python precompress.py              précompresser static/ (CSS, JS, GeoJSON CNTR_RG_03M/10M/20M...)
+#   python precompress.py --force      tout recompresser, même les fichiers à jour
+# Les versions compressées sont servies telles quelles aux navigateurs qui les acceptent (PRECOMPRESSED_STATIC)
+
+# Importer les modules nécessaires
+import argparse                         # pour lire les options de la ligne de commande
+import os                               # chemin du dossier static
+import config                           # configuration de l'application (seuil de taille)
+from models import compress_utils as cu # précompression des fichiers
+
+def main():
+    parser = argparse.ArgumentParser(description="Précompresser les fichiers statiques (gzip et brotli)")
+    parser.add_argument("--static", default=os.path.join(config.BASE_DIR, "static"), help="dossier des fichiers statiques")
+    parser.add_argument("--min-size", type=int, default=config.COMPRESS_MIN_SIZE, help="taille minimale des fichiers (octets)")
+    parser.add_argument("--force", action="store_true", help="recompresser les fichiers déjà à jour")
+    args = parser.parse_args()
+
+    if cu.brotli is None:
+        print("brotli n'est pas installé (pip install brotli) : seules les versions .gz sont écrites")
+
+    def show(path, size, sizes):
+        ratios = "  ".join(f"{encoding} {compressed / 1024:9.1f} Kio ({compressed / size:5.1%})"
+                           for encoding, compressed in sizes.items())
+        print(f"  {os.path.relpath(path, args.static):<50} {size / 1024:9.1f} Kio  {ratios}")
+
+    report = cu.precompress_directory(args.static, args.min_size, args.force, on_file=show)
+    print(f"{len(report)} fichiers précompressés dans {args.static}")
+
+# Lancer le script
+if __name__ == '__main__':
+    main()
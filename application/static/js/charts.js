@@ -0,0 +1,265 @@
+// static/js/charts.js
+
+// Tracé des graphiques dans le navigateur à partir de l'API JSON (/api/<query_type>)
+// Le serveur ne fait plus que la requête SQL et la sérialisation ; la figure Plotly est construite ici
+// Chaque fonction reprend la mise en forme de la fonction generate_* correspondante de data_utils.py
+
+// Palette "RdBu" de plotly.express (px.colors.sequential.RdBu)
+var RDBU = ['rgb(103,0,31)', 'rgb(178,24,43)', 'rgb(214,96,77)', 'rgb(244,165,130)', 'rgb(253,219,199)',
+            'rgb(247,247,247)', 'rgb(209,229,240)', 'rgb(146,197,222)', 'rgb(67,147,195)', 'rgb(33,102,172)',
+            'rgb(5,48,97)'];
+
+// Valeurs distinctes d'une colonne, dans l'ordre d'apparition
+function unique(values) {
+    var seen = {};
+    return values.filter(function (v) {
+        if (seen[v]) return false;
+        seen[v] = true;
+        return true;
+    });
+}
+
+// Indices des lignes pour lesquelles la colonne vaut "value"
+function rowsWhere(column, value) {
+    var idx = [];
+    column.forEach(function (v, i) { if (v === value) idx.push(i); });
+    return idx;
+}
+
+function pick(column, idx) {
+    return idx.map(function (i) { return column[i]; });
+}
+
+var chartBuilders = {
+
+    // Évolution de la population mondiale par sexe (generate_population_plot)
+    world: function (d) {
+        return {
+            data: [
+                {x: d['Année'], y: d['Hommes'], name: 'Hommes', type: 'scatter', mode: 'lines', stackgroup: 'one'},
+                {x: d['Année'], y: d['Femmes'], name: 'Femmes', type: 'scatter', mode: 'lines', stackgroup: 'one'},
+                {x: d['Année'], y: d['Total'], name: 'Total (H+F)', type: 'scatter', mode: 'lines',
+                 line: {color: 'black', width: 4}, opacity: 0.7}
+            ],
+            layout: {
+                title: {text: 'Évolution de la population mondiale par sexe'},
+                xaxis: {title: {text: 'Année'}},
+                yaxis: {title: {text: 'Population mondiale'}},
+                legend: {title: {text: 'Sexe'}},
+                hovermode: 'x unified'
+            }
+        };
+    },
+
+    // Répartition de la population mondiale par continent (generate_continent_pie_plot)
+    continent: function (d) {
+        return {
+            data: [{labels: d['Continent'], values: d['Population'], type: 'pie', hole: 0.4,
+                    marker: {colors: RDBU}}],
+            layout: {
+                title: {text: 'Répartition de la population mondiale par continent (2023)'},
+                paper_bgcolor: 'rgba(0,0,0,0)'
+            }
+        };
+    },
+
+    // Évolution du sex-ratio mondial (generate_sex_ratio_plot)
+    sex_ratio: function (d) {
+        return {
+            data: [{x: d['Année'], y: d['Ratio'], name: 'Ratio', type: 'scatter', mode: 'lines'}],
+            layout: {
+                title: {text: "Évolution du Sex-Ratio mondial (Nombre d'hommes pour 100 femmes)"},
+                xaxis: {title: {text: 'Année'}},
+                yaxis: {title: {text: 'Hommes pour 100 Femmes'}},
+                hovermode: 'x unified',
+                shapes: [{type: 'line', xref: 'paper', x0: 0, x1: 1, y0: 100, y1: 100,
+                          line: {dash: 'dash', color: 'red'}}],
+                annotations: [{xref: 'paper', x: 1, y: 100, xanchor: 'right', yanchor: 'bottom',
+                               text: 'Équilibre (100)', showarrow: false}]
+            }
+        };
+    },
+
+    // Évolution de la population par région (generate_region_plot)
+    region: function (d) {
+        var traces = unique(d['Région']).map(function (region) {
+            var idx = rowsWhere(d['Région'], region);
+            return {x: pick(d['Année'], idx), y: pick(d['Population'], idx), name: region,
+                    type: 'scatter', mode: 'lines+markers'};
+        });
+        return {
+            data: traces,
+            layout: {
+                title: {text: 'Évolution de la population par région'},
+                xaxis: {title: {text: 'Année'}},
+                yaxis: {title: {text: 'Population'}},
+                hovermode: 'x unified'
+            }
+        };
+    },
+
+    // Répartition de la population par pays et région, dernière année (generate_share_treemap)
+    share: function (d) {
+        var latest = Math.max.apply(null, d['Année']);
+        var idx = rowsWhere(d['Année'], latest);
+        var ids = ['Monde'], labels = ['Monde'], parents = [''], values = [0], colors = [null];
+        var regions = unique(pick(d['Région'], idx));
+        regions.forEach(function (region) {
+            ids.push('Monde/' + region); labels.push(region); parents.push('Monde');
+            values.push(0); colors.push(null);
+        });
+        idx.forEach(function (i) {
+            ids.push('Monde/' + d['Région'][i] + '/' + d['Pays'][i]);
+            labels.push(d['Pays'][i]);
+            parents.push('Monde/' + d['Région'][i]);
+            values.push(d['Pop. Pays'][i]);
+            colors.push(d['Part (%)'][i]);
+        });
+        return {
+            data: [{type: 'treemap', ids: ids, labels: labels, parents: parents, values: values,
+                    branchvalues: 'remainder', customdata: colors,
+                    hovertemplate: '%{label}<br>Pop. Pays=%{value}<br>Part (%)=%{customdata}<extra></extra>',
+                    marker: {colors: colors, colorscale: 'RdBu', showscale: true,
+                             colorbar: {title: {text: 'Part (%)'}}}}],
+            layout: {
+                title: {text: 'Répartition de la population par pays et région (' + latest + ')'},
+                margin: {t: 50, l: 25, r: 25, b: 25}
+            }
+        };
+    }
+};
+
+// Top 10 des pays les plus peuplés, animé par année (generate_top_10_bar_plot)
+// Seule la première année arrive avec le premier appel (/api/top10/frames) : le graphique est tracé
+// aussitôt, puis les années suivantes sont demandées par fenêtres quand le curseur ou la lecture s'en approchent
+function renderTopFrames(container) {
+    var url = container.getAttribute('data-frames');
+    var frames = {}, windows = {}, years = [], size = 1, current = 0, timer = null;
+
+    function merge(payload) {
+        Object.keys(payload.frames).forEach(function (year) { frames[year] = payload.frames[year]; });
+    }
+
+    // Début de la fenêtre contenant l'indice i : la première année est dans la réponse initiale,
+    // les fenêtres suivantes commencent à l'indice 1 (1 à size, size + 1 à 2 * size...)
+    function windowStart(i) {
+        return i === 0 ? 0 : 1 + Math.floor((i - 1) / size) * size;
+    }
+
+    function nextWindow(i) {
+        return i === 0 ? 1 : windowStart(i) + size;
+    }
+
+    // Fenêtre d'années contenant l'indice i (une seule requête par fenêtre ; redemandée si elle a échoué)
+    function loadWindow(i) {
+        if (i >= years.length || frames[String(years[i])]) return Promise.resolve();
+        var start = windowStart(i);
+        if (!windows[start]) {
+            windows[start] = fetch(url + '?from=' + years[start] + '&count=' + size)
+                .then(function (response) {
+                    if (!response.ok) throw new Error('HTTP ' + response.status);
+                    return response.json();
+                })
+                .then(merge)
+                .catch(function (error) {
+                    delete windows[start];
+                    throw error;
+                });
+        }
+        return windows[start];
+    }
+
+    // Afficher l'année d'indice i (une fois son image reçue) et précharger la fenêtre suivante
+    // En cas d'échec, la lecture s'arrête : l'année sera redemandée au prochain affichage
+    function show(i) {
+        current = i;
+        return loadWindow(i).then(function () {
+            loadWindow(nextWindow(i)).catch(function () {});
+            var frame = frames[String(years[i])];
+            if (!frame || current !== i) return;
+            return Plotly.update(container, {x: [frame['Pays']], y: [frame['Population']]},
+                                 {'sliders[0].active': i}, [0]);
+        }).catch(function (error) {
+            stop();
+            console.warn('Top 10 : année ' + years[i] + ' indisponible (' + error + ')');
+        });
+    }
+
+    function stop() {
+        clearTimeout(timer);
+        timer = null;
+    }
+
+    // Lecture : une année toutes les 500 ms, en attendant les images pas encore reçues
+    function play() {
+        stop();
+        var i = current + 1 < years.length ? current + 1 : 0;
+        function step() {
+            show(i).then(function () {
+                if (timer === null || i + 1 >= years.length) return stop();
+                i += 1;
+                timer = setTimeout(step, 500);
+            });
+        }
+        timer = setTimeout(step, 0);
+    }
+
+    fetch(url)
+        .then(function (response) { return response.json(); })
+        .then(function (payload) {
+            years = payload.years;
+            size = payload.window;
+            merge(payload);
+            var first = frames[String(years[0])] || {'Pays': [], 'Population': []};
+            var steps = years.map(function (year) { return {label: String(year), method: 'skip'}; });
+            var layout = {
+                title: {text: "Top 10 des pays les plus peuplés suivant l'année"},
+                xaxis: {title: {text: 'Pays'}, categoryorder: 'total descending', tickangle: 10},
+                yaxis: {title: {text: 'Population'}, range: [0, 1.2 * payload.max]},
+                sliders: [{active: 0, steps: steps, currentvalue: {prefix: 'Année='}}],
+                updatemenus: [{type: 'buttons', showactive: false, x: 0, y: 0, xanchor: 'right', yanchor: 'top',
+                               pad: {t: 60, r: 10}, direction: 'left',
+                               buttons: [{label: '▶', method: 'skip'}, {label: '◼', method: 'skip'}]}]
+            };
+            var data = [{x: first['Pays'], y: first['Population'], type: 'bar', marker: {color: '#F3B94E'}}];
+            return Plotly.newPlot(container, data, layout, {responsive: true});
+        })
+        .then(function () {
+            container.on('plotly_sliderchange', function (event) {
+                if (!event.interaction) return;     // déplacement du curseur par show()
+                stop();
+                show(years.indexOf(Number(event.step.label)));
+            });
+            container.on('plotly_buttonclicked', function (event) {
+                if (event.button.label === '▶') play(); else stop();
+            });
+            loadWindow(1).catch(function () {});
+        })
+        .catch(function (error) {
+            container.textContent = 'Impossible de charger le graphique : ' + error;
+        });
+}
+
+// Récupérer les données de l'onglet puis tracer le graphique dans l'élément "container"
+function renderChart(container) {
+    if (container.hasAttribute('data-frames')) return renderTopFrames(container);
+    var queryType = container.getAttribute('data-query');
+    var build = chartBuilders[queryType];
+    if (!build) return;
+
+    fetch(container.getAttribute('data-api'))
+        .then(function (response) { return response.json(); })
+        .then(function (payload) {
+            var figure = build(payload.data);
+            Plotly.newPlot(container, figure.data, figure.layout, {responsive: true}).then(function () {
+                if (figure.frames) Plotly.addFrames(container, figure.frames);
+            });
+        })
+        .catch(function (error) {
+            container.textContent = 'Impossible de charger le graphique : ' + error;
+        });
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('.client-chart').forEach(renderChart);
+});
@@ -0,0 +1,70 @@
+// static/js/map.js
+
+// Carte choroplèthe mondiale tracée à partir des tuiles vectorielles (/tiles/<z>/<x>/<y>)
+// Les bornes des classes de couleur sont lues une fois (/tiles/scale), les tuiles à chaque déplacement
+
+// Palette "YlGnBu" (ColorBrewer, 7 classes), comme la carte de densité européenne
+var YLGNBU = ['#ffffcc', '#c7e9b4', '#7fcdbb', '#41b6c4', '#1d91c0', '#225ea8', '#0c2c84'];
+
+// Couleur d'une valeur d'après les bornes des classes
+function colorFor(value, breaks) {
+    if (value === undefined || value === null) return '#d9d9d9';
+    var i = 0;
+    while (i < breaks.length && value >= breaks[i]) i++;
+    return YLGNBU[i];
+}
+
+function formatValue(value) {
+    if (value === undefined || value === null) return 'n.d.';
+    return value.toLocaleString('fr-FR', {maximumFractionDigits: 2});
+}
+
+// Légende : une ligne par classe
+function addLegend(map, scale) {
+    var legend = L.control({position: 'bottomright'});
+    legend.onAdd = function () {
+        var div = L.DomUtil.create('div', 'map-legend');
+        var bounds = [scale.min].concat(scale.breaks);
+        var html = '<b>' + scale.label + ' (' + scale.year + ')</b>';
+        bounds.forEach(function (low, i) {
+            var high = i + 1 < bounds.length ? bounds[i + 1] : scale.max;
+            html += '<div><span style="background:' + YLGNBU[i] + '"></span>' +
+                    formatValue(low) + ' – ' + formatValue(high) + '</div>';
+        });
+        div.innerHTML = html;
+        return div;
+    };
+    legend.addTo(map);
+}
+
+function initMap(element) {
+    var query = element.dataset.query;
+    var maxZoom = parseInt(element.dataset.maxZoom, 10);
+    var map = L.map(element, {worldCopyJump: true}).setView([30, 10], 2);
+
+    fetch(element.dataset.scale + '?' + query)
+        .then(function (response) { return response.json(); })
+        .then(function (scale) {
+            var layer = L.vectorGrid.protobuf(element.dataset.tiles + '?' + query, {
+                maxNativeZoom: maxZoom,
+                interactive: true,
+                vectorTileLayerStyles: {
+                    countries: function (properties) {
+                        return {fill: true, fillColor: colorFor(properties.value, scale.breaks),
+                                fillOpacity: 0.8, weight: 0.5, color: '#ffffff'};
+                    }
+                }
+            });
+            layer.on('mouseover', function (e) {
+                var p = e.layer.properties;
+                layer.bindTooltip(p.name + ' : ' + formatValue(p.value), {sticky: true}).openTooltip(e.latlng);
+            });
+            layer.addTo(map);
+            addLegend(map, scale);
+        });
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+    var element = document.getElementById('world-map');
+    if (element) initMap(element);
+});
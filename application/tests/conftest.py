@@ -0,0 +1,72 @@
+# tests/conftest.py
+
+# Les tests importent les modules de l'application (config, models, controllers) depuis son dossier
+import os
+import sys
+import random
+import sqlite3
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+# Colonnes d'indicateurs de fact_population (mêmes noms que dans WorldPopulation.db)
+INDICATORS = [
+    "TOTAL POPULATION. AS OF 1 JULY (THOUSANDS)",
+    "MALE POPULATION. AS OF 1 JULY (THOUSANDS)",
+    "FEMALE POPULATION. AS OF 1 JULY (THOUSANDS)",
+    "POPULATION DENSITY. AS OF 1 JULY (PERSONS PER SQUARE KM)",
+    "LIFE EXPECTANCY AT BIRTH. BOTH SEXES (YEARS)",
+    "CRUDE DEATH RATE (DEATHS PER 1.000 POPULATION)",
+    "CRUDE BIRTH RATE (BIRTHS PER 1.000 POPULATION)",
+]
+
+# Petite base synthétique (3 continents, 12 pays, 1950-1960), sans rollups
+def build_population_db(path, years=range(1950, 1961)):
+    conn = sqlite3.connect(path)
+    columns = ", ".join(f'"{name}" REAL' for name in INDICATORS)
+    conn.execute(f"CREATE TABLE fact_population (location_code INTEGER, year INTEGER, {columns})")
+    conn.execute("CREATE TABLE continent (location_code INTEGER PRIMARY KEY, name TEXT)")
+    for table in ("region", "subregion", "country"):
+        conn.execute(f"CREATE TABLE {table} (location_code INTEGER PRIMARY KEY, name TEXT, parent_code INTEGER)")
+    conn.executemany("INSERT INTO continent VALUES (?, ?)", [(1, "Africa"), (2, "Europe"), (3, "Asia")])
+    regions = {10: ("Eastern Africa", 1), 11: ("Europe", 2), 12: ("Eastern Asia", 3)}
+    conn.executemany("INSERT INTO region VALUES (?, ?, ?)", [(code, *value) for code, value in regions.items()])
+    names = iter(["Kenya", "Ethiopia", "Egypt", "Uganda", "France", "Germany",
+                  "Italy", "Spain", "China", "Japan", "Korea", "Mongolia"])
+    subregion, country = 100, 1000
+    for region in regions:
+        for _ in range(2):
+            conn.execute("INSERT INTO subregion VALUES (?, ?, ?)", (subregion, f"Sub{subregion}", region))
+            for _ in range(2):
+                conn.execute("INSERT INTO country VALUES (?, ?, ?)", (country, next(names), subregion))
+                country += 1
+            subregion += 1
+    rng = random.Random(1)
+    codes = [row[0] for row in conn.execute("SELECT location_code FROM country")] + list(regions) + [900]
+    placeholders = ", ".join("?" * (len(INDICATORS) + 2))
+    for year in years:
+        for code in codes:
+            male, female = rng.uniform(1000, 50000), rng.uniform(1000, 50000)
+            conn.execute(f"INSERT INTO fact_population VALUES ({placeholders})",
+                         (code, year, male + female, male, female, rng.uniform(1, 500),
+                          rng.uniform(40, 80), rng.uniform(5, 20), rng.uniform(10, 40)))
+    conn.commit()
+    conn.close()
+    return path
+
+# Application sur une base synthétique ; les caches sur disque sont écrits dans le dossier du test
+@pytest.fixture
+def population_db(tmp_path, monkeypatch):
+    path = build_population_db(str(tmp_path / "WorldPopulation.db"))
+    monkeypatch.setattr(config, "DATABASE", path)
+    monkeypatch.setattr(config, "FRAGMENT_CACHE_DIR", str(tmp_path / "fragments"))
+    monkeypatch.setattr(config, "EXPORT_CACHE_DIR", str(tmp_path / "exports"))
+    monkeypatch.setattr(config, "TILE_CACHE_DIR", str(tmp_path / "tiles"))
+    return path
+
+@pytest.fixture
+def client(population_db):
+    from app import create_app
+    return create_app(warm_up=False).test_client()
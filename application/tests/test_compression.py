@@ -0,0 +1,44 @@
+# tests/test_compression.py
+
+# Fichiers statiques et négociation de l'encodage (compress_utils, compression_controller)
+
+import os
+import pytest
+from werkzeug.http import parse_accept_header
+from werkzeug.datastructures import Accept
+from models import compress_utils as cu
+
+BROWSER_ACCEPT = "gzip, deflate, br"
+
+def accept(header):
+    return parse_accept_header(header, Accept)
+
+def test_choose_encoding_without_candidates():
+    # aucune version précompressée : rien à choisir (et non "tous les encodages")
+    assert cu.choose_encoding(accept(BROWSER_ACCEPT), []) is None
+    assert cu.choose_encoding(accept(BROWSER_ACCEPT)) in cu.available_encodings()
+
+def test_precompressed_variant_without_sibling(tmp_path):
+    path = tmp_path / "style.css"
+    path.write_text("body { margin: 0; }\n" * 200)
+    assert cu.precompressed_variant(str(path), accept(BROWSER_ACCEPT)) == (None, None)
+
+def test_precompressed_variant_with_sibling(tmp_path):
+    path = tmp_path / "style.css"
+    path.write_text("body { margin: 0; }\n" * 200)
+    cu.precompress_directory(str(tmp_path), min_size=0)
+    encoding, compressed_path = cu.precompressed_variant(str(path), accept(BROWSER_ACCEPT))
+    assert encoding == cu.available_encodings()[0]
+    assert compressed_path == str(path) + cu.EXTENSIONS[encoding]
+    assert cu.precompressed_variant(str(path), accept("identity")) == (None, None)
+
+# Sans precompress.py, les fichiers statiques sont servis tels quels à un navigateur
+@pytest.mark.parametrize("url", ["/static/css/style.css", "/static/js/charts.js"])
+def test_static_without_precompressed_files(client, url):
+    path = os.path.join(client.application.static_folder, url[len("/static/"):])
+    if any(os.path.exists(path + ext) for ext in cu.EXTENSIONS.values()):
+        pytest.skip("version précompressée présente")
+    response = client.get(url, headers={"Accept-Encoding": BROWSER_ACCEPT})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    response.close()
@@ -0,0 +1,18 @@
+# tests/test_dashboard.py
+
+# Tableau de bord (dashboard_controller) : années demandées par ?from=&to=
+
+import pytest
+from models import dashboard_utils as dbu
+
+def test_dashboard_years(client):
+    response = client.get("/dashboard?from=1950&to=1960")
+    assert response.status_code == 200
+
+# Années invalides : 400 sans calculer les indicateurs
+@pytest.mark.parametrize("query", ["from=1900&to=1960", "from=1950&to=2100", "from=1960&to=1950", "from=1955&to=1955"])
+def test_dashboard_invalid_years_skip_kpis(client, monkeypatch, query):
+    def fail(*args, **kwargs):
+        raise AssertionError("requête des indicateurs lancée")
+    monkeypatch.setattr(dbu, "generate_population_dashboard", fail)
+    assert client.get(f"/dashboard?{query}").status_code == 400
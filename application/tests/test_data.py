@@ -0,0 +1,28 @@
+# tests/test_data.py
+
+# Fonctions get_* de data_utils : une erreur SQL n'est pas confondue avec un résultat vide
+
+import sqlite3
+import pytest
+import config
+from models import data_utils as du
+
+def test_population_by_continent(population_db):
+    rows = list(du.get_population_by_continent())
+    assert {row[0] for row in rows} >= {"Africa", "Europe", "Asia"}
+
+def test_population_by_continent_propagates_errors(population_db):
+    conn = sqlite3.connect(population_db)
+    conn.execute("DROP TABLE region")
+    conn.commit()
+    conn.close()
+    with pytest.raises(sqlite3.Error):
+        du.get_population_by_continent()
+
+def test_api_reports_database_errors(client, population_db):
+    conn = sqlite3.connect(population_db)
+    conn.execute("DROP TABLE region")
+    conn.commit()
+    conn.close()
+    client.application.config["PROPAGATE_EXCEPTIONS"] = False
+    assert client.get("/api/continent").status_code == 500
@@ -0,0 +1,18 @@
+# tests/test_exports.py
+
+# Exports Excel gardés sur disque (export_utils)
+
+import os
+import config
+from models import export_utils
+
+def test_excel_export_follows_code_version(client, monkeypatch):
+    assert client.get("/download_excel?query=world").status_code == 200
+    first = export_utils.excel_cache_path("world")
+    assert os.path.exists(first)
+    # nouveau code (déploiement) : nouveau classeur, l'ancien est supprimé
+    monkeypatch.setattr(export_utils, "code_version", lambda: "nouveaucode")
+    assert client.get("/download_excel?query=world").status_code == 200
+    second = export_utils.excel_cache_path("world")
+    assert second != first and "nouveaucode" in second
+    assert sorted(os.listdir(config.EXPORT_CACHE_DIR)) == [os.path.basename(second)]
@@ -0,0 +1,17 @@
+# tests/test_maps.py
+
+# Carte mondiale et tuiles (tile_controller), requêtes à la carte (/api/query)
+
+import pytest
+import config
+from conftest import build_population_db
+
+def test_map_page(client):
+    assert client.get("/map?indicator=density&year=1955").status_code == 200
+    assert client.get("/map?year=1800").status_code == 400
+
+# Base vide (ou en cours d'ingestion) : 503 au lieu d'une erreur 500
+@pytest.mark.parametrize("url", ["/map", "/tiles/0/0/0", "/tiles/scale", "/api/query"])
+def test_empty_database(client, tmp_path, monkeypatch, url):
+    monkeypatch.setattr(config, "DATABASE", build_population_db(str(tmp_path / "empty.db"), years=()))
+    assert client.get(url).status_code == 503
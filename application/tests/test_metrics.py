@@ -0,0 +1,24 @@
+# tests/test_metrics.py
+
+# Routes internes (/metrics, /cache_stats) : poste local ou jeton PROFILE_TOKEN
+
+import pytest
+import config
+
+@pytest.mark.parametrize("url", ["/metrics", "/cache_stats"])
+def test_internal_routes_local_only(client, url):
+    assert client.get(url).status_code == 200
+    assert client.get(url, environ_base={"REMOTE_ADDR": "10.0.0.1"}).status_code == 403
+    assert client.get(url, headers={"X-Forwarded-For": "10.0.0.1"}).status_code == 403
+
+@pytest.mark.parametrize("headers, status", [
+    ({"X-Profile-Token": "s3cret"}, 200),
+    ({"Authorization": "Bearer s3cret"}, 200),
+    ({"X-Profile-Token": "wrong"}, 403),
+    ({"X-Profile-Token": "sécret"}, 403),          # non ASCII : refusé, pas d'erreur 500
+    ({"Authorization": "Bearer é"}, 403),
+    ({}, 403),
+])
+def test_internal_routes_token(client, monkeypatch, headers, status):
+    monkeypatch.setattr(config, "PROFILE_TOKEN", "s3cret")
+    assert client.get("/metrics", headers=headers).status_code == status
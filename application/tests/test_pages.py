@@ -0,0 +1,26 @@
+# tests/test_pages.py
+
+# Pages complètes : ETag mémorisé et réponses 304 (main_controller.index)
+
+from models import fragment_utils
+
+def test_known_page_answers_304(client):
+    response = client.get("/?query=world&view=table")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert client.get("/?query=world&view=table", headers={"If-None-Match": etag}).status_code == 304
+
+def test_unknown_pages_are_not_remembered(client):
+    client.get("/?query=world&view=table")
+    before = len(fragment_utils._page_etags)
+    for i in range(50):
+        client.get(f"/?query=x{i}&view=y")
+    assert len(fragment_utils._page_etags) == before
+
+def test_page_etags_are_bounded(population_db, monkeypatch):
+    monkeypatch.setattr(fragment_utils, "MAX_PAGE_ETAGS", 5)
+    for i in range(20):
+        fragment_utils.remember_page_etag(("index", f"q{i}", "table"), f"etag{i}")
+    assert len(fragment_utils._page_etags) == 5
+    assert fragment_utils.get_page_etag(("index", "q19", "table")) == "etag19"
+    assert fragment_utils.get_page_etag(("index", "q0", "table")) is None
@@ -0,0 +1,37 @@
+# tests/test_tables.py
+
+# Tableaux DataTables paginés côté serveur (api_controller.table_data, table_utils)
+
+import pytest
+import config
+
+QUERIES = ["world", "continent", "sex_ratio", "region", "top10", "europe", "share"]
+
+def table(client, query_type, **params):
+    args = {"draw": 2, "start": 0, "length": 10, "order[0][column]": 0, "order[0][dir]": "asc"}
+    args.update(params)
+    response = client.get(f"/api/{query_type}/table", query_string=args)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+# Sans rollups, la pagination se fait en mémoire sur le résultat de get_*, en colonnes ou en lignes
+@pytest.mark.parametrize("compact", [True, False])
+@pytest.mark.parametrize("query_type", QUERIES)
+def test_table_without_rollups(client, monkeypatch, query_type, compact):
+    monkeypatch.setattr(config, "COMPACT_ROWS", compact)
+    first = table(client, query_type, draw=1)
+    assert first["recordsTotal"] > 0 and len(first["data"]) == min(10, first["recordsTotal"])
+    assert "options" in first
+    page = table(client, query_type, start=10, **{"order[0][dir]": "desc", "search[value]": "19"})
+    assert page["recordsFiltered"] <= page["recordsTotal"]
+
+# Même page quelle que soit la représentation du résultat
+@pytest.mark.parametrize("query_type", ["world", "top10", "europe"])
+def test_table_same_rows_and_columns(client, monkeypatch, query_type):
+    params = {"start": 5, "order[0][column]": 1, "order[0][dir]": "desc", "search[value]": "9"}
+    monkeypatch.setattr(config, "COMPACT_ROWS", True)
+    compact = table(client, query_type, **params)
+    monkeypatch.setattr(config, "COMPACT_ROWS", False)
+    from models.cache_utils import query_cache
+    query_cache.clear()
+    assert table(client, query_type, **params) == compact